@@ -0,0 +1,105 @@
+"""Benchmark db_session() latency under concurrent UI/API-style load.
+
+Compares the untuned setup (default SQLite engine, new sessionmaker per
+call) with the tuned data layer in models/database.py.
+
+Usage: python -m benchmarks.db_session_bench [--workers 16] [--ops 200]
+"""
+
+import argparse
+import statistics
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from pathlib import Path
+from unittest.mock import patch
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from tasmo_guardian.models import database
+from tasmo_guardian.models.device import Base, Device, Setting
+
+DEVICES = 500
+
+
+def seed(session_scope) -> None:
+    with session_scope() as session:
+        session.add_all(
+            Device(name=f"Plug{i}", ip=f"10.0.{i // 250}.{i % 250}", mac=f"{i:012X}", type=0, version="13.1.0")
+            for i in range(DEVICES)
+        )
+
+
+def workload(session_scope, worker: int, ops: int) -> list[float]:
+    """Mostly short reads (settings, single device) with a settings write every 10th op."""
+    latencies = []
+    for i in range(ops):
+        start = time.perf_counter()
+        with session_scope() as session:
+            if i % 10 == 0:
+                session.merge(Setting(name=f"bench_{worker}", value=str(i)))
+            elif i % 2:
+                session.query(Setting).all()
+            else:
+                session.get(Device, (worker * ops + i) % DEVICES + 1)
+        latencies.append((time.perf_counter() - start) * 1000)
+    return latencies
+
+
+def run(session_scope, workers: int, ops: int) -> dict:
+    seed(session_scope)
+    with ThreadPoolExecutor(workers) as pool:
+        results = pool.map(lambda w: workload(session_scope, w, ops), range(workers))
+        latencies = sorted(l for batch in results for l in batch)
+    return {
+        "mean_ms": statistics.mean(latencies),
+        "p95_ms": latencies[int(len(latencies) * 0.95)],
+        "max_ms": latencies[-1],
+    }
+
+
+def untuned_scope(db_path: Path):
+    engine = create_engine(f"sqlite:///{db_path}")
+    Base.metadata.create_all(engine)
+
+    @contextmanager
+    def scope():
+        session = sessionmaker(bind=engine)()
+        try:
+            yield session
+            session.commit()
+        except Exception:
+            session.rollback()
+            raise
+        finally:
+            session.close()
+
+    return scope
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", type=int, default=16)
+    parser.add_argument("--ops", type=int, default=200)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        untuned = run(untuned_scope(Path(tmpdir) / "untuned.sqlite3"), args.workers, args.ops)
+
+        data_dir = Path(tmpdir) / "data"
+        with patch.object(database, "DATA_DIR", data_dir), patch.object(
+            database, "BACKUP_DIR", data_dir / "backups"
+        ), patch.object(database, "DB_PATH", data_dir / "tuned.sqlite3"), patch.object(
+            database, "_engine", None
+        ):
+            tuned = run(database.db_session, args.workers, args.ops)
+
+    print(f"{'':8} {'mean_ms':>9} {'p95_ms':>9} {'max_ms':>9}")
+    for name, stats in (("untuned", untuned), ("tuned", tuned)):
+        print(f"{name:8} {stats['mean_ms']:9.2f} {stats['p95_ms']:9.2f} {stats['max_ms']:9.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -5,9 +5,9 @@ from pathlib import Path
 from fastapi import APIRouter
 from fastapi.responses import FileResponse, JSONResponse
 
-from ..models.database import db_session
-from ..models.device import Device
-from ..services.backup import backup_all_devices
+from ..models.database import run_db
+from ..services.jobs import cancel_job, get_job, start_backup_job, wait_for_job
+from ..services.reconcile import reconcile_backups
 
 router = APIRouter()
 BACKUP_DIR = Path("data/backups")
@@ -41,41 +41,50 @@ async def download_backup_by_path(path: str):
     )
 
 
-async def trigger_backup() -> dict:
-    """Trigger backup of all devices. For use with external schedulers."""
-    from datetime import datetime, timedelta
-    from ..services.backup import backup_device, count_device_backups
-    
-    results = {"backed_up": 0, "skipped": 0, "failed": 0}
-    
-    with db_session() as session:
-        devices = session.query(Device).all()
-        cutoff = datetime.now() - timedelta(hours=24)
-        
-        for device in devices:
-            if device.lastbackup and device.lastbackup > cutoff:
-                results["skipped"] += 1
-                continue
-            
-            success = await backup_device(device)
-            if success:
-                device.lastbackup = datetime.now()
-                device.noofbackups = count_device_backups(device.name)
-                results["backed_up"] += 1
-            else:
-                results["failed"] += 1
-
-    return {
-        "status": "complete",
-        "backed_up": results["backed_up"],
-        "skipped": results["skipped"],
-        "failed": results["failed"],
-        "total": len(devices),
-    }
+async def trigger_backup(wait: float = 0, deadline: float | None = None) -> dict:
+    """Start a backup of all devices and return its job.
+
+    For use with external schedulers. Waits up to `wait` seconds for the
+    run to finish before returning. With a `deadline` in seconds, devices
+    that do not fit are deferred to the next run, stalest devices first.
+    """
+    job = start_backup_job(deadline)
+    await wait_for_job(job, wait)
+    return job.to_dict()
 
 
 @router.get("/api/backup")
 @router.post("/api/backup")
-async def backup_endpoint():
+async def backup_endpoint(wait: float = 0, deadline: float | None = None):
     """HTTP endpoint for triggering backups via cron/Node-RED."""
-    return await trigger_backup()
+    result = await trigger_backup(wait, deadline)
+    return JSONResponse(status_code=200 if result["finished_at"] else 202, content=result)
+
+
+@router.get("/api/backup/jobs/{job_id}")
+async def backup_job_endpoint(job_id: str, wait: float = 0):
+    """Live status of a backup job; long-polls up to `wait` seconds for completion."""
+    job = get_job(job_id)
+    if job is None:
+        return JSONResponse(status_code=404, content={"error": "Job not found"})
+    await wait_for_job(job, wait)
+    return job.to_dict()
+
+
+@router.delete("/api/backup/jobs/{job_id}")
+async def cancel_backup_job_endpoint(job_id: str, wait: float = 0):
+    """Cancel a running backup job; waits up to `wait` seconds for it to stop."""
+    job = get_job(job_id)
+    if job is None:
+        return JSONResponse(status_code=404, content={"error": "Job not found"})
+    if not cancel_job(job):
+        return JSONResponse(status_code=409, content={"error": "Job already finished"})
+    await wait_for_job(job, wait)
+    result = job.to_dict()
+    return JSONResponse(status_code=200 if result["finished_at"] else 202, content=result)
+
+
+@router.post("/api/backup/reconcile")
+async def reconcile_endpoint():
+    """Resync the backup index and device counts with the backup directory."""
+    return await run_db(reconcile_backups)
@@ -5,9 +5,8 @@ from datetime import datetime
 from fastapi import APIRouter
 from fastapi.responses import Response
 
-from ..models.database import db_session
-from ..models.device import Device
-from ..services.export import export_devices_csv
+from ..models.database import run_db
+from ..services.export import export_all_devices_csv
 
 router = APIRouter()
 
@@ -15,9 +14,7 @@ router = APIRouter()
 @router.get("/api/export/csv")
 async def export_csv() -> Response:
     """Export devices to CSV file."""
-    with db_session() as session:
-        devices = session.query(Device).all()
-        csv_data = export_devices_csv(devices)
+    csv_data = await run_db(export_all_devices_csv)
 
     filename = f"devices_{datetime.now().strftime('%Y-%m-%d')}.csv"
 
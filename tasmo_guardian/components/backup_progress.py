@@ -0,0 +1,47 @@
+"""Fleet backup progress component."""
+
+import reflex as rx
+
+from ..state.backup_state import BackupState
+
+
+def running_device(device: dict) -> rx.Component:
+    """Render one device that is still being backed up."""
+    return rx.hstack(
+        rx.text(device["name"]),
+        rx.badge(
+            f"{device['elapsed_s']}s",
+            color_scheme=rx.cond(device["slow"], "orange", "gray"),
+        ),
+        gap="8px",
+        align="center",
+    )
+
+
+def backup_progress() -> rx.Component:
+    """Render progress of a running Backup All."""
+    return rx.cond(
+        BackupState.backing_up & (BackupState.backup_total > 0),
+        rx.vstack(
+            rx.progress(value=BackupState.backup_progress, max=BackupState.backup_total),
+            rx.hstack(
+                rx.text(
+                    f"{BackupState.backup_progress} of {BackupState.backup_total} devices done, "
+                    f"{BackupState.backup_failed} failed",
+                    size="2",
+                ),
+                rx.button(
+                    "Cancel",
+                    size="1",
+                    variant="soft",
+                    color_scheme="red",
+                    on_click=BackupState.cancel_backup_all,
+                ),
+                justify="between",
+                align="center",
+            ),
+            rx.flex(rx.foreach(BackupState.backup_running, running_device), gap="16px", wrap="wrap"),
+            margin_top="1em",
+            align="stretch",
+        ),
+    )
@@ -33,7 +33,7 @@ def add_device_dialog() -> rx.Component:
 
 
 def scan_dialog() -> rx.Component:
-    """Dialog for scanning IP range."""
+    """Dialog for scanning IP ranges."""
     return rx.dialog.root(
         rx.dialog.trigger(rx.button("Scan Network")),
         rx.dialog.content(
@@ -41,14 +41,13 @@ def scan_dialog() -> rx.Component:
             rx.form(
                 rx.flex(
                     rx.input(
-                        placeholder="Start IP (e.g., 192.168.1.1)",
-                        name="start_ip",
+                        placeholder="Ranges (e.g., 192.168.1.0/24, 10.0.0.1-10.0.3.254)",
+                        name="targets",
                         required=True,
                     ),
                     rx.input(
-                        placeholder="End IP (e.g., 192.168.1.255)",
-                        name="end_ip",
-                        required=True,
+                        placeholder="Exclude (optional, e.g., 192.168.1.1, 192.168.1.200-254)",
+                        name="exclude",
                     ),
                     rx.input(
                         placeholder="Password (optional)", name="password", type="password"
@@ -45,7 +45,7 @@ def device_row(device: dict) -> rx.Component:
         rx.table.cell(device_type_icon(device["type"])),
         rx.table.cell(device["name"]),
         rx.table.cell(device["ip"]),
-        rx.table.cell(lock_icon(device["password"] != "")),
+        rx.table.cell(lock_icon(device["has_password"])),
         rx.table.cell(device["version"]),
         rx.table.cell(device["lastbackup"]),
         rx.table.cell(
@@ -77,21 +77,62 @@ def sortable_header(label: str, column: str) -> rx.Component:
     )
 
 
+def device_filter() -> rx.Component:
+    """Render the device filter input."""
+    return rx.debounce_input(
+        rx.input(
+            placeholder="Filter by name, IP, MAC or version",
+            value=DeviceState.filter_text,
+            on_change=DeviceState.set_filter,
+            width="320px",
+        ),
+        debounce_timeout=300,
+    )
+
+
+def pagination_controls() -> rx.Component:
+    """Render previous/next page controls."""
+    return rx.hstack(
+        rx.button(
+            rx.icon("chevron-left"),
+            variant="ghost",
+            on_click=DeviceState.prev_page,
+            disabled=DeviceState.page <= 1,
+        ),
+        rx.text(f"Page {DeviceState.page} of {DeviceState.page_count} ({DeviceState.total_devices} devices)"),
+        rx.button(
+            rx.icon("chevron-right"),
+            variant="ghost",
+            on_click=DeviceState.next_page,
+            disabled=DeviceState.page >= DeviceState.page_count,
+        ),
+        align="center",
+        gap="8px",
+    )
+
+
 def device_table() -> rx.Component:
     """Render the device table."""
-    return rx.table.root(
-        rx.table.header(
-            rx.table.row(
-                rx.table.column_header_cell("Type"),
-                sortable_header("Name", "name"),
-                sortable_header("IP", "ip"),
-                rx.table.column_header_cell("Auth"),
-                sortable_header("Version", "version"),
-                sortable_header("Last Backup", "lastbackup"),
-                sortable_header("Backups", "noofbackups"),
-                rx.table.column_header_cell("Actions"),
-            )
+    return rx.vstack(
+        device_filter(),
+        rx.table.root(
+            rx.table.header(
+                rx.table.row(
+                    rx.table.column_header_cell("Type"),
+                    sortable_header("Name", "name"),
+                    sortable_header("IP", "ip"),
+                    rx.table.column_header_cell("Auth"),
+                    sortable_header("Version", "version"),
+                    sortable_header("Last Backup", "lastbackup"),
+                    sortable_header("Backups", "noofbackups"),
+                    rx.table.column_header_cell("Actions"),
+                )
+            ),
+            rx.table.body(rx.foreach(DeviceState.devices, device_row)),
+            width="100%",
         ),
-        rx.table.body(rx.foreach(DeviceState.devices, device_row)),
+        pagination_controls(),
         on_mount=DeviceState.load_devices,
+        margin_top="1em",
+        align="stretch",
     )
@@ -95,6 +95,12 @@ def backup_settings_form() -> rx.Component:
                 rx.input(name="max_count", type="number", default_value=SettingsState.backup_max_count.to_string()),
                 rx.text("Backup directory", size="2", color="gray"),
                 rx.input(name="directory", default_value=SettingsState.backup_directory),
+                rx.text("Per-subnet limits (one per line: CIDR, max parallel, optional KB/s)", size="2", color="gray"),
+                rx.text_area(
+                    name="network_limits",
+                    default_value=SettingsState.network_limits,
+                    placeholder="192.168.20.0/24 2 200",
+                ),
                 rx.button("Save", type="submit"),
                 align="stretch",
                 spacing="1",
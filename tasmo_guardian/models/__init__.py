@@ -1,5 +1,5 @@
 # Models
-from tasmo_guardian.models.database import BACKUP_DIR, DATA_DIR, DB_PATH, db_session, get_engine, get_session
+from tasmo_guardian.models.database import BACKUP_DIR, DATA_DIR, DB_PATH, db_session, get_engine, get_session, run_db
 from tasmo_guardian.models.device import Backup, Base, Device, DeviceType, Setting
 
 __all__ = [
@@ -11,6 +11,7 @@ __all__ = [
     "get_engine",
     "get_session",
     "db_session",
+    "run_db",
     "DATA_DIR",
     "DB_PATH",
     "BACKUP_DIR",
@@ -1,9 +1,14 @@
 """Database connection and session management."""
 
+import asyncio
+import functools
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
 from contextlib import contextmanager
 from pathlib import Path
+from typing import TypeVar
 
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import Session, sessionmaker
 
 from tasmo_guardian.models.device import Base
@@ -12,7 +17,32 @@ DATA_DIR = Path("data")
 DB_PATH = DATA_DIR / "tasmobackupdb.sqlite3"
 BACKUP_DIR = DATA_DIR / "backups"
 
+# Applied to every new connection. WAL lets readers run alongside a writer,
+# busy_timeout waits out short write locks instead of failing immediately.
+SQLITE_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "busy_timeout": 5000,
+    "cache_size": -16000,  # KiB, i.e. 16 MB
+    "mmap_size": 64 * 1024 * 1024,
+    "temp_store": "MEMORY",
+}
+POOL_SIZE = 10
+MAX_OVERFLOW = 10
+
 _engine = None
+_session_factory = None
+# One DB worker thread per pooled connection keeps threads from queueing on the pool
+_db_executor = ThreadPoolExecutor(max_workers=POOL_SIZE, thread_name_prefix="db")
+
+T = TypeVar("T")
+
+
+def _apply_sqlite_pragmas(dbapi_connection, connection_record) -> None:
+    cursor = dbapi_connection.cursor()
+    for name, value in SQLITE_PRAGMAS.items():
+        cursor.execute(f"PRAGMA {name}={value}")
+    cursor.close()
 
 
 def get_engine():
@@ -20,13 +50,27 @@ def get_engine():
     if _engine is None:
         DATA_DIR.mkdir(exist_ok=True)
         BACKUP_DIR.mkdir(exist_ok=True)
-        _engine = create_engine(f"sqlite:///{DB_PATH}")
+        _engine = create_engine(
+            f"sqlite:///{DB_PATH}",
+            pool_size=POOL_SIZE,
+            max_overflow=MAX_OVERFLOW,
+            connect_args={"check_same_thread": False},
+        )
+        event.listen(_engine, "connect", _apply_sqlite_pragmas)
         Base.metadata.create_all(_engine)
+        # create_all skips indexes on tables that already exist
+        for table in Base.metadata.sorted_tables:
+            for index in table.indexes:
+                index.create(_engine, checkfirst=True)
     return _engine
 
 
 def get_session() -> Session:
-    return sessionmaker(bind=get_engine())()
+    global _session_factory
+    engine = get_engine()
+    if _session_factory is None or _session_factory.kw["bind"] is not engine:
+        _session_factory = sessionmaker(bind=engine)
+    return _session_factory()
 
 
 @contextmanager
@@ -40,3 +84,9 @@ def db_session():
         raise
     finally:
         session.close()
+
+
+async def run_db(fn: Callable[..., T], *args, **kwargs) -> T:
+    """Run blocking database work on the DB thread pool, off the event loop."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_db_executor, functools.partial(fn, *args, **kwargs))
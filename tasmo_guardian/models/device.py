@@ -28,6 +28,12 @@ class Device(Base):
 
     backups = relationship("Backup", back_populates="device", cascade="all, delete-orphan")
 
+    __table_args__ = (
+        Index("devicesname", "name"),
+        Index("devicesip", "ip"),
+        Index("devicesmac", "mac"),
+    )
+
 
 class Backup(Base):
     __tablename__ = "backups"
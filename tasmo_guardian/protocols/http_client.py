@@ -0,0 +1,56 @@
+"""Shared HTTP client - pooled, keep-alive connections for device protocols."""
+
+import asyncio
+import os
+from contextlib import asynccontextmanager
+from typing import BinaryIO
+
+import httpx
+
+MAX_CONNECTIONS = int(os.environ.get("HTTP_MAX_CONNECTIONS", "50"))
+MAX_KEEPALIVE_CONNECTIONS = int(os.environ.get("HTTP_MAX_KEEPALIVE_CONNECTIONS", "20"))
+KEEPALIVE_EXPIRY = float(os.environ.get("HTTP_KEEPALIVE_EXPIRY", "30"))
+
+POOL_LIMITS = httpx.Limits(
+    max_connections=MAX_CONNECTIONS,
+    max_keepalive_connections=MAX_KEEPALIVE_CONNECTIONS,
+    keepalive_expiry=KEEPALIVE_EXPIRY,
+)
+DEFAULT_TIMEOUT = httpx.Timeout(30.0, connect=30.0)
+
+_client: httpx.AsyncClient | None = None
+
+
+def get_client() -> httpx.AsyncClient:
+    """Return the shared client, creating it on first use."""
+    global _client
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(limits=POOL_LIMITS, timeout=DEFAULT_TIMEOUT)
+    return _client
+
+
+async def close_client() -> None:
+    """Close the shared client and release pooled connections."""
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+async def write_stream(response: httpx.Response, f: BinaryIO) -> int:
+    """Write a streamed response body to a file off the event loop."""
+    written = 0
+    async for chunk in response.aiter_bytes():
+        await asyncio.to_thread(f.write, chunk)
+        written += len(chunk)
+    return written
+
+
+@asynccontextmanager
+async def http_client_lifespan():
+    """App lifespan task owning the shared client."""
+    get_client()
+    try:
+        yield
+    finally:
+        await close_client()
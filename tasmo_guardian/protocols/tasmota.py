@@ -1,7 +1,11 @@
 """Tasmota device protocol - detection and metadata retrieval."""
 
+from pathlib import Path
+
 import httpx
 
+from .http_client import get_client, write_stream
+
 VERSION = "2.0.0"
 TIMEOUT = httpx.Timeout(30.0, connect=30.0)
 BACKUP_TIMEOUT = httpx.Timeout(60.0, connect=30.0)
@@ -30,52 +34,95 @@ def parse_tasmota_status(data: dict) -> dict | None:
             return None
 
 
+def parse_tasmota_fingerprint(data: dict) -> str | None:
+    """Build a config fingerprint from a Status 1 response using match/case."""
+    match data:
+        case {
+            "StatusPRM": {
+                "CfgHolder": cfg_holder,
+                "SaveCount": save_count,
+                "BootCount": boot_count,
+            }
+        }:
+            return f"tasmota:{cfg_holder}:{save_count}:{boot_count}"
+        case _:
+            return None
+
+
 async def detect_tasmota(ip: str, password: str | None = None) -> dict | None:
     """Detect Tasmota device and return metadata or None."""
     try:
-        async with httpx.AsyncClient(timeout=TIMEOUT) as client:
-            auth = (password, "") if password else None
-            response = await client.get(
-                f"http://{ip}/cm?cmnd=status%200",
-                headers=get_headers(ip),
-                auth=auth,
-            )
-            if response.status_code != 200:
-                return None
-            return parse_tasmota_status(response.json())
+        auth = (password, "") if password else None
+        response = await get_client().get(
+            f"http://{ip}/cm?cmnd=status%200",
+            headers=get_headers(ip),
+            auth=auth,
+            timeout=TIMEOUT,
+        )
+        if response.status_code != 200:
+            return None
+        return parse_tasmota_status(response.json())
+    except Exception:
+        return None
+
+
+async def get_tasmota_fingerprint(
+    ip: str, password: str | None = None, timeout: httpx.Timeout | None = None
+) -> str | None:
+    """Fetch Status 1 and return a config fingerprint, or None."""
+    try:
+        auth = (password, "") if password else None
+        response = await get_client().get(
+            f"http://{ip}/cm?cmnd=status%201",
+            headers=get_headers(ip),
+            auth=auth,
+            timeout=timeout or TIMEOUT,
+        )
+        if response.status_code != 200:
+            return None
+        return parse_tasmota_fingerprint(response.json())
     except Exception:
         return None
 
 
-async def download_tasmota_backup(ip: str, password: str | None = None) -> bytes | None:
-    """Download Tasmota .dmp backup file."""
+async def download_tasmota_backup(
+    ip: str, dest: Path, password: str | None = None, timeout: httpx.Timeout | None = None
+) -> int | None:
+    """Stream Tasmota .dmp backup to dest. Returns bytes written or None."""
     try:
-        async with httpx.AsyncClient(timeout=BACKUP_TIMEOUT) as client:
-            auth = (password, "") if password else None
-            response = await client.get(
-                f"http://{ip}/dl",
-                headers=get_headers(ip),
-                auth=auth,
-            )
+        auth = (password, "") if password else None
+        async with get_client().stream(
+            "GET",
+            f"http://{ip}/dl",
+            headers=get_headers(ip),
+            auth=auth,
+            timeout=timeout or BACKUP_TIMEOUT,
+        ) as response:
             if response.status_code != 200:
                 return None
-            return response.content
+            with dest.open("wb") as f:
+                return await write_stream(response, f)
     except Exception:
         return None
 
 
-async def restore_tasmota_config(ip: str, backup_data: bytes, password: str | None = None) -> bool:
+async def restore_tasmota_config(
+    ip: str,
+    backup_data: bytes,
+    password: str | None = None,
+    timeout: httpx.Timeout | None = None,
+) -> bool:
     """Restore Tasmota config from .dmp file."""
     try:
-        async with httpx.AsyncClient(timeout=BACKUP_TIMEOUT) as client:
-            auth = (password, "") if password else None
-            files = {"u1": ("config.dmp", backup_data, "application/octet-stream")}
-            response = await client.post(
-                f"http://{ip}/u2",
-                headers=get_headers(ip),
-                auth=auth,
-                files=files,
-            )
-            return response.status_code == 200
+        auth = (password, "") if password else None
+        files = {"u1": ("config.dmp", backup_data, "application/octet-stream")}
+        response = await get_client().post(
+            f"http://{ip}/u2",
+            headers=get_headers(ip),
+            auth=auth,
+            files=files,
+            timeout=timeout or BACKUP_TIMEOUT,
+        )
+        return response.status_code == 200
     except Exception:
         return False
@@ -1,12 +1,18 @@
 """WLED device protocol - detection and metadata retrieval."""
 
-import io
+import hashlib
 import zipfile
+from pathlib import Path
 
 import httpx
 
+from .http_client import get_client, write_stream
+
 TIMEOUT = httpx.Timeout(30.0, connect=30.0)
 WLED_BACKUP_EXT = "zip"
+WLED_BACKUP_FILES = ("presets.json", "cfg.json")
+# Fixed entry timestamp so identical configs produce identical ZIP bytes
+ZIP_DATE_TIME = (1980, 1, 1, 0, 0, 0)
 
 
 def parse_wled_info(data: dict) -> dict | None:
@@ -18,33 +24,64 @@ def parse_wled_info(data: dict) -> dict | None:
             return None
 
 
+def parse_wled_presets_mtime(data: dict) -> int | None:
+    """Extract presets.json modification time from /json/info using match/case."""
+    match data:
+        case {"fs": {"pmt": pmt}}:
+            return pmt
+        case _:
+            return None
+
+
+def _zip_entry(name: str) -> zipfile.ZipInfo:
+    """Return a deterministic ZIP entry for a backup file."""
+    entry = zipfile.ZipInfo(name, date_time=ZIP_DATE_TIME)
+    entry.compress_type = zipfile.ZIP_DEFLATED
+    return entry
+
+
 async def detect_wled(ip: str) -> dict | None:
     """Detect WLED device and return metadata or None."""
     try:
-        async with httpx.AsyncClient(timeout=TIMEOUT) as client:
-            response = await client.get(f"http://{ip}/json/info")
-            if response.status_code != 200:
-                return None
-            return parse_wled_info(response.json())
+        response = await get_client().get(f"http://{ip}/json/info", timeout=TIMEOUT)
+        if response.status_code != 200:
+            return None
+        return parse_wled_info(response.json())
     except Exception:
         return None
 
 
-async def download_wled_backup(ip: str) -> bytes | None:
-    """Download WLED backup as ZIP containing presets.json and cfg.json."""
+async def download_wled_backup(
+    ip: str, dest: Path, timeout: httpx.Timeout | None = None
+) -> int | None:
+    """Stream presets.json and cfg.json into a ZIP at dest. Returns size or None."""
     try:
-        async with httpx.AsyncClient(timeout=TIMEOUT) as client:
-            presets_resp = await client.get(f"http://{ip}/presets.json")
-            cfg_resp = await client.get(f"http://{ip}/cfg.json")
+        client = get_client()
+        with zipfile.ZipFile(dest, "w") as zf:
+            for name in WLED_BACKUP_FILES:
+                async with client.stream(
+                    "GET", f"http://{ip}/{name}", timeout=timeout or TIMEOUT
+                ) as response:
+                    if response.status_code != 200:
+                        return None
+                    with zf.open(_zip_entry(name), "w") as entry:
+                        await write_stream(response, entry)
+        return dest.stat().st_size
+    except Exception:
+        return None
 
-            if presets_resp.status_code != 200 or cfg_resp.status_code != 200:
-                return None
 
-            zip_buffer = io.BytesIO()
-            with zipfile.ZipFile(zip_buffer, "w", zipfile.ZIP_DEFLATED) as zf:
-                zf.writestr("presets.json", presets_resp.content)
-                zf.writestr("cfg.json", cfg_resp.content)
+async def get_wled_fingerprint(ip: str, timeout: httpx.Timeout | None = None) -> str | None:
+    """Hash cfg.json plus the presets modification time, or None."""
+    try:
+        client = get_client()
+        cfg_resp = await client.get(f"http://{ip}/cfg.json", timeout=timeout or TIMEOUT)
+        info_resp = await client.get(f"http://{ip}/json/info", timeout=timeout or TIMEOUT)
+
+        if cfg_resp.status_code != 200 or info_resp.status_code != 200:
+            return None
 
-            return zip_buffer.getvalue()
+        digest = hashlib.sha256(cfg_resp.content).hexdigest()
+        return f"wled:{digest}:{parse_wled_presets_mtime(info_resp.json())}"
     except Exception:
         return None
@@ -1,39 +1,296 @@
 """Backup service - device backup operations."""
 
+import asyncio
+import hashlib
+import inspect
+import json
+import os
 import re
+import time
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass
 from datetime import datetime, timedelta
 from pathlib import Path
 
-from ..protocols.tasmota import download_tasmota_backup, restore_tasmota_config
-from ..protocols.wled import download_wled_backup
+from sqlalchemy import func
+
+from ..models.database import db_session, run_db
+from ..models.device import Backup, Device
+from ..protocols.tasmota import (
+    download_tasmota_backup,
+    get_tasmota_fingerprint,
+    restore_tasmota_config,
+)
+from ..protocols.wled import download_wled_backup, get_wled_fingerprint
 from ..utils.logging import logger
+from . import health, network
+from .concurrency import AdaptiveLimiter
+from .device_changes import publish_device_changes
+from .progress import ProgressEvent, ProgressStream
+from .settings import get_settings
 
 BACKUP_DIR = Path("data/backups")
+INITIAL_CONCURRENT_BACKUPS = 4
+MAX_CONCURRENT_BACKUPS = 32
+INTERACTIVE_RESERVED_SLOTS = 1
+OUTCOME_BATCH_SIZE = 25
+OUTCOME_BATCH_SECONDS = 5.0
 BACKUP_PATTERN = re.compile(
     r"([A-Fa-f0-9:]+)-(\d{4}-\d{2}-\d{2}_\d{2}_\d{2}_\d{2})-v(.+)\.(dmp|zip)"
 )
 
 
-def count_device_backups(device_name: str) -> int:
-    """Count backup files for a device."""
-    device_dir = BACKUP_DIR / device_name
-    if not device_dir.exists():
-        return 0
-    return sum(1 for f in device_dir.iterdir() if BACKUP_PATTERN.match(f.name))
+@dataclass
+class DeviceSnapshot:
+    """Detached copy of a device row, safe to use across network awaits."""
+
+    id: int
+    name: str
+    ip: str
+    mac: str
+    type: int
+    version: str
+    password: str | None
+    lastbackup: datetime | None
+
+    @classmethod
+    def from_device(cls, device: Device) -> "DeviceSnapshot":
+        return cls(
+            id=device.id,
+            name=device.name,
+            ip=device.ip,
+            mac=device.mac,
+            type=device.type,
+            version=device.version,
+            password=device.password,
+            lastbackup=device.lastbackup,
+        )
+
+
+def load_device_snapshots() -> list[DeviceSnapshot]:
+    """Read all devices in one short session."""
+    with db_session() as session:
+        return [DeviceSnapshot.from_device(d) for d in session.query(Device).all()]
+
+
+def load_device_snapshot(device_id: int) -> DeviceSnapshot | None:
+    """Read one device in a short session."""
+    with db_session() as session:
+        device = session.get(Device, device_id)
+        return DeviceSnapshot.from_device(device) if device else None
+
+
+def count_device_backups(device_id: int) -> int:
+    """Count indexed backups for a device."""
+    with db_session() as session:
+        return (
+            session.query(func.count(Backup.id))
+            .filter(Backup.deviceid == device_id)
+            .scalar()
+        )
+
+
+def parse_backup_data(data: str | None) -> dict:
+    """Parse the size/hash/fingerprint metadata stored in Backup.data using match/case."""
+    try:
+        parsed = json.loads(data) if data else None
+    except ValueError:
+        return {}
+    match parsed:
+        case {"size": int(size), "sha256": str(digest), "fingerprint": str(fingerprint)}:
+            return {"size": size, "sha256": digest, "fingerprint": fingerprint}
+        case {"size": int(size), "sha256": str(digest)}:
+            return {"size": size, "sha256": digest}
+        case _:
+            return {}
+
+
+def backup_entry(backup: Backup) -> dict:
+    """Convert an indexed Backup row to a history entry."""
+    meta = parse_backup_data(backup.data)
+    return {
+        "id": backup.id,
+        "filename": Path(backup.filename).name,
+        "date": backup.date,
+        "version": backup.version,
+        "size": meta.get("size", 0),
+        "sha256": meta.get("sha256"),
+        "fingerprint": meta.get("fingerprint"),
+        "path": backup.filename,
+    }
+
+
+def index_backup(device, filepath: Path, date: datetime, size: int, digest: str) -> None:
+    """Add a backup file to the Backup index, or update its row if present.
+
+    A reconcile can index the file between it being moved into place and
+    this call, so the row is looked up by filename first.
+    """
+    with db_session() as session:
+        row = session.query(Backup).filter(Backup.filename == str(filepath)).first()
+        if row is None:
+            row = Backup(filename=str(filepath))
+            session.add(row)
+        row.deviceid = device.id
+        row.name = device.name
+        row.version = device.version
+        row.date = date
+        row.data = json.dumps({"size": size, "sha256": digest})
+
+
+def store_fingerprint(device_id: int, fingerprint: str) -> None:
+    """Record the config fingerprint in the device's latest indexed backup."""
+    with db_session() as session:
+        backup = (
+            session.query(Backup)
+            .filter(Backup.deviceid == device_id)
+            .order_by(Backup.date.desc(), Backup.id.desc())
+            .first()
+        )
+        if backup:
+            backup.data = json.dumps(parse_backup_data(backup.data) | {"fingerprint": fingerprint})
+
+
+async def probe_config_fingerprint(device) -> str | None:
+    """Fetch a cheap config fingerprint used to detect unchanged devices."""
+    start = time.monotonic()
+    timeout = health.adaptive_timeout(device.id, "request")
+    if device.type == 0:  # Tasmota
+        fingerprint = await get_tasmota_fingerprint(device.ip, device.password or None, timeout)
+    else:
+        fingerprint = await get_wled_fingerprint(device.ip, timeout)
+    if fingerprint:
+        health.record_latency(device.id, "request", time.monotonic() - start)
+    return fingerprint
+
+
+def file_sha256(path: Path) -> str:
+    """Return the SHA-256 hex digest of a file."""
+    with path.open("rb") as f:
+        return hashlib.file_digest(f, "sha256").hexdigest()
+
+
+def commit_backup_file(latest: dict | None, tmp_path: Path, filepath: Path) -> tuple[str, bool]:
+    """Atomically move a finished download into place.
+
+    Hardlinks the latest backup instead when the content is identical.
+    Returns the content hash and whether the download was deduplicated.
+    """
+    digest = file_sha256(tmp_path)
+    if latest and latest["sha256"] == digest:
+        try:
+            os.link(latest["path"], filepath)
+            tmp_path.unlink()
+            return digest, True
+        except OSError:
+            pass  # Missing file or no hardlink support - keep the downloaded copy
+
+    os.replace(tmp_path, filepath)
+    return digest, False
+
+
+def record_backup(device, filepath: Path, date: datetime, size: int, digest: str) -> None:
+    """Index a new backup, then apply the configured retention to the device."""
+    index_backup(device, filepath, date, size, digest)
+    settings = get_settings()
+    cleanup_old_backups(device.id, settings.backup_max_days, settings.backup_max_count)
+
+
+_in_flight: dict[int, asyncio.Future] = {}
 
 
 async def backup_device(device) -> bool:
-    """Backup single device. Returns True on success."""
+    """Backup single device. Returns True on success.
+
+    A device already being backed up is not downloaded again; the caller
+    waits for and shares the in-flight result. If the owner is cancelled,
+    callers sharing its result see a failed backup rather than the
+    cancellation, which belongs to the owner alone.
+    """
+    if (pending := _in_flight.get(device.id)) is not None:
+        logger.info("backup_operation", operation="backup_device", device_id=device.id, outcome="attached")
+        return await asyncio.shield(pending)
+
+    pending = _in_flight[device.id] = asyncio.get_running_loop().create_future()
+    try:
+        result = await _backup_device(device)
+    except asyncio.CancelledError:
+        pending.set_result(False)
+        raise
+    except Exception as e:
+        pending.set_exception(e)
+        # Mark retrieved so an unobserved failure is not reported twice
+        pending.exception()
+        raise
+    else:
+        pending.set_result(result)
+        return result
+    finally:
+        del _in_flight[device.id]
+
+
+async def finish_cancelled(aw: Awaitable):
+    """Await aw to completion even if cancelled meanwhile, then re-raise.
+
+    For short steps that must not stop halfway, like committing a download.
+    """
+    task = asyncio.ensure_future(aw)
+    try:
+        return await asyncio.shield(task)
+    except asyncio.CancelledError:
+        await task
+        raise
+
+
+async def commit_download(device, tmp_path: Path, filepath: Path, date: datetime, size: int) -> bool:
+    """Move a finished download into place and index it. Returns whether it was deduplicated."""
+    history = await run_db(get_backup_history, device.id, limit=1)
+    digest, deduplicated = await asyncio.to_thread(
+        commit_backup_file, history[0] if history else None, tmp_path, filepath
+    )
+    await run_db(record_backup, device, filepath, date, size, digest)
+    return deduplicated
+
+
+async def _backup_device(device) -> bool:
+    """Download, deduplicate and index one backup.
+
+    The download is streamed to a hidden temp file in the device directory
+    and only renamed to its final backup name once complete. Cancelling
+    aborts the download and removes the temp file; a download that already
+    finished is still committed.
+    """
     start = datetime.now()
+    ext = "dmp" if device.type == 0 else "zip"
 
-    if device.type == 0:  # Tasmota
-        data = await download_tasmota_backup(device.ip, device.password or None)
-        ext = "dmp"
-    else:  # WLED
-        data = await download_wled_backup(device.ip)
-        ext = "zip"
+    device_dir = BACKUP_DIR / device.name
+    device_dir.mkdir(parents=True, exist_ok=True)
 
-    if data is None:
+    timestamp = start.strftime("%Y-%m-%d_%H_%M_%S")
+    filename = f"{device.mac}-{timestamp}-v{device.version}.{ext}"
+    filepath = device_dir / filename
+    tmp_path = device_dir / f".{filename}.part"
+
+    timeout = health.adaptive_timeout(device.id, "transfer")
+    download_start = time.monotonic()
+    try:
+        if device.type == 0:  # Tasmota
+            size = await download_tasmota_backup(
+                device.ip, tmp_path, device.password or None, timeout
+            )
+        else:  # WLED
+            size = await download_wled_backup(device.ip, tmp_path, timeout)
+
+        if size is not None:
+            health.record_latency(device.id, "transfer", time.monotonic() - download_start)
+            network.spend(device.ip, size)
+            deduplicated = await finish_cancelled(
+                commit_download(device, tmp_path, filepath, start, size)
+            )
+    finally:
+        tmp_path.unlink(missing_ok=True)
+
+    if size is None:
         logger.info(
             "backup_operation",
             operation="backup_device",
@@ -42,81 +299,288 @@ async def backup_device(device) -> bool:
         )
         return False
 
-    device_dir = BACKUP_DIR / device.name
-    device_dir.mkdir(parents=True, exist_ok=True)
-
-    timestamp = datetime.now().strftime("%Y-%m-%d_%H_%M_%S")
-    filename = f"{device.mac}-{timestamp}-v{device.version}.{ext}"
-    filepath = device_dir / filename
-
-    filepath.write_bytes(data)
-
     logger.info(
         "backup_operation",
         operation="backup_device",
         device_id=device.id,
         device_ip=device.ip,
         filename=str(filename),
-        size_bytes=len(data),
+        size_bytes=size,
+        deduplicated=deduplicated,
         outcome="success",
         duration_ms=int((datetime.now() - start).total_seconds() * 1000),
     )
     return True
 
 
-async def backup_all_devices(devices: list, min_hours: int = 24) -> dict:
-    """Backup all devices, skipping recent backups."""
-    results = {"backed_up": 0, "skipped": 0, "failed": 0}
-    cutoff = datetime.now() - timedelta(hours=min_hours)
+def apply_backup_outcomes(outcomes: dict[int, datetime]) -> None:
+    """Write lastbackup and refreshed backup counts in one short transaction."""
+    if not outcomes:
+        return
+    changes = {}
+    with db_session() as session:
+        counts = dict(
+            session.query(Backup.deviceid, func.count(Backup.id))
+            .filter(Backup.deviceid.in_(outcomes))
+            .group_by(Backup.deviceid)
+            .all()
+        )
+        for device in session.query(Device).filter(Device.id.in_(outcomes)):
+            device.lastbackup = outcomes[device.id]
+            device.noofbackups = counts.get(device.id, 0)
+            changes[device.id] = {
+                "lastbackup": str(device.lastbackup),
+                "noofbackups": device.noofbackups,
+            }
+    publish_device_changes(changes)
+
+
+class BackupOutcomeBatcher:
+    """Collect successful backups and apply them in short batched writes.
+
+    Flushes every batch_size outcomes or interval seconds, whichever first.
+    """
+
+    def __init__(
+        self,
+        batch_size: int = OUTCOME_BATCH_SIZE,
+        interval: float = OUTCOME_BATCH_SECONDS,
+    ):
+        self.batch_size = batch_size
+        self.interval = interval
+        self.pending: dict[int, datetime] = {}
+        self.last_flush = time.monotonic()
+
+    async def add(self, device) -> None:
+        self.pending[device.id] = datetime.now()
+        if (
+            len(self.pending) >= self.batch_size
+            or time.monotonic() - self.last_flush >= self.interval
+        ):
+            await self.flush()
+
+    async def flush(self) -> None:
+        pending, self.pending = self.pending, {}
+        self.last_flush = time.monotonic()
+        await run_db(apply_backup_outcomes, pending)
+
+
+# Shared across runs so the learned limit carries over
+backup_limiter = AdaptiveLimiter(
+    "backup",
+    INITIAL_CONCURRENT_BACKUPS,
+    maximum=MAX_CONCURRENT_BACKUPS,
+    reserved=INTERACTIVE_RESERVED_SLOTS,
+)
 
-    for device in devices:
-        if device.lastbackup and device.lastbackup > cutoff:
-            results["skipped"] += 1
-            continue
 
-        success = await backup_device(device)
+async def run_interactive(operation: Callable[..., Awaitable[bool]], device, *args) -> bool:
+    """Run a single-device backup or restore a user is waiting on.
+
+    Takes an interactive slot in the shared backup limiter: it goes ahead of
+    every queued fleet device, and fleet runs leave a slot free for it.
+    """
+    async with backup_limiter.slot(interactive=True) as slot:
+        expected = health.expected_seconds(device.id)
+        success = await operation(device, *args)
         if success:
-            results["backed_up"] += 1
+            slot.succeeded(expected or None)
         else:
-            results["failed"] += 1
+            slot.failed()
+    return success
 
-    logger.info("backup_all_operation", operation="backup_all", **results, outcome="success")
-    return results
 
+def staleness_order(devices: list) -> list:
+    """Oldest lastbackup first, then devices never backed up."""
+    return sorted(devices, key=lambda d: (d.lastbackup is None, d.lastbackup or datetime.min))
+
+
+async def backup_all_devices(
+    devices: list,
+    min_hours: int = 24,
+    on_success: Callable | None = None,
+    max_concurrent: int | None = None,
+    progress: ProgressStream | None = None,
+    deadline: float | None = None,
+) -> dict:
+    """Backup all devices concurrently, skipping recent and unchanged backups.
+
+    Devices whose config fingerprint matches the one stored with their
+    latest indexed backup are counted as skipped without downloading, but
+    still passed to on_success since that backup is known to be current.
+    A device with no indexed backups is always downloaded.
+
+    An error while backing up one device counts it as failed; the run
+    carries on, and only returns once every device has finished.
+
+    Devices whose circuit breaker is open (see services/health.py) are
+    skipped without contacting them; outcomes feed the breaker.
+
+    Devices start in staleness order. With a deadline (seconds from now), a
+    device is only started if its expected duration fits in the time left;
+    the rest are deferred untouched, and come first in the next run since
+    they are still the stalest.
+
+    Concurrency is set by the shared adaptive limiter (see
+    services/concurrency.py), which learns what the network and devices
+    tolerate across runs; max_concurrent pins a fixed limit instead.
+    Devices first take a slot in their subnet (see services/network.py),
+    and are interleaved across subnets within the staleness order.
+
+    When a progress stream is given, each device emits "started" when it
+    gets a slot and its outcome with a duration when done.
+    """
+    if max_concurrent is None:
+        limiter = backup_limiter
+    else:
+        limiter = AdaptiveLimiter("backup", max_concurrent, maximum=max_concurrent, minimum=max_concurrent)
+    topology = network.get_topology((await run_db(get_settings)).network_limits)
+    ends_at = time.monotonic() + deadline if deadline is not None else None
+    cutoff = datetime.now() - timedelta(hours=min_hours)
+    start = datetime.now()
+    durations: list[tuple[int, str]] = []
+
+    def emit(device, status: str, duration_ms: int | None = None) -> None:
+        if progress:
+            progress.emit(ProgressEvent(device.id, device.name, status, duration_ms))
 
-def get_backup_history(device_name: str) -> list[dict]:
-    """Get backup history for a device."""
-    device_dir = BACKUP_DIR / device_name
-    if not device_dir.exists():
-        return []
-
-    backups = []
-    for file in device_dir.iterdir():
-        if match := BACKUP_PATTERN.match(file.name):
-            mac, date_str, version, ext = match.groups()
-            backups.append(
-                {
-                    "filename": file.name,
-                    "date": datetime.strptime(date_str, "%Y-%m-%d_%H_%M_%S"),
-                    "version": version,
-                    "size": file.stat().st_size,
-                    "path": str(file),
-                }
+    circuit_open = 0
+
+    async def backup_one(device) -> str:
+        nonlocal circuit_open
+        if device.lastbackup and device.lastbackup > cutoff:
+            emit(device, "skipped")
+            return "skipped"
+        if not health.allow_attempt(device.id):
+            circuit_open += 1
+            emit(device, "skipped")
+            return "skipped"
+        try:
+            return await attempt(device)
+        except Exception as e:
+            # One device's error must not abort the run and orphan the rest
+            logger.error(
+                "backup_operation",
+                operation="backup_device",
+                device_id=device.id,
+                error=str(e),
+                outcome="failed",
             )
+            health.record_failure(device.id)
+            emit(device, "failed")
+            return "failed"
+        finally:
+            # Deferred or cancelled attempts record no outcome; free the probe
+            health.release_probe(device.id)
+
+    async def attempt(device) -> str:
+        async with topology.segment(device.ip).slot(), limiter.slot() as slot:
+            expected = health.expected_seconds(device.id)
+            if ends_at is not None and time.monotonic() + expected > ends_at:
+                emit(device, "deferred")
+                return "deferred"
+            emit(device, "started")
+            device_start = time.monotonic()
+            fingerprint = await probe_config_fingerprint(device)
+            latest = await run_db(get_backup_history, device.id, limit=1) if fingerprint else []
+            if latest and latest[0]["fingerprint"] == fingerprint:
+                outcome = "unchanged"
+            else:
+                outcome = "backed_up" if await backup_device(device) else "failed"
+            duration_ms = int((time.monotonic() - device_start) * 1000)
+            durations.append((duration_ms, device.name))
+            if outcome == "failed":
+                slot.failed()
+            else:
+                slot.succeeded(expected or None)
+
+        if outcome == "failed":
+            health.record_failure(device.id)
+            emit(device, outcome, duration_ms)
+            return outcome
+        health.record_success(device.id)
+        if outcome == "backed_up" and fingerprint:
+            await run_db(store_fingerprint, device.id, fingerprint)
+        if on_success and inspect.isawaitable(result := on_success(device)):
+            await result
+        emit(device, outcome, duration_ms)
+        return outcome
+
+    # Limiter waiters are served in order, so this is also the start order
+    ordered = topology.interleave(staleness_order(devices))
+    outcomes = await asyncio.gather(*[backup_one(device) for device in ordered])
+
+    results = {"backed_up": 0, "skipped": 0, "failed": 0, "deferred": 0}
+    unchanged = 0
+    for outcome in outcomes:
+        if outcome == "unchanged":
+            unchanged += 1
+            outcome = "skipped"
+        results[outcome] += 1
+
+    logger.info(
+        "backup_all_operation",
+        operation="backup_all",
+        **results,
+        unchanged=unchanged,
+        circuit_open=circuit_open,
+        max_concurrent=limiter.current,
+        deadline_s=deadline,
+        slowest_devices=[f"{name} ({ms} ms)" for ms, name in sorted(durations, key=lambda d: d[0], reverse=True)[:5]],
+        outcome="success",
+        duration_ms=int((datetime.now() - start).total_seconds() * 1000),
+    )
+    return results
 
-    return sorted(backups, key=lambda x: x["date"], reverse=True)
+
+async def run_fleet_backup(
+    devices: list[DeviceSnapshot],
+    min_hours: int = 24,
+    progress: ProgressStream | None = None,
+    deadline: float | None = None,
+) -> dict:
+    """Backup device snapshots, writing outcomes in batches outside any long session."""
+    batcher = BackupOutcomeBatcher()
+    try:
+        return await backup_all_devices(
+            devices,
+            min_hours=min_hours,
+            on_success=batcher.add,
+            progress=progress,
+            deadline=deadline,
+        )
+    finally:
+        await batcher.flush()
+        await asyncio.to_thread(health.save_health)
+        if progress:
+            progress.close()
+
+
+def get_backup_history(device_id: int, limit: int | None = None) -> list[dict]:
+    """Get indexed backup history for a device, newest first."""
+    with db_session() as session:
+        query = (
+            session.query(Backup)
+            .filter(Backup.deviceid == device_id)
+            .order_by(Backup.date.desc(), Backup.id.desc())
+        )
+        if limit is not None:
+            query = query.limit(limit)
+        return [backup_entry(b) for b in query.all()]
 
 
 def delete_backup(filepath: str) -> None:
-    """Delete a backup file."""
+    """Delete a backup file and its index entry."""
     path = Path(filepath)
     if path.exists():
         path.unlink()
+    with db_session() as session:
+        session.query(Backup).filter(Backup.filename == filepath).delete()
 
 
-def cleanup_old_backups(device_name: str, max_days: int, max_count: int) -> None:
+def cleanup_old_backups(device_id: int, max_days: int, max_count: int) -> None:
     """Clean up old backups based on retention settings."""
-    backups = get_backup_history(device_name)
+    backups = get_backup_history(device_id)
     cutoff_date = datetime.now() - timedelta(days=max_days)
 
     deleted_by_age = 0
@@ -133,13 +597,13 @@ def cleanup_old_backups(device_name: str, max_days: int, max_count: int) -> None
             deleted_by_count += 1
 
         if should_delete:
-            Path(backup["path"]).unlink()
+            delete_backup(backup["path"])
 
     if deleted_by_age or deleted_by_count:
         logger.info(
             "retention_cleanup",
             operation="retention_cleanup",
-            device=device_name,
+            device_id=device_id,
             deleted_by_age=deleted_by_age,
             deleted_by_count=deleted_by_count,
             outcome="success",
@@ -152,7 +616,12 @@ async def restore_device(device, backup_path: str) -> bool:
         return False
 
     backup_data = Path(backup_path).read_bytes()
-    success = await restore_tasmota_config(device.ip, backup_data, device.password)
+    start = time.monotonic()
+    success = await restore_tasmota_config(
+        device.ip, backup_data, device.password, health.adaptive_timeout(device.id, "transfer")
+    )
+    if success:
+        health.record_latency(device.id, "transfer", time.monotonic() - start)
 
     logger.info(
         "restore_operation",
@@ -0,0 +1,157 @@
+"""Adaptive concurrency - AIMD limits for fleet backups and scans.
+
+ESP web servers and consumer Wi-Fi fall over well before any fixed limit
+that suits a wired network, so the number of simultaneous requests is
+learned per process instead. Each success with healthy latency raises the
+limit by about one per window of requests (additive increase); a failure
+cuts it by DECREASE_FACTOR (multiplicative decrease), at most once per
+window so that a burst of timeouts from the same window counts once.
+Successes that are much slower than usual hold the limit where it is.
+
+Interactive work (a user waiting on one device) has its own lane: its
+waiters are served before any fleet waiter, and a limiter can reserve
+slots that fleet work never takes, so a click does not queue behind a
+large run.
+"""
+
+import asyncio
+import time
+from collections import deque
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+
+from ..utils.logging import logger
+
+DECREASE_FACTOR = 0.5
+LATENCY_TOLERANCE = 2.0
+BASELINE_DRIFT = 0.05
+# Below this, latency differences are jitter rather than congestion
+LATENCY_FLOOR = 0.1
+
+
+class Slot:
+    """Outcome of the work done while holding one slot of a limiter.
+
+    Leaving it unset gives no feedback (e.g. work skipped without a
+    request); an exception escaping the slot counts as a failure.
+    """
+
+    def __init__(self):
+        self.ok: bool | None = None
+        self.expected: float | None = None
+
+    def succeeded(self, expected: float | None = None) -> None:
+        """Mark success; expected is the usual duration, if known."""
+        self.ok = True
+        self.expected = expected
+
+    def failed(self) -> None:
+        self.ok = False
+
+
+class AdaptiveLimiter:
+    """Concurrency limit adjusted from request outcomes (AIMD).
+
+    Waiters are served in FIFO order within each lane, like
+    asyncio.Semaphore; interactive waiters go first. Fleet work leaves
+    `reserved` slots free for interactive work, but always gets one.
+    """
+
+    def __init__(self, name: str, initial: int, maximum: int, minimum: int = 1, reserved: int = 0):
+        self.name = name
+        self.minimum = minimum
+        self.maximum = maximum
+        self.reserved = reserved
+        self.limit = float(min(max(initial, minimum), maximum))
+        self.in_flight = 0
+        self._waiters: deque[asyncio.Future] = deque()
+        self._interactive_waiters: deque[asyncio.Future] = deque()
+        self._baseline: float | None = None
+        self._last_cut = 0.0
+
+    @property
+    def current(self) -> int:
+        """Number of requests allowed at once right now."""
+        return int(self.limit)
+
+    def _capacity(self, interactive: bool) -> int:
+        if interactive:
+            return self.current
+        return max(self.current - self.reserved, 1)
+
+    @asynccontextmanager
+    async def slot(self, interactive: bool = False) -> AsyncIterator[Slot]:
+        """Hold one slot for the duration of the block."""
+        await self._acquire(interactive)
+        slot = Slot()
+        started = time.monotonic()
+        try:
+            yield slot
+        except Exception:
+            slot.failed()
+            raise
+        finally:
+            self._release(slot, started)
+
+    async def _acquire(self, interactive: bool) -> None:
+        waiter = asyncio.get_running_loop().create_future()
+        (self._interactive_waiters if interactive else self._waiters).append(waiter)
+        # Served at once if there is room and nobody is ahead
+        self._wake()
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # Handed a slot just as we were cancelled; pass it on
+                self.in_flight -= 1
+                self._wake()
+            raise
+
+    def _wake(self) -> None:
+        for waiters, interactive in ((self._interactive_waiters, True), (self._waiters, False)):
+            while waiters and self.in_flight < self._capacity(interactive):
+                waiter = waiters.popleft()
+                if not waiter.done():
+                    self.in_flight += 1
+                    waiter.set_result(None)
+
+    def _release(self, slot: Slot, started: float) -> None:
+        self.in_flight -= 1
+        if slot.ok is True:
+            self._on_success(time.monotonic() - started, slot.expected)
+        elif slot.ok is False:
+            self._on_failure(started)
+        self._wake()
+
+    def _on_success(self, latency: float, expected: float | None) -> None:
+        if expected is None:
+            if self._baseline is None or latency < self._baseline:
+                self._baseline = latency
+            else:
+                self._baseline += BASELINE_DRIFT * (latency - self._baseline)
+            expected = self._baseline
+        if latency > LATENCY_TOLERANCE * max(expected, LATENCY_FLOOR):
+            return
+        before = self.current
+        self.limit = min(self.limit + 1 / self.limit, float(self.maximum))
+        if self.current != before:
+            self._log("increased")
+
+    def _on_failure(self, started: float) -> None:
+        if started < self._last_cut:
+            # Started before the last cut; that cut already accounts for it
+            return
+        self._last_cut = time.monotonic()
+        before = self.current
+        self.limit = max(self.limit * DECREASE_FACTOR, float(self.minimum))
+        if self.current != before:
+            self._log("decreased")
+
+    def _log(self, outcome: str) -> None:
+        logger.info(
+            "concurrency_limit",
+            operation="concurrency_limit",
+            limiter=self.name,
+            limit=self.current,
+            outcome=outcome,
+        )
@@ -0,0 +1,69 @@
+"""Device change log - per-device field changes for incremental UI updates."""
+
+import threading
+from collections import deque
+
+CHANGE_LOG_SIZE = 1000
+
+
+class DeviceChangeLog:
+    """Sequence-numbered log of device changes.
+
+    Services publish the fields they changed per device id; None marks a
+    deleted device. Readers keep the last sequence number they applied and
+    ask for everything since. Readers whose cursor has fallen off the log,
+    or that missed a reset, get None and must reload.
+    """
+
+    def __init__(self, maxlen: int = CHANGE_LOG_SIZE):
+        self.seq = 0
+        self.reset_seq = 0
+        self.entries: deque[tuple[int, dict[int, dict | None]]] = deque(maxlen=maxlen)
+        self.lock = threading.Lock()
+
+    def publish(self, changes: dict[int, dict | None]) -> None:
+        """Record changed fields per device id."""
+        if not changes:
+            return
+        with self.lock:
+            self.seq += 1
+            self.entries.append((self.seq, changes))
+
+    def publish_reset(self) -> None:
+        """Record a change readers cannot patch in place, e.g. added devices."""
+        with self.lock:
+            self.seq += 1
+            self.reset_seq = self.seq
+
+    def since(self, seq: int) -> tuple[int, dict[int, dict | None] | None]:
+        """Return the current sequence and changes merged since seq."""
+        with self.lock:
+            if seq == self.seq:
+                return seq, {}
+            oldest = self.entries[0][0] if self.entries else self.seq + 1
+            if self.reset_seq > seq or oldest > seq + 1:
+                return self.seq, None
+
+            merged: dict[int, dict | None] = {}
+            for entry_seq, changes in self.entries:
+                if entry_seq <= seq:
+                    continue
+                for device_id, fields in changes.items():
+                    if fields is None or merged.get(device_id, {}) is None:
+                        merged[device_id] = None
+                    else:
+                        merged[device_id] = merged.get(device_id, {}) | fields
+            return self.seq, merged
+
+
+change_log = DeviceChangeLog()
+
+
+def publish_device_changes(changes: dict[int, dict | None]) -> None:
+    """Publish changed device fields to the shared change log."""
+    change_log.publish(changes)
+
+
+def publish_device_reset() -> None:
+    """Tell readers to reload instead of patching."""
+    change_log.publish_reset()
@@ -1,27 +1,104 @@
 """Device service - business logic for device operations."""
 
 import shutil
+import time
 from pathlib import Path
 
-from ..models.database import db_session
+from sqlalchemy import or_
+
+from ..models.database import db_session, run_db
 from ..models.device import Device
 from ..protocols.base import detect_device
+from . import health
+from .device_changes import publish_device_changes, publish_device_reset
 
 BACKUP_DIR = "data/backups"
+SORT_COLUMNS = {
+    "name": Device.name,
+    "ip": Device.ip,
+    "mac": Device.mac,
+    "version": Device.version,
+    "lastbackup": Device.lastbackup,
+    "noofbackups": Device.noofbackups,
+}
+
+
+def device_row(device: Device) -> dict:
+    """Serialize a device for the device table, without its password."""
+    return {
+        "id": device.id,
+        "name": device.name,
+        "ip": device.ip,
+        "mac": device.mac,
+        "type": device.type,
+        "version": device.version,
+        "lastbackup": str(device.lastbackup) if device.lastbackup else "",
+        "noofbackups": device.noofbackups or 0,
+        "has_password": bool(device.password),
+    }
+
+
+def query_devices(
+    filter_text: str = "",
+    sort_column: str = "name",
+    ascending: bool = True,
+    page: int = 1,
+    per_page: int = 25,
+) -> tuple[list[dict], int]:
+    """Return one sorted, filtered page of devices and the total match count."""
+    column = SORT_COLUMNS.get(sort_column, Device.name)
+    with db_session() as session:
+        query = session.query(Device)
+        if filter_text:
+            # Match the text literally: "%" and "_" are LIKE wildcards
+            text = filter_text.strip().replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+            pattern = f"%{text}%"
+            query = query.filter(
+                or_(
+                    Device.name.ilike(pattern, escape="\\"),
+                    Device.ip.ilike(pattern, escape="\\"),
+                    Device.mac.ilike(pattern, escape="\\"),
+                    Device.version.ilike(pattern, escape="\\"),
+                )
+            )
+        total = query.count()
+        rows = (
+            query.order_by(column.asc() if ascending else column.desc(), Device.id)
+            .limit(per_page)
+            .offset((max(page, 1) - 1) * per_page)
+            .all()
+        )
+        return [device_row(d) for d in rows], total
+
+
+def device_ip_exists(ip: str) -> bool:
+    """Check whether a device with this IP is already known."""
+    with db_session() as session:
+        return session.query(Device.id).filter(Device.ip == ip).first() is not None
+
+
+def insert_device(device: Device) -> Device:
+    """Persist a new device and return it with its id loaded."""
+    with db_session() as session:
+        session.add(device)
+        session.commit()
+        session.refresh(device)
+    publish_device_reset()
+    return device
 
 
 async def add_device(ip: str, password: str | None) -> Device | None:
     """Add a device by IP, detecting type automatically. Returns None if detection fails or duplicate."""
     # Check for duplicate IP
-    with db_session() as session:
-        existing = session.query(Device).filter(Device.ip == ip).first()
-        if existing:
-            return None
+    if await run_db(device_ip_exists, ip):
+        return None
 
     # Detect device
+    start = time.monotonic()
     info, device_type = await detect_device(ip, password)
     if info is None:
         return None
+    detect_seconds = time.monotonic() - start
 
     device = Device(
         ip=ip,
@@ -32,11 +109,8 @@ async def add_device(ip: str, password: str | None) -> Device | None:
         version=info["version"],
     )
 
-    with db_session() as session:
-        session.add(device)
-        session.commit()
-        session.refresh(device)
-
+    device = await run_db(insert_device, device)
+    health.record_latency(device.id, "request", detect_seconds)
     return device
 
 
@@ -50,6 +124,15 @@ def update_device(device_id: int, data: dict) -> None:
             if data.get("password"):
                 device.password = data["password"]
             session.commit()
+            publish_device_changes(
+                {
+                    device_id: {
+                        "name": device.name,
+                        "ip": device.ip,
+                        "has_password": bool(device.password),
+                    }
+                }
+            )
 
 
 def delete_device(device_id: int) -> None:
@@ -65,3 +148,4 @@ def delete_device(device_id: int) -> None:
             # Delete from database
             session.delete(device)
             session.commit()
+            publish_device_changes({device_id: None})
@@ -3,6 +3,9 @@
 import csv
 import io
 
+from ..models.database import db_session
+from ..models.device import Device
+
 
 def export_devices_csv(devices: list) -> str:
     """Export devices to CSV string."""
@@ -23,3 +26,9 @@ def export_devices_csv(devices: list) -> str:
         ])
 
     return output.getvalue()
+
+
+def export_all_devices_csv() -> str:
+    """Export every device in the database to a CSV string."""
+    with db_session() as session:
+        return export_devices_csv(session.query(Device).all())
@@ -0,0 +1,172 @@
+"""Device health - per-device circuit breaker for unreachable devices.
+
+The devices table is the frozen v1 schema, so failure state is kept in
+memory and persisted to a JSON sidecar in the data directory.
+
+After FAILURE_THRESHOLD consecutive failures a device's circuit opens and
+fleet runs skip it until its next-eligible time. The backoff doubles with
+every further failure, up to MAX_BACKOFF_SECONDS, with jitter so that
+devices that failed together do not all come back at once. Once the
+backoff has passed, one run probes the device (half-open); success closes
+the circuit, failure reopens it with a longer backoff.
+
+Successful requests also feed per-device latency estimates (smoothed mean
+and deviation, as TCP does for round-trip times). Timeouts are derived
+from them with a floor and ceiling. Devices with too few samples, or
+with recent failures, use the protocol's conservative defaults.
+"""
+
+import json
+import os
+import random
+import time
+from dataclasses import asdict, dataclass, field
+
+import httpx
+
+from ..models import database
+from ..utils.logging import logger
+
+HEALTH_FILE = "device_health.json"
+FAILURE_THRESHOLD = 2
+BASE_BACKOFF_SECONDS = 15 * 60
+MAX_BACKOFF_SECONDS = 24 * 3600
+
+LATENCY_ALPHA = 0.125
+LATENCY_BETA = 0.25
+MIN_LATENCY_SAMPLES = 3
+TIMEOUT_MULTIPLIER = 2.0
+# (floor, ceiling) in seconds: "request" for status calls, "transfer" for backup/restore
+TIMEOUT_LIMITS = {"request": (2.0, 30.0), "transfer": (5.0, 60.0)}
+
+
+@dataclass
+class DeviceHealth:
+    """Failure state of one device."""
+
+    failures: int = 0
+    next_eligible: float = 0.0
+    # kind -> [smoothed seconds, smoothed deviation, samples]
+    latency: dict[str, list[float]] = field(default_factory=dict)
+
+
+_health: dict[int, DeviceHealth] | None = None
+_probing: set[int] = set()
+
+
+def _health_path():
+    return database.DATA_DIR / HEALTH_FILE
+
+
+def _registry() -> dict[int, DeviceHealth]:
+    global _health
+    if _health is None:
+        try:
+            raw = json.loads(_health_path().read_text())
+            _health = {int(k): DeviceHealth(**v) for k, v in raw.items()}
+        except (OSError, ValueError, TypeError):
+            _health = {}
+    return _health
+
+
+def get_health(device_id: int) -> DeviceHealth:
+    return _registry().get(device_id) or DeviceHealth()
+
+
+def backoff_seconds(failures: int) -> float:
+    """Jittered backoff after the given number of consecutive failures."""
+    delay = min(BASE_BACKOFF_SECONDS * 2 ** (failures - FAILURE_THRESHOLD), MAX_BACKOFF_SECONDS)
+    # Equal jitter: somewhere between half and the full delay
+    return delay / 2 + random.uniform(0, delay / 2)
+
+
+def circuit_state(device_id: int, now: float | None = None) -> str:
+    """Return "closed", "open" or "half_open" for the device."""
+    health = get_health(device_id)
+    if health.failures < FAILURE_THRESHOLD:
+        return "closed"
+    now = time.time() if now is None else now
+    return "open" if now < health.next_eligible else "half_open"
+
+
+def allow_attempt(device_id: int) -> bool:
+    """Whether a fleet run should try the device now.
+
+    Only one caller at a time gets to probe a half-open circuit.
+    """
+    state = circuit_state(device_id)
+    if state == "closed":
+        return True
+    if state == "half_open" and device_id not in _probing:
+        _probing.add(device_id)
+        return True
+    return False
+
+
+def release_probe(device_id: int) -> None:
+    """Give up a half-open probe without an outcome (deferred or cancelled)."""
+    _probing.discard(device_id)
+
+
+def record_success(device_id: int) -> None:
+    _probing.discard(device_id)
+    health = _registry().get(device_id)
+    if health and health.failures:
+        health.failures = 0
+        health.next_eligible = 0.0
+        logger.info("circuit_breaker", operation="circuit_breaker", device_id=device_id, outcome="closed")
+
+
+def record_failure(device_id: int) -> None:
+    _probing.discard(device_id)
+    health = _registry().setdefault(device_id, DeviceHealth())
+    health.failures += 1
+    if health.failures >= FAILURE_THRESHOLD:
+        delay = backoff_seconds(health.failures)
+        health.next_eligible = time.time() + delay
+        logger.info(
+            "circuit_breaker",
+            operation="circuit_breaker",
+            device_id=device_id,
+            failures=health.failures,
+            backoff_s=int(delay),
+            outcome="open",
+        )
+
+
+def record_latency(device_id: int, kind: str, seconds: float) -> None:
+    """Fold a successful request's duration into the device's estimates."""
+    health = _registry().setdefault(device_id, DeviceHealth())
+    if (stats := health.latency.get(kind)) is None:
+        health.latency[kind] = [seconds, seconds / 2, 1]
+        return
+    mean, deviation, samples = stats
+    deviation = (1 - LATENCY_BETA) * deviation + LATENCY_BETA * abs(mean - seconds)
+    mean = (1 - LATENCY_ALPHA) * mean + LATENCY_ALPHA * seconds
+    health.latency[kind] = [mean, deviation, samples + 1]
+
+
+def adaptive_timeout(device_id: int, kind: str) -> httpx.Timeout | None:
+    """Timeout learned for the device, or None to use the protocol default."""
+    health = get_health(device_id)
+    stats = health.latency.get(kind)
+    if health.failures or stats is None or stats[2] < MIN_LATENCY_SAMPLES:
+        return None
+    mean, deviation, _samples = stats
+    floor, ceiling = TIMEOUT_LIMITS[kind]
+    return httpx.Timeout(min(max(TIMEOUT_MULTIPLIER * (mean + 4 * deviation), floor), ceiling))
+
+
+def expected_seconds(device_id: int) -> float:
+    """Typical time for a probe plus a transfer, from latency estimates (0 if unknown)."""
+    return sum(stats[0] for stats in get_health(device_id).latency.values())
+
+
+def save_health() -> None:
+    """Persist failure state atomically."""
+    path = _health_path()
+    data = {str(k): asdict(v) for k, v in _registry().items()}
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".tmp")
+    tmp.write_text(json.dumps(data))
+    os.replace(tmp, path)
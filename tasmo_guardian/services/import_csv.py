@@ -6,6 +6,7 @@ from pathlib import Path
 
 from ..models.database import db_session
 from ..models.device import Device, DeviceType
+from .device_changes import publish_device_reset
 from .settings import BACKUP_DIRECTORY, get_setting
 
 
@@ -81,4 +82,6 @@ def import_devices_csv(csv_content: str) -> dict:
             existing_macs.add(mac.upper())
             added += 1
 
+    if added:
+        publish_device_reset()
     return {"added": added, "skipped": skipped}
@@ -0,0 +1,227 @@
+"""Backup jobs - fleet backup runs tracked in the background by job id.
+
+Only one fleet run is active per process, whether started from the UI,
+the API or the scheduler: triggers for the whole fleet that arrive while
+a full run is in progress attach to it instead of starting another. A
+scheduled run only covers the devices that are due, so a full trigger
+during one is queued to start once it finishes.
+
+A run can be cancelled: devices still queued are dropped, in-flight
+requests are aborted, and outcomes recorded so far are kept.
+"""
+
+import asyncio
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import datetime
+
+from ..models.database import run_db
+from ..utils.logging import logger
+from .backup import DeviceSnapshot, load_device_snapshots, run_fleet_backup
+from .progress import PROGRESS_INTERVAL, ProgressEvent, ProgressStream, ProgressTracker
+from .settings import get_settings
+
+MAX_JOBS = 50
+MAX_WAIT_SECONDS = 300.0
+
+
+@dataclass
+class BackupJob:
+    """State of one fleet backup run, updated live from its progress stream."""
+
+    id: str = field(default_factory=lambda: uuid.uuid4().hex)
+    status: str = "queued"
+    created_at: datetime = field(default_factory=datetime.now)
+    finished_at: datetime | None = None
+    deadline: float | None = None
+    source: str = "manual"
+    # Scheduled runs back up a subset, without the min_hours skip
+    snapshots: list[DeviceSnapshot] | None = None
+    min_hours: int | None = None
+    # Run queued behind, started once it is done
+    after: "BackupJob | None" = None
+    tracker: ProgressTracker = field(default_factory=lambda: ProgressTracker(0))
+    devices: dict[int, dict] = field(default_factory=dict)
+    error: str | None = None
+    done: asyncio.Event = field(default_factory=asyncio.Event)
+    task: asyncio.Task | None = None
+    run: asyncio.Task | None = None
+    cancel_requested: bool = False
+
+    def apply(self, event: ProgressEvent) -> None:
+        """Record a device progress event."""
+        self.devices[event.device_id] = {
+            "id": event.device_id,
+            "name": event.name,
+            "status": event.status,
+            "duration_ms": event.duration_ms,
+        }
+        self.tracker.apply(event)
+
+    def mark_cancelled(self) -> None:
+        """Record devices that were interrupted mid-backup as cancelled."""
+        for device_id in self.tracker.running:
+            self.devices[device_id]["status"] = "cancelled"
+        self.tracker.running.clear()
+        self.status = "cancelled"
+
+    def to_dict(self) -> dict:
+        counts = self.tracker.counts
+        return {
+            "id": self.id,
+            "status": self.status,
+            "created_at": self.created_at.isoformat(),
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+            "total": self.tracker.total,
+            "source": self.source,
+            "deadline": self.deadline,
+            "backed_up": counts["backed_up"],
+            # Unchanged configs count as skipped, matching run_fleet_backup
+            "skipped": counts["skipped"] + counts["unchanged"],
+            "failed": counts["failed"],
+            "deferred": counts["deferred"],
+            "running": len(self.tracker.running),
+            "devices": list(self.devices.values()),
+            "error": self.error,
+        }
+
+
+_jobs: OrderedDict[str, BackupJob] = OrderedDict()
+_active: BackupJob | None = None
+
+
+def get_job(job_id: str) -> BackupJob | None:
+    """Look up a recent job by id."""
+    return _jobs.get(job_id)
+
+
+async def _run_job(job: BackupJob) -> None:
+    stream = ProgressStream()
+    try:
+        if job.after is not None:
+            await job.after.done.wait()
+        if job.snapshots is not None:
+            devices = job.snapshots
+        else:
+            devices = await run_db(load_device_snapshots)
+        settings = await run_db(get_settings)
+        min_hours = settings.backup_min_hours if job.min_hours is None else job.min_hours
+        if job.cancel_requested:
+            job.status = "cancelled"
+            return
+        job.tracker.total = len(devices)
+        job.status = "running"
+        job.run = asyncio.create_task(
+            run_fleet_backup(
+                devices,
+                min_hours=min_hours,
+                progress=stream,
+                deadline=job.deadline,
+            )
+        )
+        # The engine closes the stream itself; this covers a run that dies first
+        job.run.add_done_callback(lambda _: stream.close())
+        async for event in stream:
+            job.apply(event)
+        try:
+            await job.run
+        except asyncio.CancelledError:
+            if not job.cancel_requested:
+                raise
+            job.mark_cancelled()
+            logger.info("backup_job", operation="backup_job", job_id=job.id, done=job.tracker.done, outcome="cancelled")
+        else:
+            job.status = "complete"
+    except Exception as e:
+        job.status = "failed"
+        job.error = str(e)
+        logger.error(
+            "backup_job",
+            operation="backup_job",
+            job_id=job.id,
+            error=str(e),
+            outcome="failed",
+        )
+    finally:
+        job.finished_at = datetime.now()
+        job.done.set()
+
+
+def active_job() -> BackupJob | None:
+    """The fleet run currently in progress, if any."""
+    return _active if _active and not _active.done.is_set() else None
+
+
+def start_backup_job(
+    deadline: float | None = None,
+    devices: list[DeviceSnapshot] | None = None,
+    min_hours: int | None = None,
+    source: str = "manual",
+) -> BackupJob:
+    """Enqueue a fleet backup run and return its job immediately.
+
+    If a full run is already in progress, a full trigger returns that job
+    instead; any other trigger is queued behind the active run. With a
+    deadline (seconds), devices that do not fit are deferred to a later run.
+    devices and min_hours restrict the run to a subset (default: every
+    device, skipping those backed up within the configured min hours).
+    """
+    global _active
+    current = active_job()
+    if current and current.snapshots is None and devices is None:
+        logger.info("backup_job", operation="backup_job", job_id=current.id, outcome="attached")
+        return current
+
+    job = _active = BackupJob(
+        deadline=deadline, source=source, snapshots=devices, min_hours=min_hours, after=current
+    )
+    if current:
+        logger.info("backup_job", operation="backup_job", job_id=job.id, after=current.id, outcome="queued")
+    _jobs[job.id] = job
+    while len(_jobs) > MAX_JOBS:
+        oldest_id, oldest = next(iter(_jobs.items()))
+        if not oldest.done.is_set():
+            break
+        del _jobs[oldest_id]
+    job.task = asyncio.create_task(_run_job(job))
+    return job
+
+
+def cancel_job(job: BackupJob) -> bool:
+    """Ask a job to stop. Returns False if it had already finished."""
+    if job.done.is_set():
+        return False
+    if not job.cancel_requested:
+        job.cancel_requested = True
+        job.status = "cancelling"
+        if job.run:
+            job.run.cancel()
+        elif job.after and not job.after.done.is_set():
+            # Still queued behind another run: nothing has started yet
+            job.task.cancel()
+            job.status = "cancelled"
+            job.finished_at = datetime.now()
+            job.done.set()
+    return True
+
+
+async def wait_for_job(job: BackupJob, timeout: float) -> bool:
+    """Wait up to timeout seconds for a job to finish, without cancelling it.
+
+    Returns whether the job is done.
+    """
+    timeout = min(max(timeout, 0.0), MAX_WAIT_SECONDS)
+    if timeout:
+        try:
+            await asyncio.wait_for(asyncio.shield(job.done.wait()), timeout)
+        except TimeoutError:
+            pass
+    return job.done.is_set()
+
+
+async def follow_job(job: BackupJob, interval: float = PROGRESS_INTERVAL):
+    """Yield the job once per interval until it finishes, then once more."""
+    while not await wait_for_job(job, interval):
+        yield job
+    yield job
@@ -0,0 +1,168 @@
+"""Network topology - per-subnet limits for device traffic.
+
+A weak access point or VLAN can be overwhelmed even while the fleet-wide
+limit is fine. Subnets configured in settings ("CIDR max_parallel [KB/s]")
+get their own concurrency cap and token bucket. Fleet backups and scans
+take a subnet slot before a fleet-wide one, and order their work
+round-robin across subnets so no segment is served in one long burst.
+Unconfigured addresses are grouped by /24 for ordering only.
+"""
+
+import asyncio
+import contextlib
+import ipaddress
+import itertools
+import re
+import time
+from collections.abc import AsyncIterator, Callable, Iterable
+from dataclasses import dataclass
+
+DEFAULT_PREFIX = {4: 24, 6: 64}
+# A bucket holds this many seconds of its rate, so one backup can burst
+BUCKET_SECONDS = 5.0
+
+
+@dataclass(frozen=True)
+class NetworkLimit:
+    """Limits for devices in one subnet."""
+
+    network: ipaddress.IPv4Network | ipaddress.IPv6Network
+    max_concurrent: int
+    rate_kbps: int | None = None
+
+
+def parse_network_limits(text: str) -> tuple[NetworkLimit, ...]:
+    """Parse "CIDR max_parallel [KB/s]" rules separated by newlines or commas.
+
+    Invalid rules are ignored. The most specific subnet comes first so that
+    it wins over any subnet containing it.
+    """
+    limits = []
+    for rule in re.split(r"[,\n]", text):
+        parts = rule.split()
+        if not parts:
+            continue
+        try:
+            if len(parts) not in (2, 3):
+                raise ValueError(rule)
+            network = ipaddress.ip_network(parts[0], strict=False)
+            max_concurrent = int(parts[1])
+            rate_kbps = int(parts[2]) if len(parts) == 3 else None
+            if max_concurrent < 1 or (rate_kbps is not None and rate_kbps < 1):
+                raise ValueError(rule)
+        except ValueError:
+            continue
+        limits.append(NetworkLimit(network, max_concurrent, rate_kbps))
+    return tuple(sorted(limits, key=lambda limit: limit.network.prefixlen, reverse=True))
+
+
+def format_network_limits(limits: Iterable[NetworkLimit]) -> str:
+    """Format limits back into the settings text, one rule per line."""
+    return "\n".join(
+        f"{limit.network} {limit.max_concurrent}" + (f" {limit.rate_kbps}" if limit.rate_kbps else "")
+        for limit in limits
+    )
+
+
+def interleave(items: Iterable, key: Callable) -> list:
+    """Round-robin items across groups, keeping their order within each group."""
+    groups: dict = {}
+    for item in items:
+        groups.setdefault(key(item), []).append(item)
+    return [item for batch in itertools.zip_longest(*groups.values()) for item in batch if item is not None]
+
+
+class TokenBucket:
+    """Byte budget refilled at a steady rate.
+
+    Spending can take the balance negative (the size of a backup is only
+    known once it has downloaded); ready() then waits until it is repaid.
+    """
+
+    def __init__(self, rate: float):
+        self.rate = rate
+        self.capacity = rate * BUCKET_SECONDS
+        self.tokens = self.capacity
+        self._updated = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.tokens + (now - self._updated) * self.rate, self.capacity)
+        self._updated = now
+
+    def spend(self, amount: float) -> None:
+        self._refill()
+        self.tokens -= amount
+
+    async def ready(self) -> None:
+        self._refill()
+        while self.tokens < 0:
+            await asyncio.sleep(-self.tokens / self.rate)
+            self._refill()
+
+
+class Segment:
+    """One subnet's concurrency cap and bandwidth budget, if configured."""
+
+    def __init__(self, name: str, limit: NetworkLimit | None = None):
+        self.name = name
+        self.semaphore = asyncio.Semaphore(limit.max_concurrent) if limit else None
+        self.bucket = TokenBucket(limit.rate_kbps * 1024) if limit and limit.rate_kbps else None
+
+    @contextlib.asynccontextmanager
+    async def slot(self) -> AsyncIterator[None]:
+        """Hold one of the subnet's slots once its budget allows."""
+        async with self.semaphore or contextlib.nullcontext():
+            if self.bucket:
+                await self.bucket.ready()
+            yield
+
+
+class Topology:
+    """Segments for the configured subnet limits, created on first use."""
+
+    def __init__(self, limits: tuple[NetworkLimit, ...] = ()):
+        self.limits = limits
+        self._segments: dict[str, Segment] = {}
+
+    def segment(self, ip: str) -> Segment:
+        try:
+            address = ipaddress.ip_address(ip)
+        except ValueError:
+            # Hostname: a segment of its own
+            name, limit = str(ip), None
+        else:
+            limit = next((limit for limit in self.limits if address in limit.network), None)
+            if limit:
+                name = str(limit.network)
+            else:
+                name = str(ipaddress.ip_network(f"{address}/{DEFAULT_PREFIX[address.version]}", strict=False))
+        if (segment := self._segments.get(name)) is None:
+            segment = self._segments[name] = Segment(name, limit)
+        return segment
+
+    def interleave(self, items: Iterable, ip: Callable = lambda item: item.ip) -> list:
+        """Order items round-robin across their segments."""
+        return interleave(items, key=lambda item: self.segment(ip(item)).name)
+
+    def spend(self, ip: str, nbytes: int) -> None:
+        """Charge transferred bytes to the device's subnet budget."""
+        if bucket := self.segment(ip).bucket:
+            bucket.spend(nbytes)
+
+
+_topology: Topology | None = None
+
+
+def get_topology(limits: tuple[NetworkLimit, ...]) -> Topology:
+    """Shared topology for the given limits, rebuilt when they change."""
+    global _topology
+    if _topology is None or _topology.limits != limits:
+        _topology = Topology(limits)
+    return _topology
+
+
+def spend(ip: str, nbytes: int) -> None:
+    """Charge transferred bytes to the shared topology, if one is in use."""
+    if _topology is not None:
+        _topology.spend(ip, nbytes)
@@ -0,0 +1,86 @@
+"""Backup progress - per-device progress events for fleet backup runs."""
+
+import asyncio
+import time
+from collections.abc import AsyncIterator
+from dataclasses import dataclass, field
+
+PROGRESS_INTERVAL = 0.25
+SLOW_DEVICE_SECONDS = 10.0
+
+# Terminal statuses; "started" is the only non-terminal one
+FINISHED_STATUSES = ("backed_up", "unchanged", "skipped", "failed", "deferred")
+
+
+@dataclass
+class ProgressEvent:
+    """One device changing status during a fleet run."""
+
+    device_id: int
+    name: str
+    status: str
+    duration_ms: int | None = None
+    at: float = field(default_factory=time.monotonic)
+
+
+class ProgressStream:
+    """Async stream of progress events from one fleet run.
+
+    The engine calls emit() without awaiting; the consumer iterates the
+    stream until the run closes it.
+    """
+
+    def __init__(self):
+        self.queue: asyncio.Queue[ProgressEvent | None] = asyncio.Queue()
+        self.closed = False
+
+    def emit(self, event: ProgressEvent) -> None:
+        if not self.closed:
+            self.queue.put_nowait(event)
+
+    def close(self) -> None:
+        if not self.closed:
+            self.closed = True
+            self.queue.put_nowait(None)
+
+    async def __aiter__(self) -> AsyncIterator[ProgressEvent]:
+        while (event := await self.queue.get()) is not None:
+            yield event
+
+
+class ProgressTracker:
+    """Aggregate progress events into counts and in-flight devices."""
+
+    def __init__(self, total: int):
+        self.total = total
+        self.counts = dict.fromkeys(FINISHED_STATUSES, 0)
+        self.running: dict[int, ProgressEvent] = {}
+        self.slowest: list[ProgressEvent] = []
+
+    @property
+    def done(self) -> int:
+        return sum(self.counts.values())
+
+    def apply(self, event: ProgressEvent) -> None:
+        if event.status == "started":
+            self.running[event.device_id] = event
+            return
+        self.running.pop(event.device_id, None)
+        self.counts[event.status] += 1
+        if event.duration_ms is not None:
+            self.slowest = sorted(
+                [*self.slowest, event], key=lambda e: e.duration_ms, reverse=True
+            )[:5]
+
+    def in_flight(self, now: float | None = None, limit: int = 5) -> list[dict]:
+        """Running devices, longest-running first, with elapsed seconds."""
+        now = time.monotonic() if now is None else now
+        running = sorted(self.running.values(), key=lambda e: e.at)[:limit]
+        return [
+            {
+                "name": e.name,
+                "elapsed_s": int(now - e.at),
+                "slow": now - e.at >= SLOW_DEVICE_SECONDS,
+            }
+            for e in running
+        ]
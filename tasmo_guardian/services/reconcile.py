@@ -0,0 +1,142 @@
+"""Reconcile service - sync the backup index with the backup directory."""
+
+import json
+import os
+import time
+from datetime import datetime
+from pathlib import Path
+
+from ..models.database import db_session, run_db
+from ..models.device import Backup, Device
+from ..utils.logging import logger
+from . import backup as backup_service
+from .backup import BACKUP_PATTERN, file_sha256
+from .device_changes import publish_device_changes
+
+TEMP_SUFFIX = ".part"
+STALE_TEMP_SECONDS = 3600
+
+
+def scan_backup_files(backup_dir: Path) -> list[dict]:
+    """Walk the backup directory once, parsing each filename once.
+
+    Stale temp files left by interrupted downloads are removed.
+    """
+    files = []
+    stale_before = time.time() - STALE_TEMP_SECONDS
+    if not backup_dir.exists():
+        return files
+
+    with os.scandir(backup_dir) as device_dirs:
+        for device_dir in device_dirs:
+            if not device_dir.is_dir():
+                continue
+            with os.scandir(device_dir.path) as entries:
+                for entry in entries:
+                    if entry.name.startswith(".") and entry.name.endswith(TEMP_SUFFIX):
+                        if entry.stat().st_mtime < stale_before:
+                            os.unlink(entry.path)
+                        continue
+                    if not entry.is_file():
+                        continue
+                    if match := BACKUP_PATTERN.match(entry.name):
+                        mac, date_str, version, _ext = match.groups()
+                        files.append(
+                            {
+                                "path": str(Path(entry.path)),
+                                "dir": device_dir.name,
+                                "mac": mac.replace(":", "").upper(),
+                                "date": datetime.strptime(date_str, "%Y-%m-%d_%H_%M_%S"),
+                                "version": version,
+                                "size": entry.stat().st_size,
+                            }
+                        )
+    return files
+
+
+def _match_device(file: dict, by_mac: dict, by_name: dict) -> Device | None:
+    """Find the device owning a backup file by MAC, then by directory name."""
+    return by_mac.get(file["mac"]) or by_name.get(file["dir"])
+
+
+def reconcile_backups() -> dict:
+    """Sync Backup rows and device backup counts with files on disk.
+
+    One directory walk and one transaction; time is linear in file count.
+    """
+    start = time.perf_counter()
+    files = scan_backup_files(backup_service.BACKUP_DIR)
+    results = {"files": len(files), "added": 0, "removed": 0, "orphaned": 0, "devices_updated": 0}
+    changes = {}
+
+    with db_session() as session:
+        devices = session.query(Device).all()
+        by_mac = {d.mac.replace(":", "").upper(): d for d in devices}
+        by_name = {d.name: d for d in devices}
+        indexed = {b.filename: b for b in session.query(Backup).all()}
+
+        per_device: dict[int, list[datetime]] = {d.id: [] for d in devices}
+        on_disk = set()
+
+        for file in files:
+            device = _match_device(file, by_mac, by_name)
+            if device is None:
+                results["orphaned"] += 1
+                continue
+
+            on_disk.add(file["path"])
+            per_device[device.id].append(file["date"])
+            if file["path"] in indexed:
+                continue
+
+            session.add(
+                Backup(
+                    deviceid=device.id,
+                    name=file["dir"],
+                    version=file["version"],
+                    date=file["date"],
+                    filename=file["path"],
+                    data=json.dumps(
+                        {"size": file["size"], "sha256": file_sha256(Path(file["path"]))}
+                    ),
+                )
+            )
+            results["added"] += 1
+
+        for filename, row in indexed.items():
+            # Re-check existence so backups written since the walk are kept
+            if filename not in on_disk and not os.path.exists(filename):
+                session.delete(row)
+                results["removed"] += 1
+
+        for device in devices:
+            dates = per_device[device.id]
+            newest = max(dates) if dates else None
+            # Keep a lastbackup newer than any file: set when an unchanged config was verified
+            lastbackup = device.lastbackup
+            if newest is None or lastbackup is None or lastbackup < newest:
+                lastbackup = newest
+            if device.noofbackups != len(dates) or device.lastbackup != lastbackup:
+                device.noofbackups = len(dates)
+                device.lastbackup = lastbackup
+                results["devices_updated"] += 1
+                changes[device.id] = {
+                    "lastbackup": str(lastbackup) if lastbackup else "",
+                    "noofbackups": len(dates),
+                }
+
+    publish_device_changes(changes)
+
+    logger.info(
+        "reconcile_backups",
+        operation="reconcile_backups",
+        **results,
+        outcome="success",
+        duration_ms=int((time.perf_counter() - start) * 1000),
+    )
+    return results
+
+
+async def reconcile_on_startup() -> None:
+    """App lifespan task: reconcile once at startup, off the event loop."""
+    await run_db(reconcile_backups)
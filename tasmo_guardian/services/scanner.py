@@ -1,45 +1,152 @@
-"""IP range scanner service."""
+"""IP range scanner service.
+
+Scan targets are CIDRs, ranges ("10.0.0.1-10.0.3.254", or "10.0.0.1-50"
+within the last octet) and single addresses, with exclusions marked by a
+leading "!". Every address first gets a TCP connect on port 80 with a short
+timeout; only addresses that accept it get the full HTTP detection, so
+empty addresses cost a fraction of a second instead of an HTTP timeout.
+"""
 
 import asyncio
+import ipaddress
+import re
 
+from ..models.database import run_db
 from ..protocols.base import detect_device
 from ..utils.logging import logger
+from . import network
+from .concurrency import AdaptiveLimiter
+from .settings import get_settings
+
+INITIAL_CONCURRENT = 15
+MAX_CONCURRENT = 64
+
+PROBE_PORT = 80
+PROBE_TIMEOUT = 1.0
+# Connect probes are cheap, so they run much wider than HTTP detection
+PROBE_CONCURRENT = 128
+MAX_SCAN_ADDRESSES = 4096
 
-MAX_CONCURRENT = 15
+# Shared across scans so the learned limit carries over
+scan_limiter = AdaptiveLimiter("scan", INITIAL_CONCURRENT, maximum=MAX_CONCURRENT)
 
 
 def generate_ip_range(start: str, end: str) -> list[str]:
-    """Generate list of IPs from range."""
-    base = ".".join(start.split(".")[:-1])
-    start_num = int(start.split(".")[-1])
-    end_num = int(end.split(".")[-1])
-    return [f"{base}.{i}" for i in range(start_num, end_num + 1)]
+    """Generate list of IPs from range, inclusive, across octet boundaries."""
+    first = ipaddress.ip_address(start.strip())
+    last = ipaddress.ip_address(end.strip())
+    if first.version != last.version:
+        raise ValueError(f"Mixed IP versions in range {start}-{end}")
+    if int(last) - int(first) >= MAX_SCAN_ADDRESSES:
+        raise ValueError(f"Range {start}-{end} has more than {MAX_SCAN_ADDRESSES} addresses")
+    return [str(first + i) for i in range(int(last) - int(first) + 1)]
 
 
-async def scan_ip_range(
-    start_ip: str, end_ip: str, password: str | None = None
-) -> list[dict]:
-    """Scan IP range with sliding window concurrency."""
-    semaphore = asyncio.Semaphore(MAX_CONCURRENT)
-    ips = generate_ip_range(start_ip, end_ip)
+def expand_target(target: str) -> list[str]:
+    """Expand one CIDR, range or address into IPs."""
+    if "/" in target:
+        net = ipaddress.ip_network(target, strict=False)
+        if net.num_addresses > MAX_SCAN_ADDRESSES:
+            raise ValueError(f"{target} has more than {MAX_SCAN_ADDRESSES} addresses")
+        hosts = list(net.hosts())
+        return [str(ip) for ip in hosts or [net.network_address]]
+    if "-" in target:
+        start, end = target.split("-", 1)
+        if end.strip().isdigit():
+            # Last-octet shorthand: 192.168.1.10-50
+            end = f"{start.rsplit('.', 1)[0]}.{end.strip()}"
+        return generate_ip_range(start, end)
+    return [str(ipaddress.ip_address(target))]
+
+
+def parse_scan_targets(targets: str, exclude: str = "") -> list[str]:
+    """Expand targets separated by commas, spaces or newlines into unique IPs.
+
+    Targets starting with "!", and everything in exclude, are left out.
+    Raises ValueError for malformed targets or too many addresses.
+    """
+    included: dict[str, None] = {}
+    excluded: set[str] = set()
+    for target in re.split(r"[,\s]+", targets):
+        if target.startswith("!"):
+            excluded.update(expand_target(target[1:]))
+        elif target:
+            included.update(dict.fromkeys(expand_target(target)))
+    for target in re.split(r"[,\s]+", exclude):
+        if target:
+            excluded.update(expand_target(target.lstrip("!")))
+    ips = [ip for ip in included if ip not in excluded]
+    if len(ips) > MAX_SCAN_ADDRESSES:
+        raise ValueError(f"Scan has more than {MAX_SCAN_ADDRESSES} addresses")
+    return ips
+
+
+async def port_open(ip: str, port: int = PROBE_PORT, timeout: float = PROBE_TIMEOUT) -> bool:
+    """Whether a TCP connect to ip:port succeeds within timeout."""
+    try:
+        _reader, writer = await asyncio.wait_for(asyncio.open_connection(ip, port), timeout)
+    except (OSError, TimeoutError):
+        return False
+    writer.close()
+    try:
+        await writer.wait_closed()
+    except OSError:
+        pass
+    return True
+
+
+async def scan_addresses(ips: list[str], password: str | None = None, label: str = "") -> list[dict]:
+    """Scan addresses with sliding window concurrency.
+
+    The detection window is set by the adaptive scan limiter. Only addresses
+    that accepted the TCP pre-probe reach it, so a failed HTTP detection
+    there (timeout, reset, or a web server that isn't a supported device)
+    counts as a failure, and a detected device as a success. Addresses in
+    subnets with configured limits also take a subnet slot for detection.
+    """
+    topology = network.get_topology((await run_db(get_settings)).network_limits)
+    probe_semaphore = asyncio.Semaphore(PROBE_CONCURRENT)
+    responsive = 0
 
     async def scan_ip(ip: str) -> dict | None:
-        async with semaphore:
+        nonlocal responsive
+        async with probe_semaphore:
+            if not await port_open(ip):
+                return None
+        responsive += 1
+        async with topology.segment(ip).slot(), scan_limiter.slot() as slot:
             info, device_type = await detect_device(ip, password)
             if info:
+                slot.succeeded()
                 return {"ip": ip, "info": info, "type": device_type}
+            slot.failed()
             return None
 
-    tasks = [scan_ip(ip) for ip in ips]
-    results = await asyncio.gather(*tasks)
-
-    devices = [r for r in results if r is not None]
+    # Start round-robin across subnets, but report in address order
+    order = topology.interleave(ips, ip=lambda ip: ip)
+    found = dict(zip(order, await asyncio.gather(*[scan_ip(ip) for ip in order])))
+    devices = [found[ip] for ip in ips if found[ip] is not None]
     logger.info(
         "scan_complete",
         operation="ip_scan",
-        ip_range=f"{start_ip}-{end_ip}",
+        ip_range=label,
         ips_scanned=len(ips),
+        ips_responsive=responsive,
         devices_found=len(devices),
+        max_concurrent=scan_limiter.current,
         outcome="success",
     )
     return devices
+
+
+async def scan_ip_range(
+    start_ip: str, end_ip: str, password: str | None = None
+) -> list[dict]:
+    """Scan IP range with sliding window concurrency."""
+    return await scan_addresses(generate_ip_range(start_ip, end_ip), password, f"{start_ip}-{end_ip}")
+
+
+async def scan_targets(targets: str, exclude: str = "", password: str | None = None) -> list[dict]:
+    """Scan CIDRs, ranges and addresses, minus exclusions (see parse_scan_targets)."""
+    label = targets if not exclude else f"{targets} excluding {exclude}"
+    return await scan_addresses(parse_scan_targets(targets, exclude), password, label)
@@ -0,0 +1,114 @@
+"""Backup scheduler - in-process, staggered per-device backups.
+
+Each device gets a fixed slot within the backup period (BACKUP_MIN_HOURS),
+derived from a stable hash of its MAC. The scheduler wakes every tick and
+backs up only devices whose slot has passed since their last backup, so
+the fleet is spread evenly across the period instead of hit in one burst.
+"""
+
+import asyncio
+import hashlib
+import os
+import time
+from contextlib import asynccontextmanager
+
+from ..models.database import run_db
+from ..utils.logging import logger
+from .backup import load_device_snapshots
+from .jobs import active_job, start_backup_job
+from .settings import get_settings
+
+SCHEDULER_ENABLED = os.environ.get("BACKUP_SCHEDULER", "true").lower() not in ("0", "false", "off")
+TICK_SECONDS = float(os.environ.get("BACKUP_SCHEDULER_TICK", "60"))
+
+
+def device_offset(mac: str, period: float) -> float:
+    """Stable offset of a device's slot within the period, in seconds."""
+    normalized = mac.replace(":", "").replace("-", "").upper().encode()
+    digest = int.from_bytes(hashlib.sha256(normalized).digest()[:8], "big")
+    return digest % int(period * 1000) / 1000
+
+
+def last_slot(mac: str, period: float, now: float) -> float:
+    """Start of the device's most recent slot at or before now (epoch seconds)."""
+    offset = device_offset(mac, period)
+    return (now - offset) // period * period + offset
+
+
+def is_due(device, period: float, now: float) -> bool:
+    """Whether the device has not been backed up since its latest slot."""
+    if device.lastbackup is None:
+        return True
+    return device.lastbackup.timestamp() < last_slot(device.mac, period, now)
+
+
+def due_devices(devices: list, period: float, now: float | None = None) -> list:
+    """Devices due for a scheduled backup at now (epoch seconds)."""
+    now = time.time() if now is None else now
+    return [d for d in devices if is_due(d, period, now)]
+
+
+async def run_scheduled_backups() -> dict | None:
+    """Back up devices whose slot has come up. Returns run results, if any ran.
+
+    The run is an ordinary backup job, so it shows up in the jobs API, can
+    be cancelled, and keeps manual runs from starting alongside it.
+    """
+    if active_job():
+        # A full run is already covering every device
+        return None
+    settings = await run_db(get_settings)
+    period = max(settings.backup_min_hours, 1) * 3600
+    devices = due_devices(await run_db(load_device_snapshots), period)
+    if not devices:
+        return None
+    # Slots already enforce the period; don't skip devices with min_hours again
+    job = start_backup_job(devices=devices, min_hours=0, source="scheduled")
+    await job.done.wait()
+    result = job.to_dict()
+    return {
+        "job_id": result["id"],
+        "job_status": result["status"],
+        **{key: result[key] for key in ("backed_up", "skipped", "failed", "deferred")},
+    }
+
+
+async def scheduler_loop(tick: float = TICK_SECONDS) -> None:
+    """Run scheduled backups every tick until cancelled."""
+    while True:
+        started = time.monotonic()
+        try:
+            results = await run_scheduled_backups()
+            if results:
+                logger.info(
+                    "scheduled_backup",
+                    operation="scheduled_backup",
+                    **results,
+                    outcome="success",
+                    duration_ms=int((time.monotonic() - started) * 1000),
+                )
+        except Exception as e:
+            logger.error(
+                "scheduled_backup",
+                operation="scheduled_backup",
+                error=str(e),
+                outcome="failed",
+            )
+        await asyncio.sleep(max(tick - (time.monotonic() - started), 0))
+
+
+@asynccontextmanager
+async def backup_scheduler_lifespan():
+    """App lifespan task running the scheduler in the background."""
+    if not SCHEDULER_ENABLED:
+        yield
+        return
+    task = asyncio.create_task(scheduler_loop())
+    try:
+        yield
+    finally:
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
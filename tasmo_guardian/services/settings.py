@@ -1,7 +1,11 @@
 """Settings service - get/set settings from database."""
 
+import threading
+from dataclasses import dataclass
+
 from ..models.database import db_session
 from ..models.device import Setting
+from .network import NetworkLimit, parse_network_limits
 
 # Display settings keys
 DISPLAY_SORT_COLUMN = "display_sort_column"
@@ -27,6 +31,7 @@ BACKUP_MIN_HOURS = "backup_min_hours"
 BACKUP_MAX_DAYS = "backup_max_days"
 BACKUP_MAX_COUNT = "backup_max_count"
 BACKUP_DIRECTORY = "backup_directory"
+BACKUP_NETWORK_LIMITS = "backup_network_limits"
 
 # Theme key
 THEME = "theme"
@@ -45,3 +50,124 @@ def set_setting(session, key: str, value: str) -> None:
         setting.value = value
     else:
         session.add(Setting(name=key, value=value))
+    invalidate_settings()
+
+
+SETTING_DEFAULTS = {
+    DISPLAY_SORT_COLUMN: "name",
+    DISPLAY_ROWS_PER_PAGE: "25",
+    DISPLAY_SHOW_MAC: "true",
+    DEVICE_DEFAULT_PASSWORD: "",
+    DEVICE_AUTO_UPDATE_NAME: "true",
+    DEVICE_AUTO_ADD_ON_SCAN: "false",
+    DEVICE_MQTT_TOPIC_AS_NAME: "false",
+    MQTT_HOST: "",
+    MQTT_PORT: "1883",
+    MQTT_USERNAME: "",
+    MQTT_PASSWORD: "",
+    MQTT_TOPIC: "tele/+/LWT",
+    MQTT_TOPIC_FORMAT: "tasmota",
+    BACKUP_MIN_HOURS: "24",
+    BACKUP_MAX_DAYS: "30",
+    BACKUP_MAX_COUNT: "10",
+    BACKUP_DIRECTORY: "data/backups",
+    BACKUP_NETWORK_LIMITS: "",
+    THEME: "auto",
+}
+
+
+@dataclass(frozen=True)
+class Settings:
+    """Typed snapshot of the settings table."""
+
+    sort_column: str
+    rows_per_page: int
+    show_mac: bool
+    default_password: str
+    auto_update_name: bool
+    auto_add_on_scan: bool
+    mqtt_topic_as_name: bool
+    mqtt_host: str
+    mqtt_port: int
+    mqtt_username: str
+    mqtt_password: str
+    mqtt_topic: str
+    mqtt_topic_format: str
+    backup_min_hours: int
+    backup_max_days: int
+    backup_max_count: int
+    backup_directory: str
+    network_limits: tuple[NetworkLimit, ...]
+    theme: str
+
+    @classmethod
+    def from_values(cls, stored: dict[str, str]) -> "Settings":
+        values = SETTING_DEFAULTS | stored
+
+        def as_int(key: str) -> int:
+            try:
+                return int(values[key])
+            except ValueError:
+                return int(SETTING_DEFAULTS[key])
+
+        def as_bool(key: str) -> bool:
+            return values[key] == "true"
+
+        return cls(
+            sort_column=values[DISPLAY_SORT_COLUMN],
+            # Paging divides by it
+            rows_per_page=max(as_int(DISPLAY_ROWS_PER_PAGE), 1),
+            show_mac=as_bool(DISPLAY_SHOW_MAC),
+            default_password=values[DEVICE_DEFAULT_PASSWORD],
+            auto_update_name=as_bool(DEVICE_AUTO_UPDATE_NAME),
+            auto_add_on_scan=as_bool(DEVICE_AUTO_ADD_ON_SCAN),
+            mqtt_topic_as_name=as_bool(DEVICE_MQTT_TOPIC_AS_NAME),
+            mqtt_host=values[MQTT_HOST],
+            mqtt_port=as_int(MQTT_PORT),
+            mqtt_username=values[MQTT_USERNAME],
+            mqtt_password=values[MQTT_PASSWORD],
+            mqtt_topic=values[MQTT_TOPIC],
+            mqtt_topic_format=values[MQTT_TOPIC_FORMAT],
+            backup_min_hours=as_int(BACKUP_MIN_HOURS),
+            backup_max_days=as_int(BACKUP_MAX_DAYS),
+            backup_max_count=as_int(BACKUP_MAX_COUNT),
+            backup_directory=values[BACKUP_DIRECTORY],
+            network_limits=parse_network_limits(values[BACKUP_NETWORK_LIMITS]),
+            theme=values[THEME],
+        )
+
+
+_cache: Settings | None = None
+_cache_lock = threading.Lock()
+
+
+def load_settings() -> Settings:
+    """Load the whole settings table in one query."""
+    with db_session() as session:
+        return Settings.from_values({row.name: row.value for row in session.query(Setting).all()})
+
+
+def get_settings() -> Settings:
+    """Return cached settings, loading them on first use or after a write."""
+    global _cache
+    if (settings := _cache) is not None:
+        return settings
+    with _cache_lock:
+        if _cache is None:
+            _cache = load_settings()
+        return _cache
+
+
+def invalidate_settings() -> None:
+    """Drop cached settings so the next read reloads them."""
+    global _cache
+    _cache = None
+
+
+def set_settings(values: dict[str, str]) -> Settings:
+    """Set several settings in one transaction and return the refreshed settings."""
+    with db_session() as session:
+        for key, value in values.items():
+            set_setting(session, key, value)
+    invalidate_settings()
+    return get_settings()
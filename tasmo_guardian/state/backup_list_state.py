@@ -2,9 +2,20 @@
 
 import reflex as rx
 
-from ..models.database import db_session
+from ..models.database import db_session, run_db
 from ..models.device import Device
 from ..services.backup import count_device_backups, delete_backup, get_backup_history
+from ..services.device_changes import publish_device_changes
+
+
+def refresh_backup_count(device_id: int) -> None:
+    """Recount a device's indexed backups after one was deleted."""
+    with db_session() as session:
+        device = session.get(Device, device_id)
+        if not device:
+            return
+        count = device.noofbackups = count_device_backups(device.id)
+    publish_device_changes({device_id: {"noofbackups": count}})
 
 
 class BackupListState(rx.State):
@@ -12,29 +23,26 @@ class BackupListState(rx.State):
 
     backups: list[dict] = []
 
-    def load_backups(self):
+    async def load_backups(self):
         """Load backups for current device from route params."""
-        device_name = getattr(self, "device_name", "")
-        if device_name:
+        device_id = getattr(self, "device_id", "")
+        if device_id:
             self.backups = [
                 {
                     **b,
                     "date": str(b["date"]),
                     "download_url": f"/api/backup/download?path={b['path']}",
                 }
-                for b in get_backup_history(device_name)
+                for b in await run_db(get_backup_history, int(device_id))
             ]
 
-    def delete_backup_file(self, filepath: str):
+    async def delete_backup_file(self, filepath: str):
         """Delete a backup file and update device backup count."""
-        delete_backup(filepath)
-        
+        await run_db(delete_backup, filepath)
+
         # Update device noofbackups in database
         device_id = getattr(self, "device_id", "")
         if device_id:
-            with db_session() as session:
-                device = session.query(Device).get(int(device_id))
-                if device:
-                    device.noofbackups = count_device_backups(device.name)
-        
-        self.load_backups()
+            await run_db(refresh_backup_count, int(device_id))
+
+        await self.load_backups()
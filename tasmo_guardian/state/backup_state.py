@@ -4,9 +4,16 @@ from datetime import datetime
 
 import reflex as rx
 
-from ..models.database import db_session
-from ..models.device import Device
-from ..services.backup import backup_all_devices, backup_device, count_device_backups, restore_device
+from ..models.database import run_db
+from ..services.backup import (
+    apply_backup_outcomes,
+    backup_device,
+    load_device_snapshot,
+    restore_device,
+    run_interactive,
+)
+from ..services import health
+from ..services.jobs import active_job, cancel_job, follow_job, start_backup_job
 
 
 class BackupState(rx.State):
@@ -15,6 +22,8 @@ class BackupState(rx.State):
     backing_up: bool = False
     backup_progress: int = 0
     backup_total: int = 0
+    backup_failed: int = 0
+    backup_running: list[dict] = []
     toast_message: str = ""
     toast_visible: bool = False
     toast_variant: str = "success"
@@ -35,19 +44,18 @@ class BackupState(rx.State):
         async with self:
             self.backing_up = True
 
-        with db_session() as session:
-            device = session.query(Device).get(device_id)
-            if not device:
-                async with self:
-                    self.backing_up = False
-                return
-
-            success = await backup_device(device)
+        device = await run_db(load_device_snapshot, device_id)
+        if not device:
+            async with self:
+                self.backing_up = False
+            return
 
-            if success:
-                device.lastbackup = datetime.now()
-                device.noofbackups = count_device_backups(device.name)
-                session.commit()
+        success = await run_interactive(backup_device, device)
+        if success:
+            health.record_success(device.id)
+            await run_db(apply_backup_outcomes, {device.id: datetime.now()})
+        else:
+            health.record_failure(device.id)
 
         async with self:
             self.backing_up = False
@@ -55,62 +63,62 @@ class BackupState(rx.State):
                 "Backup complete" if success else "Backup failed",
                 "success" if success else "error",
             )
-            return DeviceState.load_devices
+            return DeviceState.apply_device_changes
 
     @rx.event(background=True)
     async def backup_all(self):
         """Backup all devices."""
         from ..state.device_state import DeviceState
-        from datetime import timedelta
 
         async with self:
             self.backing_up = True
             self.backup_progress = 0
+            self.backup_failed = 0
+            self.backup_running = []
 
-        with db_session() as session:
-            devices = session.query(Device).all()
+        # Attaches to the run already in progress if there is one
+        job = start_backup_job()
+        async for _ in follow_job(job):
             async with self:
-                self.backup_total = len(devices)
-
-            backed_up = 0
-            skipped = 0
-            failed = 0
-            cutoff = datetime.now() - timedelta(hours=24)
-
-            for device in devices:
-                if device.lastbackup and device.lastbackup > cutoff:
-                    skipped += 1
-                    continue
-
-                success = await backup_device(device)
-                if success:
-                    device.lastbackup = datetime.now()
-                    device.noofbackups = count_device_backups(device.name)
-                    backed_up += 1
-                else:
-                    failed += 1
-
-            session.commit()
+                self.backup_total = job.tracker.total
+                self.backup_progress = job.tracker.done
+                self.backup_failed = job.tracker.counts["failed"]
+                self.backup_running = job.tracker.in_flight()
+        results = job.to_dict()
 
         async with self:
             self.backing_up = False
-            self._show_toast(
-                f"Backed up: {backed_up}, Skipped: {skipped}, Failed: {failed}",
-                "success" if failed == 0 else "warning",
-            )
-            return DeviceState.load_devices
+            self.backup_running = []
+            if results["status"] == "failed":
+                self._show_toast(f"Backup failed: {results['error']}", "error")
+            elif results["status"] == "cancelled":
+                self._show_toast(
+                    f"Backup cancelled. Backed up: {results['backed_up']}, Failed: {results['failed']}",
+                    "warning",
+                )
+            else:
+                self._show_toast(
+                    f"Backed up: {results['backed_up']}, Skipped: {results['skipped']}, "
+                    f"Failed: {results['failed']}",
+                    "success" if results["failed"] == 0 else "warning",
+                )
+            return DeviceState.apply_device_changes
+
+    def cancel_backup_all(self):
+        """Cancel the fleet run in progress, keeping what has finished."""
+        if job := active_job():
+            cancel_job(job)
 
     @rx.event(background=True)
     async def restore_backup(self, device_id: int, backup_path: str):
         """Restore a device from backup."""
-        with db_session() as session:
-            device = session.query(Device).get(device_id)
-            if not device:
-                async with self:
-                    self._show_toast("Device not found", "error")
-                return
-
-            success = await restore_device(device, backup_path)
+        device = await run_db(load_device_snapshot, device_id)
+        if not device:
+            async with self:
+                self._show_toast("Device not found", "error")
+            return
+
+        success = await run_interactive(restore_device, device, backup_path)
 
         async with self:
             self._show_toast(
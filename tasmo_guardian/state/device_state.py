@@ -2,13 +2,16 @@
 
 import reflex as rx
 
-from ..models.database import db_session
-from ..models.device import Device
+from ..models.database import run_db
+from ..services.device_changes import change_log
 from ..services.device_service import add_device as add_device_service
 from ..services.device_service import delete_device as delete_device_service
+from ..services.device_service import query_devices
 from ..services.device_service import update_device as update_device_service
 from ..services.import_csv import import_devices_csv
-from ..services.scanner import scan_ip_range
+from ..services.reconcile import reconcile_backups
+from ..services.scanner import scan_targets
+from ..services.settings import get_settings
 from ..state.toast_state import ToastState
 
 
@@ -18,56 +21,85 @@ class DeviceState(rx.State):
     devices: list[dict] = []
     sort_column: str = "name"
     sort_ascending: bool = True
+    filter_text: str = ""
+    page: int = 1
+    per_page: int = 25
+    total_devices: int = 0
     scanning: bool = False
-
-    def load_devices(self):
-        """Load devices from database."""
-        with db_session() as session:
-            db_devices = session.query(Device).all()
+    _change_seq: int = 0
+
+    @rx.var
+    def page_count(self) -> int:
+        """Number of pages for the current filter."""
+        return max(1, -(-self.total_devices // self.per_page))
+
+    async def load_devices(self):
+        """Load the current page of devices from database."""
+        self._change_seq = change_log.seq
+        self.per_page = (await run_db(get_settings)).rows_per_page
+        self.devices, self.total_devices = await run_db(
+            query_devices,
+            self.filter_text,
+            self.sort_column,
+            self.sort_ascending,
+            self.page,
+            self.per_page,
+        )
+        if self.page > self.page_count:
+            self.page = self.page_count
+            await self.load_devices()
+
+    async def apply_device_changes(self):
+        """Patch visible rows with device changes published since the last load."""
+        self._change_seq, changes = change_log.since(self._change_seq)
+        if changes is None or None in changes.values():
+            # Added or deleted devices shift pages; reload instead of patching
+            await self.load_devices()
+            return
+        if any(d["id"] in changes for d in self.devices):
             self.devices = [
-                {
-                    "id": d.id,
-                    "name": d.name,
-                    "ip": d.ip,
-                    "mac": d.mac,
-                    "type": d.type,
-                    "version": d.version,
-                    "lastbackup": str(d.lastbackup) if d.lastbackup else "",
-                    "noofbackups": d.noofbackups or 0,
-                    "password": d.password or "",
-                }
-                for d in db_devices
+                d | changes[d["id"]] if d["id"] in changes else d for d in self.devices
             ]
-        self._sort_devices()
 
-    def sort_by(self, column: str):
+    async def sort_by(self, column: str):
         """Sort devices by column."""
         if self.sort_column == column:
             self.sort_ascending = not self.sort_ascending
         else:
             self.sort_column = column
             self.sort_ascending = True
-        self._sort_devices()
-
-    def _sort_devices(self):
-        """Apply current sort to devices list."""
-        self.devices = sorted(
-            self.devices,
-            key=lambda d: d.get(self.sort_column, ""),
-            reverse=not self.sort_ascending,
-        )
-
-    def update_device(self, form_data: dict):
+        self.page = 1
+        await self.load_devices()
+
+    async def set_filter(self, text: str):
+        """Filter devices by name, IP, MAC or version."""
+        self.filter_text = text
+        self.page = 1
+        await self.load_devices()
+
+    async def next_page(self):
+        """Show the next page of devices."""
+        if self.page < self.page_count:
+            self.page += 1
+            await self.load_devices()
+
+    async def prev_page(self):
+        """Show the previous page of devices."""
+        if self.page > 1:
+            self.page -= 1
+            await self.load_devices()
+
+    async def update_device(self, form_data: dict):
         """Update device from form submission."""
         device_id = int(form_data.pop("device_id", 0))
         if device_id:
-            update_device_service(device_id, form_data)
-            self.load_devices()
+            await run_db(update_device_service, device_id, form_data)
+            await self.apply_device_changes()
 
-    def delete_device(self, device_id: int):
+    async def delete_device(self, device_id: int):
         """Delete device and its backups."""
-        delete_device_service(device_id)
-        self.load_devices()
+        await run_db(delete_device_service, device_id)
+        await self.apply_device_changes()
 
     @rx.event(background=True)
     async def add_device(self, form_data: dict):
@@ -75,24 +107,26 @@ class DeviceState(rx.State):
         ip = form_data.get("ip", "")
         password = form_data.get("password") or None
         device = await add_device_service(ip, password)
-        async with self:
-            self.load_devices()
-            if device:
-                return ToastState.show_toast(f"Added {device.name}", "success")
-            else:
-                return ToastState.show_toast(f"Failed to add device at {ip} (not found or duplicate)", "error")
+        if device:
+            return [DeviceState.load_devices, ToastState.show_toast(f"Added {device.name}", "success")]
+        return ToastState.show_toast(f"Failed to add device at {ip} (not found or duplicate)", "error")
 
     @rx.event(background=True)
     async def start_scan(self, form_data: dict):
-        """Start IP range scan."""
-        start_ip = form_data.get("start_ip", "")
-        end_ip = form_data.get("end_ip", "")
+        """Scan CIDRs and IP ranges, minus exclusions."""
+        targets = form_data.get("targets", "")
+        exclude = form_data.get("exclude", "")
         password = form_data.get("password") or None
 
         async with self:
             self.scanning = True
 
-        found = await scan_ip_range(start_ip, end_ip, password)
+        try:
+            found = await scan_targets(targets, exclude, password)
+        except ValueError as e:
+            async with self:
+                self.scanning = False
+            return ToastState.show_toast(f"Invalid scan range: {e}", "error")
         added = 0
 
         for device_info in found:
@@ -102,8 +136,10 @@ class DeviceState(rx.State):
 
         async with self:
             self.scanning = False
-            self.load_devices()
-            return ToastState.show_toast(f"Scan complete: {added} devices added", "success")
+            return [
+                DeviceState.load_devices,
+                ToastState.show_toast(f"Scan complete: {added} devices added", "success"),
+            ]
 
     async def handle_csv_import(self, files: list[rx.UploadFile]):
         """Handle CSV file upload for import."""
@@ -112,9 +148,11 @@ class DeviceState(rx.State):
 
         file = files[0]
         content = (await file.read()).decode("utf-8")
-        result = import_devices_csv(content)
+        result = await run_db(import_devices_csv, content)
+        if result["added"]:
+            await run_db(reconcile_backups)
 
-        self.load_devices()
+        await self.apply_device_changes()
 
         msg = f"Imported {result['added']} devices"
         if result["skipped"]:
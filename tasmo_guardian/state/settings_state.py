@@ -2,12 +2,13 @@
 
 import reflex as rx
 
-from ..models.database import db_session
+from ..models.database import run_db
 from ..services.settings import (
     BACKUP_DIRECTORY,
     BACKUP_MAX_COUNT,
     BACKUP_MAX_DAYS,
     BACKUP_MIN_HOURS,
+    BACKUP_NETWORK_LIMITS,
     DEVICE_AUTO_ADD_ON_SCAN,
     DEVICE_AUTO_UPDATE_NAME,
     DEVICE_DEFAULT_PASSWORD,
@@ -22,9 +23,11 @@ from ..services.settings import (
     MQTT_TOPIC_FORMAT,
     MQTT_USERNAME,
     THEME,
-    get_setting,
-    set_setting,
+    Settings,
+    get_settings,
+    set_settings,
 )
+from ..services.network import format_network_limits
 
 
 class SettingsState(rx.State):
@@ -53,76 +56,94 @@ class SettingsState(rx.State):
     backup_max_days: int = 30
     backup_max_count: int = 10
     backup_directory: str = "data/backups"
+    network_limits: str = ""
 
     # Theme
     theme: str = "auto"
 
-    def load_settings(self):
-        """Load all settings from database."""
-        with db_session() as session:
-            self.sort_column = get_setting(session, DISPLAY_SORT_COLUMN, "name")
-            self.rows_per_page = int(get_setting(session, DISPLAY_ROWS_PER_PAGE, "25"))
-            self.show_mac = get_setting(session, DISPLAY_SHOW_MAC, "true") == "true"
+    def _apply_settings(self, settings: Settings):
+        self.sort_column = settings.sort_column
+        self.rows_per_page = settings.rows_per_page
+        self.show_mac = settings.show_mac
 
-            self.default_password = get_setting(session, DEVICE_DEFAULT_PASSWORD, "")
-            self.auto_update_name = get_setting(session, DEVICE_AUTO_UPDATE_NAME, "true") == "true"
-            self.auto_add_on_scan = get_setting(session, DEVICE_AUTO_ADD_ON_SCAN, "false") == "true"
-            self.mqtt_topic_as_name = get_setting(session, DEVICE_MQTT_TOPIC_AS_NAME, "false") == "true"
+        self.default_password = settings.default_password
+        self.auto_update_name = settings.auto_update_name
+        self.auto_add_on_scan = settings.auto_add_on_scan
+        self.mqtt_topic_as_name = settings.mqtt_topic_as_name
 
-            self.mqtt_host = get_setting(session, MQTT_HOST, "")
-            self.mqtt_port = int(get_setting(session, MQTT_PORT, "1883"))
-            self.mqtt_username = get_setting(session, MQTT_USERNAME, "")
-            self.mqtt_topic = get_setting(session, MQTT_TOPIC, "tele/+/LWT")
-            self.mqtt_topic_format = get_setting(session, MQTT_TOPIC_FORMAT, "tasmota")
+        self.mqtt_host = settings.mqtt_host
+        self.mqtt_port = settings.mqtt_port
+        self.mqtt_username = settings.mqtt_username
+        self.mqtt_topic = settings.mqtt_topic
+        self.mqtt_topic_format = settings.mqtt_topic_format
 
-            self.backup_min_hours = int(get_setting(session, BACKUP_MIN_HOURS, "24"))
-            self.backup_max_days = int(get_setting(session, BACKUP_MAX_DAYS, "30"))
-            self.backup_max_count = int(get_setting(session, BACKUP_MAX_COUNT, "10"))
-            self.backup_directory = get_setting(session, BACKUP_DIRECTORY, "data/backups")
+        self.backup_min_hours = settings.backup_min_hours
+        self.backup_max_days = settings.backup_max_days
+        self.backup_max_count = settings.backup_max_count
+        self.backup_directory = settings.backup_directory
+        self.network_limits = format_network_limits(settings.network_limits)
 
-            self.theme = get_setting(session, THEME, "auto")
+        self.theme = settings.theme
 
-    def save_display_preferences(self, form_data: dict):
-        """Save display preferences."""
-        with db_session() as session:
-            set_setting(session, DISPLAY_SORT_COLUMN, form_data.get("sort_column", "name"))
-            set_setting(session, DISPLAY_ROWS_PER_PAGE, form_data.get("rows_per_page", "25"))
-            set_setting(session, DISPLAY_SHOW_MAC, "true" if form_data.get("show_mac") else "false")
-        self.load_settings()
+    async def load_settings(self):
+        """Load all settings from the settings cache."""
+        self._apply_settings(await run_db(get_settings))
 
-    def save_device_defaults(self, form_data: dict):
+    async def save_display_preferences(self, form_data: dict):
+        """Save display preferences."""
+        settings = await run_db(
+            set_settings,
+            {
+                DISPLAY_SORT_COLUMN: form_data.get("sort_column", "name"),
+                DISPLAY_ROWS_PER_PAGE: form_data.get("rows_per_page", "25"),
+                DISPLAY_SHOW_MAC: "true" if form_data.get("show_mac") else "false",
+            },
+        )
+        self._apply_settings(settings)
+
+    async def save_device_defaults(self, form_data: dict):
         """Save device defaults."""
-        with db_session() as session:
-            set_setting(session, DEVICE_DEFAULT_PASSWORD, form_data.get("default_password", ""))
-            set_setting(session, DEVICE_AUTO_UPDATE_NAME, "true" if form_data.get("auto_update_name") else "false")
-            set_setting(session, DEVICE_AUTO_ADD_ON_SCAN, "true" if form_data.get("auto_add_on_scan") else "false")
-            set_setting(session, DEVICE_MQTT_TOPIC_AS_NAME, "true" if form_data.get("mqtt_topic_as_name") else "false")
-        self.load_settings()
-
-    def save_mqtt_settings(self, form_data: dict):
+        settings = await run_db(
+            set_settings,
+            {
+                DEVICE_DEFAULT_PASSWORD: form_data.get("default_password", ""),
+                DEVICE_AUTO_UPDATE_NAME: "true" if form_data.get("auto_update_name") else "false",
+                DEVICE_AUTO_ADD_ON_SCAN: "true" if form_data.get("auto_add_on_scan") else "false",
+                DEVICE_MQTT_TOPIC_AS_NAME: "true" if form_data.get("mqtt_topic_as_name") else "false",
+            },
+        )
+        self._apply_settings(settings)
+
+    async def save_mqtt_settings(self, form_data: dict):
         """Save MQTT settings."""
-        with db_session() as session:
-            set_setting(session, MQTT_HOST, form_data.get("host", ""))
-            set_setting(session, MQTT_PORT, form_data.get("port", "1883"))
-            set_setting(session, MQTT_USERNAME, form_data.get("username", ""))
-            if form_data.get("password"):
-                set_setting(session, MQTT_PASSWORD, form_data["password"])
-            set_setting(session, MQTT_TOPIC, form_data.get("topic", "tele/+/LWT"))
-            set_setting(session, MQTT_TOPIC_FORMAT, form_data.get("topic_format", "tasmota"))
-        self.load_settings()
-
-    def save_backup_settings(self, form_data: dict):
+        values = {
+            MQTT_HOST: form_data.get("host", ""),
+            MQTT_PORT: form_data.get("port", "1883"),
+            MQTT_USERNAME: form_data.get("username", ""),
+            MQTT_TOPIC: form_data.get("topic", "tele/+/LWT"),
+            MQTT_TOPIC_FORMAT: form_data.get("topic_format", "tasmota"),
+        }
+        if form_data.get("password"):
+            values[MQTT_PASSWORD] = form_data["password"]
+        settings = await run_db(set_settings, values)
+        self._apply_settings(settings)
+
+    async def save_backup_settings(self, form_data: dict):
         """Save backup settings."""
-        with db_session() as session:
-            set_setting(session, BACKUP_MIN_HOURS, form_data.get("min_hours", "24"))
-            set_setting(session, BACKUP_MAX_DAYS, form_data.get("max_days", "30"))
-            set_setting(session, BACKUP_MAX_COUNT, form_data.get("max_count", "10"))
-            set_setting(session, BACKUP_DIRECTORY, form_data.get("directory", "data/backups"))
-        self.load_settings()
-
-    def set_theme(self, theme: str | list[str]):
+        settings = await run_db(
+            set_settings,
+            {
+                BACKUP_MIN_HOURS: form_data.get("min_hours", "24"),
+                BACKUP_MAX_DAYS: form_data.get("max_days", "30"),
+                BACKUP_MAX_COUNT: form_data.get("max_count", "10"),
+                BACKUP_DIRECTORY: form_data.get("directory", "data/backups"),
+                BACKUP_NETWORK_LIMITS: form_data.get("network_limits", ""),
+            },
+        )
+        self._apply_settings(settings)
+
+    async def set_theme(self, theme: str | list[str]):
         """Set and persist theme."""
         value = theme[0] if isinstance(theme, list) else theme
         self.theme = value
-        with db_session() as session:
-            set_setting(session, THEME, value)
+        await run_db(set_settings, {THEME: value})
@@ -6,6 +6,7 @@ from fastapi import FastAPI
 from .api.backup import router as backup_router
 from .api.export import router as export_router
 from .components.backup_list import backup_list_page
+from .components.backup_progress import backup_progress
 from .components.device_dialog import add_device_dialog, scan_dialog
 from .components.device_table import device_table
 from .components.export_button import export_button
@@ -18,6 +19,9 @@ from .components.settings_form import (
 )
 from .components.theme_toggle import theme_toggle
 from .components.toast import toast
+from .protocols.http_client import http_client_lifespan
+from .services.reconcile import reconcile_on_startup
+from .services.scheduler import backup_scheduler_lifespan
 from .state.backup_state import BackupState
 from .state.settings_state import SettingsState
 from .state.toast_state import ToastState
@@ -52,6 +56,7 @@ def index() -> rx.Component:
             gap="8px",
             margin_top="1em",
         ),
+        backup_progress(),
         device_table(),
         toast(),
         padding="2em",
@@ -82,6 +87,9 @@ def settings() -> rx.Component:
 
 
 app = rx.App(api_transformer=api)
+app.register_lifespan_task(http_client_lifespan)
+app.register_lifespan_task(reconcile_on_startup)
+app.register_lifespan_task(backup_scheduler_lifespan)
 app.add_page(index)
 app.add_page(settings, route="/settings")
 app.add_page(backup_list_page, route="/backups/[device_id]/[device_name]")
@@ -0,0 +1,39 @@
+"""Shared test fixtures."""
+
+import pytest
+
+from tasmo_guardian.services.backup import (
+    INITIAL_CONCURRENT_BACKUPS,
+    INTERACTIVE_RESERVED_SLOTS,
+    MAX_CONCURRENT_BACKUPS,
+)
+from tasmo_guardian.services.concurrency import AdaptiveLimiter
+from tasmo_guardian.services.scanner import INITIAL_CONCURRENT, MAX_CONCURRENT
+
+
+@pytest.fixture(autouse=True)
+def isolated_db(tmp_path, monkeypatch):
+    """Point the database at a per-test SQLite file."""
+    data_dir = tmp_path / "data"
+    monkeypatch.setattr("tasmo_guardian.models.database.DATA_DIR", data_dir)
+    monkeypatch.setattr("tasmo_guardian.models.database.BACKUP_DIR", data_dir / "backups")
+    monkeypatch.setattr("tasmo_guardian.models.database.DB_PATH", data_dir / "test.sqlite3")
+    monkeypatch.setattr("tasmo_guardian.models.database._engine", None)
+    monkeypatch.setattr("tasmo_guardian.services.settings._cache", None)
+    monkeypatch.setattr("tasmo_guardian.services.health._health", None)
+    monkeypatch.setattr("tasmo_guardian.services.health._probing", set())
+    monkeypatch.setattr("tasmo_guardian.services.network._topology", None)
+    monkeypatch.setattr(
+        "tasmo_guardian.services.backup.backup_limiter",
+        AdaptiveLimiter(
+            "backup",
+            INITIAL_CONCURRENT_BACKUPS,
+            maximum=MAX_CONCURRENT_BACKUPS,
+            reserved=INTERACTIVE_RESERVED_SLOTS,
+        ),
+    )
+    monkeypatch.setattr(
+        "tasmo_guardian.services.scanner.scan_limiter",
+        AdaptiveLimiter("scan", INITIAL_CONCURRENT, maximum=MAX_CONCURRENT),
+    )
+    yield
@@ -1,6 +1,8 @@
 """Tests for backup API endpoint."""
 
-from unittest.mock import AsyncMock, patch, MagicMock
+from unittest.mock import AsyncMock, patch
+
+from tasmo_guardian.models import Device, db_session
 
 
 class TestBackupApiEndpoint:
@@ -10,20 +12,129 @@ class TestBackupApiEndpoint:
 
     async def test_trigger_backup_returns_results(self):
         from tasmo_guardian.api.backup import trigger_backup
-        with patch("tasmo_guardian.api.backup.db_session") as mock_session:
-            with patch("tasmo_guardian.services.backup.backup_device", new_callable=AsyncMock) as mock_backup:
-                mock_device = MagicMock()
-                mock_device.lastbackup = None
-                mock_device.name = "TestDevice"
-                
-                mock_ctx = MagicMock()
-                mock_ctx.query.return_value.all.return_value = [mock_device]
-                mock_session.return_value.__enter__.return_value = mock_ctx
-                mock_backup.return_value = True
+        with db_session() as session:
+            session.add(Device(name="TestDevice", ip="192.168.1.10", mac="AABBCC", type=0, version="13.1.0"))
 
-                with patch("tasmo_guardian.services.backup.count_device_backups", return_value=1):
-                    result = await trigger_backup()
+        with patch("tasmo_guardian.services.backup.backup_device", new_callable=AsyncMock) as mock_backup:
+            with patch("tasmo_guardian.services.backup.probe_config_fingerprint", new_callable=AsyncMock) as mock_probe:
+                mock_backup.return_value = True
+                mock_probe.return_value = None
+                result = await trigger_backup(wait=5)
 
         assert result["status"] == "complete"
         assert result["backed_up"] == 1
         assert result["total"] == 1
+        with db_session() as session:
+            assert session.query(Device).first().lastbackup is not None
+
+
+class TestBackupJobs:
+    def _add_device(self):
+        with db_session() as session:
+            session.add(Device(name="TestDevice", ip="192.168.1.10", mac="AABBCC", type=0, version="13.1.0"))
+
+    async def test_trigger_returns_job_before_run_finishes(self):
+        import asyncio
+        from tasmo_guardian.api.backup import trigger_backup
+        from tasmo_guardian.services.jobs import get_job
+        self._add_device()
+        release = asyncio.Event()
+
+        async def slow_backup(device):
+            await release.wait()
+            return True
+
+        with patch("tasmo_guardian.services.backup.backup_device", side_effect=slow_backup):
+            with patch("tasmo_guardian.services.backup.probe_config_fingerprint", AsyncMock(return_value=None)):
+                result = await trigger_backup()
+                assert result["status"] in ("queued", "running")
+                assert result["finished_at"] is None
+
+                job = get_job(result["id"])
+                for _ in range(100):
+                    if job.devices:
+                        break
+                    await asyncio.sleep(0.01)
+                assert job.to_dict()["running"] == 1
+
+                release.set()
+                await job.done.wait()
+
+        final = job.to_dict()
+        assert final["status"] == "complete"
+        assert final["backed_up"] == 1
+        assert final["devices"][0]["status"] == "backed_up"
+        assert final["devices"][0]["duration_ms"] is not None
+
+    async def test_job_endpoint_long_polls(self):
+        from tasmo_guardian.api.backup import backup_job_endpoint, trigger_backup
+        self._add_device()
+        with patch("tasmo_guardian.services.backup.backup_device", AsyncMock(return_value=False)):
+            with patch("tasmo_guardian.services.backup.probe_config_fingerprint", AsyncMock(return_value=None)):
+                job = await trigger_backup()
+                result = await backup_job_endpoint(job["id"], wait=5)
+
+        assert result["status"] == "complete"
+        assert result["failed"] == 1
+
+    async def test_unknown_job_is_404(self):
+        from tasmo_guardian.api.backup import backup_job_endpoint
+        response = await backup_job_endpoint("missing")
+        assert response.status_code == 404
+
+    async def test_failed_run_marks_job_failed(self):
+        from tasmo_guardian.api.backup import trigger_backup
+        with patch("tasmo_guardian.services.jobs.load_device_snapshots", side_effect=RuntimeError("db down")):
+            result = await trigger_backup(wait=5)
+        assert result["status"] == "failed"
+        assert result["error"] == "db down"
+
+
+class TestCancelBackupJob:
+    def _add_devices(self):
+        with db_session() as session:
+            session.add(Device(name="Fast", ip="192.168.1.10", mac="AABBCC", type=0, version="13.1.0"))
+            session.add(Device(name="Stuck", ip="192.168.1.11", mac="DDEEFF", type=0, version="13.1.0"))
+
+    async def test_cancel_keeps_finished_outcomes(self):
+        import asyncio
+        from tasmo_guardian.api.backup import cancel_backup_job_endpoint, trigger_backup
+        from tasmo_guardian.services.jobs import get_job
+        self._add_devices()
+
+        async def backup(device):
+            if device.name == "Stuck":
+                await asyncio.Event().wait()
+            return True
+
+        with patch("tasmo_guardian.services.backup.backup_device", side_effect=backup):
+            with patch("tasmo_guardian.services.backup.probe_config_fingerprint", AsyncMock(return_value=None)):
+                result = await trigger_backup()
+                job = get_job(result["id"])
+                for _ in range(100):
+                    if job.tracker.counts["backed_up"] and job.tracker.running:
+                        break
+                    await asyncio.sleep(0.01)
+                response = await cancel_backup_job_endpoint(result["id"], wait=5)
+
+        assert response.status_code == 200
+        final = job.to_dict()
+        assert final["status"] == "cancelled"
+        assert final["backed_up"] == 1
+        assert final["running"] == 0
+        assert {d["name"]: d["status"] for d in final["devices"]} == {"Fast": "backed_up", "Stuck": "cancelled"}
+        with db_session() as session:
+            lastbackups = {d.name: d.lastbackup for d in session.query(Device)}
+        assert lastbackups["Fast"] is not None
+        assert lastbackups["Stuck"] is None
+
+    async def test_cancel_finished_job_is_409(self):
+        from tasmo_guardian.api.backup import cancel_backup_job_endpoint, trigger_backup
+        result = await trigger_backup(wait=5)
+        response = await cancel_backup_job_endpoint(result["id"])
+        assert response.status_code == 409
+
+    async def test_cancel_unknown_job_is_404(self):
+        from tasmo_guardian.api.backup import cancel_backup_job_endpoint
+        response = await cancel_backup_job_endpoint("missing")
+        assert response.status_code == 404
@@ -1,7 +1,16 @@
 """Tests for backup history."""
 
-from unittest.mock import patch, MagicMock
 from datetime import datetime
+from pathlib import Path
+from unittest.mock import MagicMock
+
+
+def make_device(device_id=1, name="TestDevice"):
+    device = MagicMock()
+    device.id = device_id
+    device.name = name
+    device.version = "13.1.0"
+    return device
 
 
 class TestGetBackupHistory:
@@ -9,52 +18,80 @@ class TestGetBackupHistory:
         from tasmo_guardian.services.backup import get_backup_history
         assert get_backup_history is not None
 
-    def test_empty_dir_returns_empty_list(self):
+    def test_no_backups_returns_empty_list(self):
         from tasmo_guardian.services.backup import get_backup_history
-        with patch("tasmo_guardian.services.backup.BACKUP_DIR") as mock_dir:
-            mock_path = MagicMock()
-            mock_dir.__truediv__.return_value = mock_path
-            mock_path.exists.return_value = False
-            result = get_backup_history("TestDevice")
-        assert result == []
-
-    def test_parses_backup_filenames(self):
-        from tasmo_guardian.services.backup import get_backup_history
-        with patch("tasmo_guardian.services.backup.BACKUP_DIR") as mock_dir:
-            mock_path = MagicMock()
-            mock_dir.__truediv__.return_value = mock_path
-            mock_path.exists.return_value = True
-
-            mock_file = MagicMock()
-            mock_file.name = "AABBCC-2026-01-15_10_30_00-v13.1.0.dmp"
-            mock_file.stat.return_value.st_size = 1024
+        assert get_backup_history(1) == []
 
-            mock_path.iterdir.return_value = [mock_file]
+    def test_returns_indexed_backups(self):
+        from tasmo_guardian.services.backup import get_backup_history, index_backup
+        path = Path("data/backups/TestDevice/AABBCC-2026-01-15_10_30_00-v13.1.0.dmp")
+        index_backup(make_device(), path, datetime(2026, 1, 15, 10, 30), 1024, "abc")
 
-            result = get_backup_history("TestDevice")
+        result = get_backup_history(1)
 
         assert len(result) == 1
         assert result[0]["filename"] == "AABBCC-2026-01-15_10_30_00-v13.1.0.dmp"
         assert result[0]["version"] == "13.1.0"
         assert result[0]["size"] == 1024
+        assert result[0]["path"] == str(path)
 
     def test_sorted_newest_first(self):
-        from tasmo_guardian.services.backup import get_backup_history
-        with patch("tasmo_guardian.services.backup.BACKUP_DIR") as mock_dir:
-            mock_path = MagicMock()
-            mock_dir.__truediv__.return_value = mock_path
-            mock_path.exists.return_value = True
+        from tasmo_guardian.services.backup import get_backup_history, index_backup
+        device = make_device()
+        index_backup(device, Path("a/AABBCC-2026-01-14_10_30_00-v13.1.0.dmp"), datetime(2026, 1, 14), 1024, "a")
+        index_backup(device, Path("a/AABBCC-2026-01-16_10_30_00-v13.1.0.dmp"), datetime(2026, 1, 16), 2048, "b")
 
-            mock_file1 = MagicMock()
-            mock_file1.name = "AABBCC-2026-01-14_10_30_00-v13.1.0.dmp"
-            mock_file1.stat.return_value.st_size = 1024
+        result = get_backup_history(1)
 
-            mock_file2 = MagicMock()
-            mock_file2.name = "AABBCC-2026-01-16_10_30_00-v13.1.0.dmp"
-            mock_file2.stat.return_value.st_size = 2048
+        assert result[0]["filename"] == "AABBCC-2026-01-16_10_30_00-v13.1.0.dmp"
 
-            mock_path.iterdir.return_value = [mock_file1, mock_file2]
+    def test_limit_and_device_filter(self):
+        from tasmo_guardian.services.backup import count_device_backups, get_backup_history, index_backup
+        for day in range(1, 4):
+            index_backup(make_device(), Path(f"a/{day}.dmp"), datetime(2026, 1, day), 1, str(day))
+        index_backup(make_device(2, "Other"), Path("b/1.dmp"), datetime(2026, 1, 1), 1, "x")
 
-            result = get_backup_history("TestDevice")
+        assert len(get_backup_history(1, limit=2)) == 2
+        assert count_device_backups(1) == 3
+        assert count_device_backups(2) == 1
 
-        assert result[0]["filename"] == "AABBCC-2026-01-16_10_30_00-v13.1.0.dmp"
+    def test_delete_backup_removes_index_entry(self, tmp_path):
+        from tasmo_guardian.services.backup import count_device_backups, delete_backup, index_backup
+        path = tmp_path / "AABBCC-2026-01-15_10_30_00-v13.1.0.dmp"
+        path.write_bytes(b"data")
+        index_backup(make_device(), path, datetime(2026, 1, 15), 4, "abc")
+
+        delete_backup(str(path))
+
+        assert not path.exists()
+        assert count_device_backups(1) == 0
+
+    def test_legacy_data_column_is_tolerated(self):
+        from tasmo_guardian.services.backup import parse_backup_data
+        assert parse_backup_data(None) == {}
+        assert parse_backup_data("not json") == {}
+        assert parse_backup_data('{"size": 5, "sha256": "x"}') == {"size": 5, "sha256": "x"}
+
+    def test_index_after_reconcile_keeps_one_row(self, tmp_path):
+        from unittest.mock import patch
+
+        from tasmo_guardian.models import Backup, Device, db_session
+        from tasmo_guardian.services.backup import get_backup_history, index_backup
+        from tasmo_guardian.services.reconcile import reconcile_backups
+        with db_session() as session:
+            device = Device(name="Plug", ip="192.168.1.10", mac="AABBCCDDEEFF", type=0, version="13.1.0")
+            session.add(device)
+            session.flush()
+            device_id = device.id
+        path = tmp_path / "Plug" / "AABBCCDDEEFF-2026-01-15_10_30_00-v13.1.0.dmp"
+        path.parent.mkdir()
+        path.write_bytes(b"data")
+
+        # Reconcile lands after the file is moved into place but before it is indexed
+        with patch("tasmo_guardian.services.backup.BACKUP_DIR", tmp_path):
+            reconcile_backups()
+        index_backup(make_device(device_id, "Plug"), path, datetime(2026, 1, 15, 10, 30), 4, "abc")
+
+        with db_session() as session:
+            assert session.query(Backup).count() == 1
+        assert get_backup_history(device_id)[0]["sha256"] == "abc"
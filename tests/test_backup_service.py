@@ -4,12 +4,20 @@ from unittest.mock import AsyncMock, patch, MagicMock
 from datetime import datetime, timedelta
 
 
+def fake_download(content: bytes):
+    async def download(ip, dest, password=None, timeout=None):
+        dest.write_bytes(content)
+        return len(content)
+
+    return download
+
+
 class TestBackupDevice:
     async def test_backup_device_importable(self):
         from tasmo_guardian.services.backup import backup_device
         assert backup_device is not None
 
-    async def test_tasmota_backup_saves_dmp_file(self):
+    async def test_tasmota_backup_saves_dmp_file(self, tmp_path):
         from tasmo_guardian.services.backup import backup_device
         mock_device = MagicMock()
         mock_device.id = 1
@@ -20,21 +28,16 @@ class TestBackupDevice:
         mock_device.mac = "AABBCC"
         mock_device.version = "13.1.0"
 
-        with patch("tasmo_guardian.services.backup.download_tasmota_backup", new_callable=AsyncMock) as mock_dl:
-            with patch("tasmo_guardian.services.backup.BACKUP_DIR") as mock_dir:
-                mock_dl.return_value = b"backup_data"
-                mock_path = MagicMock()
-                mock_dir.__truediv__.return_value = mock_path
-                mock_path.__truediv__.return_value = mock_path
-                mock_path.mkdir = MagicMock()
-                mock_path.write_bytes = MagicMock()
-
+        with patch("tasmo_guardian.services.backup.download_tasmota_backup", side_effect=fake_download(b"backup_data")):
+            with patch("tasmo_guardian.services.backup.BACKUP_DIR", tmp_path):
                 result = await backup_device(mock_device)
 
         assert result is True
-        mock_path.write_bytes.assert_called_once_with(b"backup_data")
+        files = list((tmp_path / "TestDevice").iterdir())
+        assert [f.suffix for f in files] == [".dmp"]
+        assert files[0].read_bytes() == b"backup_data"
 
-    async def test_wled_backup_saves_zip_file(self):
+    async def test_wled_backup_saves_zip_file(self, tmp_path):
         from tasmo_guardian.services.backup import backup_device
         mock_device = MagicMock()
         mock_device.id = 2
@@ -44,33 +47,78 @@ class TestBackupDevice:
         mock_device.mac = "DDEEFF"
         mock_device.version = "0.14.0"
 
-        with patch("tasmo_guardian.services.backup.download_wled_backup", new_callable=AsyncMock) as mock_dl:
-            with patch("tasmo_guardian.services.backup.BACKUP_DIR") as mock_dir:
-                mock_dl.return_value = b"zip_data"
-                mock_path = MagicMock()
-                mock_dir.__truediv__.return_value = mock_path
-                mock_path.__truediv__.return_value = mock_path
-                mock_path.mkdir = MagicMock()
-                mock_path.write_bytes = MagicMock()
-
+        with patch("tasmo_guardian.services.backup.download_wled_backup", side_effect=fake_download(b"zip_data")):
+            with patch("tasmo_guardian.services.backup.BACKUP_DIR", tmp_path):
                 result = await backup_device(mock_device)
 
         assert result is True
+        assert [f.suffix for f in (tmp_path / "LEDStrip").iterdir()] == [".zip"]
 
-    async def test_backup_failure_returns_false(self):
+    async def test_backup_failure_returns_false(self, tmp_path):
         from tasmo_guardian.services.backup import backup_device
         mock_device = MagicMock()
         mock_device.id = 1
         mock_device.type = 0
         mock_device.ip = "192.168.1.10"
         mock_device.password = ""
+        mock_device.name = "TestDevice"
 
         with patch("tasmo_guardian.services.backup.download_tasmota_backup", new_callable=AsyncMock) as mock_dl:
-            mock_dl.return_value = None
-            result = await backup_device(mock_device)
+            with patch("tasmo_guardian.services.backup.BACKUP_DIR", tmp_path):
+                mock_dl.return_value = None
+                result = await backup_device(mock_device)
 
         assert result is False
 
+    async def test_partial_download_leaves_no_file(self, tmp_path):
+        from tasmo_guardian.services.backup import backup_device
+        mock_device = MagicMock()
+        mock_device.id = 1
+        mock_device.type = 0
+        mock_device.ip = "192.168.1.10"
+        mock_device.password = ""
+        mock_device.name = "TestDevice"
+        mock_device.mac = "AABBCC"
+        mock_device.version = "13.1.0"
+
+        async def interrupted(ip, dest, password=None, timeout=None):
+            dest.write_bytes(b"half")
+            raise RuntimeError("crash mid-download")
+
+        with patch("tasmo_guardian.services.backup.download_tasmota_backup", side_effect=interrupted):
+            with patch("tasmo_guardian.services.backup.BACKUP_DIR", tmp_path):
+                try:
+                    await backup_device(mock_device)
+                except RuntimeError:
+                    pass
+
+        assert list((tmp_path / "TestDevice").iterdir()) == []
+
+    async def test_cancelled_download_leaves_no_file(self, tmp_path):
+        import asyncio
+        import pytest
+        from tasmo_guardian.services.backup import backup_device
+        mock_device = MagicMock()
+        mock_device.id = 1
+        mock_device.type = 0
+        mock_device.name = "TestDevice"
+        started = asyncio.Event()
+
+        async def stalled(ip, dest, password=None, timeout=None):
+            dest.write_bytes(b"half")
+            started.set()
+            await asyncio.Event().wait()
+
+        with patch("tasmo_guardian.services.backup.download_tasmota_backup", side_effect=stalled):
+            with patch("tasmo_guardian.services.backup.BACKUP_DIR", tmp_path):
+                task = asyncio.create_task(backup_device(mock_device))
+                await started.wait()
+                task.cancel()
+                with pytest.raises(asyncio.CancelledError):
+                    await task
+
+        assert list((tmp_path / "TestDevice").iterdir()) == []
+
 
 class TestBackupAllDevices:
     async def test_backup_all_devices_importable(self):
@@ -103,3 +151,327 @@ class TestBackupAllDevices:
 
         assert results["failed"] == 1
         assert results["backed_up"] == 0
+
+    async def test_backup_all_runs_devices_concurrently(self):
+        import asyncio
+        from tasmo_guardian.services.backup import backup_all_devices
+        devices = [MagicMock(lastbackup=None) for _ in range(5)]
+        running = 0
+        peak = 0
+
+        async def slow_backup(device):
+            nonlocal running, peak
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.01)
+            running -= 1
+            return True
+
+        with patch("tasmo_guardian.services.backup.backup_device", side_effect=slow_backup):
+            results = await backup_all_devices(devices, min_hours=24, max_concurrent=3)
+
+        assert results["backed_up"] == 5
+        assert peak == 3
+
+    async def test_max_concurrent_is_fixed_despite_failures(self):
+        import asyncio
+        from tasmo_guardian.services.backup import backup_all_devices
+        devices = [MagicMock(lastbackup=None) for _ in range(6)]
+        started = 0
+        running = 0
+        second_wave_peak = 0
+
+        async def failing_backup(device):
+            nonlocal started, running, second_wave_peak
+            started += 1
+            running += 1
+            if started > 3:
+                second_wave_peak = max(second_wave_peak, running)
+            await asyncio.sleep(0.01)
+            running -= 1
+            return False
+
+        with patch("tasmo_guardian.services.backup.backup_device", side_effect=failing_backup):
+            await backup_all_devices(devices, min_hours=24, max_concurrent=3)
+
+        assert second_wave_peak == 3
+
+    async def test_backup_all_calls_on_success_for_backed_up(self):
+        from tasmo_guardian.services.backup import backup_all_devices
+        ok = MagicMock(lastbackup=None)
+        bad = MagicMock(lastbackup=None)
+        on_success = MagicMock()
+
+        with patch("tasmo_guardian.services.backup.backup_device", new_callable=AsyncMock) as mock_backup:
+            mock_backup.side_effect = lambda d: d is ok
+            await backup_all_devices([ok, bad], min_hours=24, on_success=on_success)
+
+        on_success.assert_called_once_with(ok)
+
+
+class TestConfigChangeProbe:
+    def _index(self, tmp_path, fingerprint=None):
+        from tasmo_guardian.services.backup import index_backup, store_fingerprint
+        device = MagicMock(id=1, version="13.1.0")
+        device.name = "Plug"
+        index_backup(device, tmp_path / "old.dmp", datetime.now() - timedelta(days=2), 10, "abc")
+        if fingerprint:
+            store_fingerprint(1, fingerprint)
+
+    async def test_unchanged_device_skips_download(self, tmp_path):
+        from tasmo_guardian.services.backup import backup_all_devices
+        device = MagicMock(id=1, lastbackup=None)
+        device.name = "Plug"
+        on_success = MagicMock()
+        self._index(tmp_path, "tasmota:1:2:3")
+
+        with patch("tasmo_guardian.services.backup.probe_config_fingerprint", new_callable=AsyncMock) as mock_probe:
+            with patch("tasmo_guardian.services.backup.backup_device", new_callable=AsyncMock) as mock_backup:
+                mock_probe.return_value = "tasmota:1:2:3"
+                results = await backup_all_devices([device], min_hours=24, on_success=on_success)
+
+        mock_backup.assert_not_called()
+        on_success.assert_called_once_with(device)
+        assert results["skipped"] == 1
+
+    async def test_device_without_backups_is_downloaded(self, tmp_path):
+        from tasmo_guardian.services.backup import backup_all_devices
+        device = MagicMock(id=1, lastbackup=None)
+        device.name = "Plug"
+
+        with patch("tasmo_guardian.services.backup.probe_config_fingerprint", AsyncMock(return_value="tasmota:1:2:3")):
+            with patch("tasmo_guardian.services.backup.backup_device", AsyncMock(return_value=True)) as mock_backup:
+                results = await backup_all_devices([device], min_hours=24)
+
+        mock_backup.assert_awaited_once()
+        assert results["backed_up"] == 1
+
+    async def test_changed_device_backs_up_and_stores_fingerprint(self, tmp_path):
+        from tasmo_guardian.services.backup import backup_all_devices, get_backup_history, index_backup
+        device = MagicMock(id=1, lastbackup=None, version="13.1.0")
+        device.name = "Plug"
+        self._index(tmp_path, "tasmota:1:2:3")
+
+        async def backup(d):
+            index_backup(d, tmp_path / "new.dmp", datetime.now(), 10, "def")
+            return True
+
+        with patch("tasmo_guardian.services.backup.probe_config_fingerprint", new_callable=AsyncMock) as mock_probe:
+            with patch("tasmo_guardian.services.backup.backup_device", side_effect=backup):
+                mock_probe.return_value = "tasmota:1:3:3"
+                results = await backup_all_devices([device], min_hours=24)
+
+        assert results["backed_up"] == 1
+        latest, previous = get_backup_history(1)
+        assert latest["fingerprint"] == "tasmota:1:3:3"
+        assert previous["fingerprint"] == "tasmota:1:2:3"
+
+
+class TestBackupDeduplication:
+    def _device(self):
+        device = MagicMock()
+        device.id = 1
+        device.type = 0
+        device.ip = "192.168.1.10"
+        device.password = ""
+        device.name = "Plug"
+        device.mac = "AABBCC"
+        device.version = "13.1.0"
+        return device
+
+    async def test_identical_payload_is_hardlinked(self, tmp_path):
+        import hashlib
+        from tasmo_guardian.services.backup import backup_device, index_backup
+        device_dir = tmp_path / "Plug"
+        device_dir.mkdir()
+        date = datetime.now().replace(microsecond=0) - timedelta(days=1)
+        previous = device_dir / f"AABBCC-{date:%Y-%m-%d_%H_%M_%S}-v13.1.0.dmp"
+        previous.write_bytes(b"same_config")
+        index_backup(
+            self._device(), previous, date, 11,
+            hashlib.sha256(b"same_config").hexdigest(),
+        )
+
+        with patch("tasmo_guardian.services.backup.BACKUP_DIR", tmp_path):
+            with patch("tasmo_guardian.services.backup.download_tasmota_backup", side_effect=fake_download(b"same_config")):
+                assert await backup_device(self._device()) is True
+
+        files = list(device_dir.glob("*.dmp"))
+        assert len(files) == 2
+        assert all(f.stat().st_ino == previous.stat().st_ino for f in files)
+
+    async def test_changed_payload_is_written(self, tmp_path):
+        from tasmo_guardian.services.backup import backup_device
+        device_dir = tmp_path / "Plug"
+        device_dir.mkdir()
+        previous = device_dir / "AABBCC-2026-01-15_10_30_00-v13.1.0.dmp"
+        previous.write_bytes(b"old_config")
+
+        with patch("tasmo_guardian.services.backup.BACKUP_DIR", tmp_path):
+            with patch("tasmo_guardian.services.backup.download_tasmota_backup", side_effect=fake_download(b"new_config")):
+                await backup_device(self._device())
+
+        new = [f for f in device_dir.glob("*.dmp") if f != previous]
+        assert new[0].read_bytes() == b"new_config"
+        assert new[0].stat().st_ino != previous.stat().st_ino
+
+
+class TestBackupRetention:
+    async def test_backup_applies_configured_retention(self, tmp_path):
+        from tasmo_guardian.models import db_session
+        from tasmo_guardian.services.backup import backup_device, get_backup_history, index_backup
+        from tasmo_guardian.services.settings import BACKUP_MAX_COUNT, set_settings
+        set_settings({BACKUP_MAX_COUNT: "1"})
+        device = TestBackupDeduplication()._device()
+        device_dir = tmp_path / "Plug"
+        device_dir.mkdir()
+        previous = device_dir / "AABBCC-old.dmp"
+        previous.write_bytes(b"old_config")
+        index_backup(device, previous, datetime.now() - timedelta(days=1), 10, "x")
+
+        with patch("tasmo_guardian.services.backup.BACKUP_DIR", tmp_path):
+            with patch("tasmo_guardian.services.backup.download_tasmota_backup", side_effect=fake_download(b"new_config")):
+                assert await backup_device(device) is True
+
+        history = get_backup_history(device.id)
+        assert len(history) == 1
+        assert not previous.exists()
+
+
+class TestOutcomeBatching:
+    def _add_device(self, name):
+        from tasmo_guardian.models import Device, db_session
+        with db_session() as session:
+            device = Device(name=name, ip="192.168.1.10", mac=name, type=0, version="13.1.0")
+            session.add(device)
+            session.flush()
+            return device.id
+
+    def test_snapshot_is_detached_from_session(self):
+        from tasmo_guardian.services.backup import load_device_snapshots
+        self._add_device("Plug")
+        snapshots = load_device_snapshots()
+        assert snapshots[0].name == "Plug"
+        assert snapshots[0].lastbackup is None
+
+    async def test_batcher_flushes_at_batch_size(self):
+        from tasmo_guardian.services.backup import BackupOutcomeBatcher, load_device_snapshot
+        ids = [self._add_device(f"Plug{i}") for i in range(3)]
+        batcher = BackupOutcomeBatcher(batch_size=2, interval=3600)
+
+        with patch("tasmo_guardian.services.backup.apply_backup_outcomes") as mock_apply:
+            await batcher.add(MagicMock(id=ids[0]))
+            mock_apply.assert_not_called()
+            await batcher.add(MagicMock(id=ids[1]))
+            mock_apply.assert_called_once()
+            assert set(mock_apply.call_args.args[0]) == {ids[0], ids[1]}
+
+        await batcher.add(MagicMock(id=ids[2]))
+        await batcher.flush()
+        assert load_device_snapshot(ids[2]).lastbackup is not None
+
+    def test_apply_outcomes_sets_counts(self):
+        from pathlib import Path
+        from tasmo_guardian.models import Device, db_session
+        from tasmo_guardian.services.backup import apply_backup_outcomes, index_backup, load_device_snapshot
+        device_id = self._add_device("Plug")
+        device = load_device_snapshot(device_id)
+        index_backup(device, Path("a.dmp"), datetime.now(), 1, "x")
+        index_backup(device, Path("b.dmp"), datetime.now(), 1, "y")
+
+        apply_backup_outcomes({device_id: datetime(2026, 1, 1)})
+
+        with db_session() as session:
+            updated = session.get(Device, device_id)
+            assert updated.noofbackups == 2
+            assert updated.lastbackup == datetime(2026, 1, 1)
+
+
+class TestSingleFlight:
+    async def test_concurrent_backups_of_one_device_share_a_download(self, tmp_path):
+        import asyncio
+        from tasmo_guardian.services.backup import backup_device
+        device = TestBackupDeduplication()._device()
+        calls = 0
+
+        async def slow_download(ip, dest, password=None, timeout=None):
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.05)
+            dest.write_bytes(b"config")
+            return 6
+
+        with patch("tasmo_guardian.services.backup.BACKUP_DIR", tmp_path):
+            with patch("tasmo_guardian.services.backup.download_tasmota_backup", side_effect=slow_download):
+                results = await asyncio.gather(backup_device(device), backup_device(device))
+
+        assert results == [True, True]
+        assert calls == 1
+        assert len(list((tmp_path / "Plug").glob("*.dmp"))) == 1
+
+    async def test_cancelled_owner_fails_attached_callers(self, tmp_path):
+        import asyncio
+        import pytest
+        from tasmo_guardian.services.backup import backup_device
+        device = TestBackupDeduplication()._device()
+        started = asyncio.Event()
+
+        async def stalled(ip, dest, password=None, timeout=None):
+            started.set()
+            await asyncio.Event().wait()
+
+        with patch("tasmo_guardian.services.backup.BACKUP_DIR", tmp_path):
+            with patch("tasmo_guardian.services.backup.download_tasmota_backup", side_effect=stalled):
+                owner = asyncio.create_task(backup_device(device))
+                await started.wait()
+                attached = asyncio.create_task(backup_device(device))
+                await asyncio.sleep(0)
+                owner.cancel()
+                with pytest.raises(asyncio.CancelledError):
+                    await owner
+                assert await attached is False
+
+    async def test_overlapping_triggers_attach_to_active_job(self):
+        import threading
+        from tasmo_guardian.services.jobs import start_backup_job
+        release = threading.Event()
+
+        def slow_snapshots():
+            release.wait(5)
+            return []
+
+        with patch("tasmo_guardian.services.jobs.load_device_snapshots", side_effect=slow_snapshots):
+            first = start_backup_job()
+            assert start_backup_job() is first
+            release.set()
+            await first.done.wait()
+
+            second = start_backup_job()
+            assert second is not first
+            await second.done.wait()
+
+
+class TestRunContainment:
+    async def test_device_error_does_not_abort_run(self):
+        import asyncio
+        from tasmo_guardian.services.backup import backup_all_devices
+        broken = MagicMock(id=1, lastbackup=None)
+        slow = MagicMock(id=2, lastbackup=None)
+        finished = []
+
+        async def backup(device):
+            if device is broken:
+                raise OSError("disk full")
+            await asyncio.sleep(0.02)
+            finished.append(device)
+            return True
+
+        on_success = MagicMock()
+        with patch("tasmo_guardian.services.backup.probe_config_fingerprint", AsyncMock(return_value=None)):
+            with patch("tasmo_guardian.services.backup.backup_device", side_effect=backup):
+                results = await backup_all_devices([broken, slow], on_success=on_success)
+
+        assert results["failed"] == 1
+        assert results["backed_up"] == 1
+        assert finished == [slow]
+        on_success.assert_called_once_with(slow)
@@ -0,0 +1,175 @@
+"""Tests for the adaptive concurrency limiter."""
+
+import asyncio
+
+import pytest
+
+from tasmo_guardian.services.concurrency import AdaptiveLimiter
+
+
+class TestAdaptiveLimiter:
+    async def test_limits_concurrent_slots(self):
+        limiter = AdaptiveLimiter("test", initial=2, maximum=2)
+        running = 0
+        peak = 0
+
+        async def work():
+            nonlocal running, peak
+            async with limiter.slot():
+                running += 1
+                peak = max(peak, running)
+                await asyncio.sleep(0.01)
+                running -= 1
+
+        await asyncio.gather(*[work() for _ in range(6)])
+        assert peak == 2
+        assert limiter.in_flight == 0
+
+    async def test_serves_waiters_in_order(self):
+        limiter = AdaptiveLimiter("test", initial=1, maximum=1)
+        order = []
+
+        async def work(i):
+            async with limiter.slot():
+                order.append(i)
+                await asyncio.sleep(0)
+
+        await asyncio.gather(*[work(i) for i in range(5)])
+        assert order == [0, 1, 2, 3, 4]
+
+    async def test_healthy_successes_raise_limit(self):
+        limiter = AdaptiveLimiter("test", initial=2, maximum=10)
+        for _ in range(6):
+            async with limiter.slot() as slot:
+                slot.succeeded()
+        assert limiter.current == 4
+
+    async def test_limit_stops_at_maximum(self):
+        limiter = AdaptiveLimiter("test", initial=2, maximum=3)
+        for _ in range(20):
+            async with limiter.slot() as slot:
+                slot.succeeded()
+        assert limiter.current == 3
+
+    async def test_failure_halves_limit(self):
+        limiter = AdaptiveLimiter("test", initial=8, maximum=10)
+        async with limiter.slot() as slot:
+            slot.failed()
+        assert limiter.current == 4
+
+    async def test_exception_counts_as_failure(self):
+        limiter = AdaptiveLimiter("test", initial=8, maximum=10)
+        with pytest.raises(RuntimeError):
+            async with limiter.slot():
+                raise RuntimeError("connection reset")
+        assert limiter.current == 4
+        assert limiter.in_flight == 0
+
+    async def test_failures_from_one_window_cut_once(self):
+        limiter = AdaptiveLimiter("test", initial=8, maximum=10)
+
+        async def timeout():
+            async with limiter.slot() as slot:
+                await asyncio.sleep(0.01)
+                slot.failed()
+
+        await asyncio.gather(*[timeout() for _ in range(4)])
+        assert limiter.current == 4
+
+    async def test_never_drops_below_minimum(self):
+        limiter = AdaptiveLimiter("test", initial=2, maximum=10)
+        for _ in range(5):
+            async with limiter.slot() as slot:
+                slot.failed()
+        assert limiter.current == 1
+
+    async def test_slow_success_holds_limit(self):
+        limiter = AdaptiveLimiter("test", initial=2, maximum=10)
+        async with limiter.slot() as slot:
+            await asyncio.sleep(0.25)
+            slot.succeeded(expected=0.1)
+        assert limiter.limit == 2.0
+
+    async def test_no_feedback_leaves_limit(self):
+        limiter = AdaptiveLimiter("test", initial=2, maximum=10)
+        async with limiter.slot():
+            pass
+        assert limiter.limit == 2.0
+
+    async def test_cancelled_waiter_does_not_leak_slot(self):
+        limiter = AdaptiveLimiter("test", initial=1, maximum=1)
+        release = asyncio.Event()
+
+        async def hold():
+            async with limiter.slot():
+                await release.wait()
+
+        holder = asyncio.create_task(hold())
+        await asyncio.sleep(0)
+        waiter = asyncio.create_task(hold())
+        await asyncio.sleep(0)
+        waiter.cancel()
+        release.set()
+        await holder
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        assert limiter.in_flight == 0
+
+
+class TestInteractiveLane:
+    async def test_interactive_waiter_goes_first(self):
+        limiter = AdaptiveLimiter("test", initial=1, maximum=1)
+        release = asyncio.Event()
+        order = []
+
+        async def work(name, interactive=False):
+            async with limiter.slot(interactive=interactive):
+                order.append(name)
+                if name == "holder":
+                    await release.wait()
+
+        tasks = [asyncio.create_task(work("holder"))]
+        await asyncio.sleep(0)
+        tasks += [asyncio.create_task(work(f"fleet{i}")) for i in range(3)]
+        await asyncio.sleep(0)
+        tasks.append(asyncio.create_task(work("click", interactive=True)))
+        await asyncio.sleep(0)
+        release.set()
+        await asyncio.gather(*tasks)
+        assert order == ["holder", "click", "fleet0", "fleet1", "fleet2"]
+
+    async def test_fleet_leaves_reserved_slot_free(self):
+        limiter = AdaptiveLimiter("test", initial=3, maximum=3, reserved=1)
+        release = asyncio.Event()
+
+        async def hold(interactive=False):
+            async with limiter.slot(interactive=interactive):
+                await release.wait()
+
+        fleet = [asyncio.create_task(hold()) for _ in range(5)]
+        await asyncio.sleep(0)
+        assert limiter.in_flight == 2
+
+        click = asyncio.create_task(hold(interactive=True))
+        await asyncio.sleep(0)
+        assert limiter.in_flight == 3
+        release.set()
+        await asyncio.gather(*fleet, click)
+
+    async def test_fleet_always_gets_one_slot(self):
+        limiter = AdaptiveLimiter("test", initial=1, maximum=1, reserved=1)
+        async with limiter.slot():
+            assert limiter.in_flight == 1
+
+
+class TestRunInteractive:
+    async def test_runs_operation_in_interactive_slot(self):
+        from unittest.mock import AsyncMock, MagicMock
+
+        from tasmo_guardian.services import backup
+
+        device = MagicMock(id=1)
+        operation = AsyncMock(return_value=True)
+        assert await backup.run_interactive(operation, device, "/tmp/x.dmp") is True
+        operation.assert_awaited_once_with(device, "/tmp/x.dmp")
+        assert backup.backup_limiter.in_flight == 0
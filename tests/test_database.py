@@ -99,3 +99,53 @@ def test_v1_database_import():
             loaded = session.query(Device).first()
             assert loaded.name == "V1 Device"
             assert loaded.noofbackups == 3
+
+
+def test_sqlite_pragmas_applied():
+    """Connections use WAL, NORMAL sync and a busy timeout."""
+    from sqlalchemy import text
+
+    with db_session() as session:
+        assert session.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+        assert session.execute(text("PRAGMA synchronous")).scalar() == 1  # NORMAL
+        assert session.execute(text("PRAGMA busy_timeout")).scalar() == 5000
+
+
+def test_sessionmaker_cached_per_engine():
+    """get_session reuses one sessionmaker until the engine changes."""
+    from tasmo_guardian.models import database
+
+    get_session().close()
+    factory = database._session_factory
+    get_session().close()
+    assert database._session_factory is factory
+
+    with patch("tasmo_guardian.models.database._engine", None):
+        get_session().close()
+        assert database._session_factory is not factory
+
+
+async def test_run_db_runs_off_event_loop():
+    """run_db executes on a DB worker thread and returns the result."""
+    import threading
+
+    from tasmo_guardian.models import run_db
+
+    def work(value, *, scale):
+        return threading.current_thread().name, value * scale
+
+    thread_name, result = await run_db(work, 2, scale=3)
+    assert thread_name.startswith("db")
+    assert result == 6
+
+
+def test_device_lookup_indexes_created():
+    """Indexes on devices(name), devices(ip) and devices(mac) exist."""
+    from sqlalchemy import inspect
+
+    from tasmo_guardian.models.database import get_engine
+
+    indexes = {i["name"]: i["column_names"] for i in inspect(get_engine()).get_indexes("devices")}
+    assert indexes["devicesname"] == ["name"]
+    assert indexes["devicesip"] == ["ip"]
+    assert indexes["devicesmac"] == ["mac"]
@@ -0,0 +1,62 @@
+"""Tests for the device change log."""
+
+from datetime import datetime
+
+from tasmo_guardian.services.device_changes import DeviceChangeLog
+
+
+class TestDeviceChangeLog:
+    def test_no_changes_since_current_seq(self):
+        log = DeviceChangeLog()
+        log.publish({1: {"name": "Plug"}})
+        assert log.since(log.seq) == (log.seq, {})
+
+    def test_merges_fields_per_device(self):
+        log = DeviceChangeLog()
+        log.publish({1: {"noofbackups": 1}})
+        log.publish({1: {"noofbackups": 2, "lastbackup": "2026-01-01 00:00:00"}, 2: {"name": "Bulb"}})
+        seq, changes = log.since(0)
+        assert seq == 2
+        assert changes == {
+            1: {"noofbackups": 2, "lastbackup": "2026-01-01 00:00:00"},
+            2: {"name": "Bulb"},
+        }
+
+    def test_delete_wins_over_later_fields(self):
+        log = DeviceChangeLog()
+        log.publish({1: None})
+        log.publish({1: {"name": "Plug"}})
+        assert log.since(0)[1] == {1: None}
+
+    def test_reset_forces_reload(self):
+        log = DeviceChangeLog()
+        log.publish({1: {"name": "Plug"}})
+        log.publish_reset()
+        assert log.since(1)[1] is None
+        assert log.since(log.seq) == (log.seq, {})
+
+    def test_cursor_older_than_log_forces_reload(self):
+        log = DeviceChangeLog(maxlen=2)
+        for i in range(3):
+            log.publish({i: {"name": str(i)}})
+        assert log.since(0)[1] is None
+        assert log.since(1)[1] == {1: {"name": "1"}, 2: {"name": "2"}}
+
+
+class TestPublishers:
+    def test_backup_outcomes_publish_row_changes(self):
+        from tasmo_guardian.models import Device, db_session
+        from tasmo_guardian.services.backup import apply_backup_outcomes
+        from tasmo_guardian.services.device_changes import change_log
+
+        with db_session() as session:
+            device = Device(name="Plug", ip="192.168.1.10", mac="AABBCC", type=0, version="13.1.0")
+            session.add(device)
+            session.flush()
+            device_id = device.id
+
+        seq = change_log.seq
+        apply_backup_outcomes({device_id: datetime(2026, 1, 1)})
+        assert change_log.since(seq)[1] == {
+            device_id: {"lastbackup": "2026-01-01 00:00:00", "noofbackups": 0}
+        }
@@ -33,3 +33,62 @@ class TestDeviceStateSorting:
     def test_device_state_has_load_devices_method(self):
         from tasmo_guardian.state.device_state import DeviceState
         assert hasattr(DeviceState, "load_devices")
+
+
+class TestQueryDevices:
+    def _seed(self, count=30):
+        from tasmo_guardian.models import Device, db_session
+        with db_session() as session:
+            session.add_all(
+                Device(
+                    name=f"Plug{i:02d}", ip=f"192.168.1.{i}", mac=f"AABBCC{i:06X}",
+                    type=0, version="13.1.0" if i % 2 else "12.5.0", noofbackups=i,
+                    password="secret" if i == 0 else "",
+                )
+                for i in range(count)
+            )
+
+    def test_returns_one_page_and_total(self):
+        from tasmo_guardian.services.device_service import query_devices
+        self._seed()
+        rows, total = query_devices(page=2, per_page=10)
+        assert total == 30
+        assert [r["name"] for r in rows] == [f"Plug{i:02d}" for i in range(10, 20)]
+
+    def test_sorts_descending_in_sql(self):
+        from tasmo_guardian.services.device_service import query_devices
+        self._seed()
+        rows, _ = query_devices(sort_column="noofbackups", ascending=False, per_page=3)
+        assert [r["noofbackups"] for r in rows] == [29, 28, 27]
+
+    def test_filters_on_name_ip_mac_and_version(self):
+        from tasmo_guardian.services.device_service import query_devices
+        self._seed()
+        assert query_devices("plug07")[1] == 1
+        assert query_devices("192.168.1.2")[1] == 11  # .2 and .20-.29
+        assert query_devices("aabbcc00000a")[1] == 1
+        assert query_devices("12.5")[1] == 15
+
+    def test_filter_wildcards_match_literally(self):
+        from tasmo_guardian.models import Device, db_session
+        from tasmo_guardian.services.device_service import query_devices
+        self._seed(3)
+        with db_session() as session:
+            session.add(Device(name="Plug_100%", ip="192.168.1.100", mac="AABBCC000100", type=0, version="13.1.0"))
+        assert query_devices("%")[1] == 1
+        assert query_devices("_1")[1] == 1
+        assert query_devices("\\")[1] == 0
+
+    def test_rows_do_not_include_password(self):
+        from tasmo_guardian.services.device_service import query_devices
+        self._seed(2)
+        rows, _ = query_devices()
+        assert "password" not in rows[0]
+        assert rows[0]["has_password"] is True
+        assert rows[1]["has_password"] is False
+
+    def test_unknown_sort_column_falls_back_to_name(self):
+        from tasmo_guardian.services.device_service import query_devices
+        self._seed(3)
+        rows, _ = query_devices(sort_column="password")
+        assert [r["name"] for r in rows] == ["Plug00", "Plug01", "Plug02"]
@@ -0,0 +1,179 @@
+"""Tests for the per-device circuit breaker."""
+
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from tasmo_guardian.services import health
+
+
+class TestCircuitBreaker:
+    def test_closed_until_threshold(self):
+        for _ in range(health.FAILURE_THRESHOLD - 1):
+            health.record_failure(1)
+        assert health.circuit_state(1) == "closed"
+        assert health.allow_attempt(1)
+
+    def test_opens_after_threshold(self):
+        for _ in range(health.FAILURE_THRESHOLD):
+            health.record_failure(1)
+        assert health.circuit_state(1) == "open"
+        assert not health.allow_attempt(1)
+
+    def test_half_open_allows_one_probe(self):
+        for _ in range(health.FAILURE_THRESHOLD):
+            health.record_failure(1)
+        later = health.get_health(1).next_eligible + 1
+        assert health.circuit_state(1, now=later) == "half_open"
+
+        with patch("tasmo_guardian.services.health.time.time", return_value=later):
+            assert health.allow_attempt(1)
+            assert not health.allow_attempt(1)
+
+    def test_success_closes_circuit(self):
+        for _ in range(health.FAILURE_THRESHOLD + 2):
+            health.record_failure(1)
+        health.record_success(1)
+        assert health.circuit_state(1) == "closed"
+        assert health.get_health(1).failures == 0
+
+    def test_backoff_grows_and_is_capped(self):
+        with patch("tasmo_guardian.services.health.random.uniform", side_effect=lambda a, b: b):
+            first = health.backoff_seconds(health.FAILURE_THRESHOLD)
+            second = health.backoff_seconds(health.FAILURE_THRESHOLD + 1)
+            capped = health.backoff_seconds(health.FAILURE_THRESHOLD + 50)
+        assert first == health.BASE_BACKOFF_SECONDS
+        assert second == 2 * first
+        assert capped == health.MAX_BACKOFF_SECONDS
+
+    def test_backoff_is_jittered(self):
+        delays = {health.backoff_seconds(health.FAILURE_THRESHOLD) for _ in range(20)}
+        assert len(delays) > 1
+        assert all(health.BASE_BACKOFF_SECONDS / 2 <= d <= health.BASE_BACKOFF_SECONDS for d in delays)
+
+    def test_state_persists(self, monkeypatch):
+        for _ in range(health.FAILURE_THRESHOLD):
+            health.record_failure(7)
+        health.save_health()
+
+        monkeypatch.setattr("tasmo_guardian.services.health._health", None)
+        assert health.get_health(7).failures == health.FAILURE_THRESHOLD
+        assert health.circuit_state(7) == "open"
+
+
+class TestAdaptiveTimeouts:
+    def test_new_device_uses_protocol_default(self):
+        assert health.adaptive_timeout(1, "request") is None
+        health.record_latency(1, "request", 0.08)
+        assert health.adaptive_timeout(1, "request") is None
+
+    def test_fast_device_gets_floor_timeout(self):
+        for _ in range(5):
+            health.record_latency(1, "request", 0.08)
+        floor, _ceiling = health.TIMEOUT_LIMITS["request"]
+        assert health.adaptive_timeout(1, "request").read == floor
+
+    def test_slow_device_gets_longer_timeout(self):
+        for seconds in (6.0, 9.0, 7.5, 8.0):
+            health.record_latency(1, "transfer", seconds)
+        timeout = health.adaptive_timeout(1, "transfer").read
+        assert 16.0 < timeout <= health.TIMEOUT_LIMITS["transfer"][1]
+
+    def test_timeout_capped_at_ceiling(self):
+        for _ in range(5):
+            health.record_latency(1, "transfer", 500.0)
+        assert health.adaptive_timeout(1, "transfer").read == health.TIMEOUT_LIMITS["transfer"][1]
+
+    def test_failing_device_falls_back_to_default(self):
+        for _ in range(5):
+            health.record_latency(1, "request", 0.08)
+        health.record_failure(1)
+        assert health.adaptive_timeout(1, "request") is None
+        health.record_success(1)
+        assert health.adaptive_timeout(1, "request") is not None
+
+    def test_latency_persists(self, monkeypatch):
+        for _ in range(3):
+            health.record_latency(3, "request", 0.1)
+        health.save_health()
+        monkeypatch.setattr("tasmo_guardian.services.health._health", None)
+        assert health.adaptive_timeout(3, "request") is not None
+
+    async def test_probe_records_latency_and_uses_learned_timeout(self):
+        from tasmo_guardian.services.backup import probe_config_fingerprint
+        device = MagicMock(id=1, type=0, ip="192.168.1.10", password="")
+        for _ in range(3):
+            health.record_latency(1, "request", 0.05)
+
+        with patch("tasmo_guardian.services.backup.get_tasmota_fingerprint", AsyncMock(return_value="fp")) as mock_fp:
+            await probe_config_fingerprint(device)
+
+        assert mock_fp.call_args.args[2].read == health.TIMEOUT_LIMITS["request"][0]
+        assert health.get_health(1).latency["request"][2] == 4
+
+
+class TestEngineSkipsOpenCircuits:
+    def _device(self, device_id):
+        device = MagicMock()
+        device.id = device_id
+        device.name = f"Plug{device_id}"
+        device.lastbackup = None
+        return device
+
+    async def test_open_circuit_is_skipped_without_contact(self):
+        from tasmo_guardian.services.backup import backup_all_devices
+        for _ in range(health.FAILURE_THRESHOLD):
+            health.record_failure(1)
+
+        with patch("tasmo_guardian.services.backup.probe_config_fingerprint", AsyncMock(return_value=None)) as mock_probe:
+            with patch("tasmo_guardian.services.backup.backup_device", AsyncMock(return_value=True)):
+                results = await backup_all_devices([self._device(1), self._device(2)])
+
+        assert results == {"backed_up": 1, "skipped": 1, "failed": 0, "deferred": 0}
+        assert [c.args[0].id for c in mock_probe.call_args_list] == [2]
+
+    async def test_failures_open_the_circuit(self):
+        from tasmo_guardian.services.backup import backup_all_devices
+        with patch("tasmo_guardian.services.backup.probe_config_fingerprint", AsyncMock(return_value=None)):
+            with patch("tasmo_guardian.services.backup.backup_device", AsyncMock(return_value=False)):
+                for _ in range(health.FAILURE_THRESHOLD):
+                    await backup_all_devices([self._device(1)])
+        assert health.circuit_state(1) == "open"
+
+
+class TestProbeRelease:
+    def _half_open(self, device_id):
+        health.record_failure(device_id)
+        health.record_failure(device_id)
+        health.get_health(device_id).next_eligible = 0.0
+
+    async def test_deferred_probe_is_released(self):
+        from tasmo_guardian.services.backup import backup_all_devices
+
+        self._half_open(1)
+        device = MagicMock(id=1, lastbackup=None)
+        with patch("tasmo_guardian.services.health.expected_seconds", return_value=3600.0):
+            results = await backup_all_devices([device], deadline=1.0)
+        assert results["deferred"] == 1
+        assert health.allow_attempt(1) is True
+
+    async def test_cancelled_probe_is_released(self):
+        import asyncio
+
+        from tasmo_guardian.services.backup import backup_all_devices
+
+        self._half_open(1)
+        device = MagicMock(id=1, lastbackup=None)
+        started = asyncio.Event()
+
+        async def stalled(device):
+            started.set()
+            await asyncio.Event().wait()
+
+        with patch("tasmo_guardian.services.backup.probe_config_fingerprint", side_effect=stalled):
+            run = asyncio.create_task(backup_all_devices([device]))
+            await started.wait()
+            run.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await run
+        assert health.allow_attempt(1) is True
@@ -0,0 +1,40 @@
+"""Tests for shared HTTP client."""
+
+from unittest.mock import AsyncMock, patch
+
+
+class TestGetClient:
+    async def test_returns_same_client(self):
+        from tasmo_guardian.protocols.http_client import close_client, get_client
+        try:
+            assert get_client() is get_client()
+        finally:
+            await close_client()
+
+    async def test_recreated_after_close(self):
+        from tasmo_guardian.protocols.http_client import close_client, get_client
+        first = get_client()
+        await close_client()
+        second = get_client()
+        try:
+            assert second is not first
+            assert not second.is_closed
+        finally:
+            await close_client()
+
+    async def test_client_uses_pool_limits(self):
+        from tasmo_guardian.protocols.http_client import POOL_LIMITS, close_client, get_client
+        with patch("tasmo_guardian.protocols.http_client.httpx.AsyncClient") as mock_cls:
+            mock_cls.return_value.is_closed = False
+            mock_cls.return_value.aclose = AsyncMock()
+            get_client()
+            assert mock_cls.call_args.kwargs["limits"] is POOL_LIMITS
+            await close_client()
+
+
+class TestLifespan:
+    async def test_lifespan_closes_client(self):
+        from tasmo_guardian.protocols.http_client import get_client, http_client_lifespan
+        async with http_client_lifespan():
+            client = get_client()
+        assert client.is_closed
@@ -0,0 +1,91 @@
+"""Tests for per-subnet network limits."""
+
+import asyncio
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from tasmo_guardian.services.network import (
+    Topology,
+    TokenBucket,
+    format_network_limits,
+    interleave,
+    parse_network_limits,
+)
+
+
+class TestParseNetworkLimits:
+    def test_parses_rules(self):
+        limits = parse_network_limits("192.168.20.0/24 2 200\n10.0.0.0/16 4")
+        assert [(str(l.network), l.max_concurrent, l.rate_kbps) for l in limits] == [
+            ("192.168.20.0/24", 2, 200),
+            ("10.0.0.0/16", 4, None),
+        ]
+
+    def test_most_specific_first(self):
+        limits = parse_network_limits("10.0.0.0/8 8, 10.1.2.0/24 1")
+        assert str(limits[0].network) == "10.1.2.0/24"
+
+    def test_ignores_invalid_rules(self):
+        assert parse_network_limits("bogus 2\n10.0.0.0/24\n10.0.1.0/24 0\n\n") == ()
+
+    def test_round_trips_through_format(self):
+        text = "192.168.20.0/24 2 200\n10.0.0.0/16 4"
+        assert format_network_limits(parse_network_limits(text)) == text
+
+
+class TestTopology:
+    def test_configured_subnet_wins(self):
+        topology = Topology(parse_network_limits("192.168.20.0/24 2, 192.168.0.0/16 8"))
+        assert topology.segment("192.168.20.7").name == "192.168.20.0/24"
+        assert topology.segment("192.168.30.7").name == "192.168.0.0/16"
+
+    def test_unconfigured_addresses_group_by_24(self):
+        topology = Topology()
+        segment = topology.segment("10.0.5.9")
+        assert segment.name == "10.0.5.0/24"
+        assert segment.semaphore is None
+        assert topology.segment("10.0.5.10") is segment
+
+    def test_interleave_round_robins_groups(self):
+        items = ["a1", "a2", "a3", "b1", "c1", "c2"]
+        assert interleave(items, key=lambda s: s[0]) == ["a1", "b1", "c1", "a2", "c2", "a3"]
+
+
+class TestTokenBucket:
+    async def test_ready_waits_for_overspend(self):
+        bucket = TokenBucket(rate=1000)
+        bucket.spend(bucket.capacity + 50)
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        await bucket.ready()
+        assert loop.time() - start >= 0.04
+        assert bucket.tokens >= 0
+
+
+class TestSubnetConcurrency:
+    async def test_backup_all_respects_subnet_limit(self):
+        from tasmo_guardian.models.database import db_session
+        from tasmo_guardian.services.backup import backup_all_devices
+        from tasmo_guardian.services.settings import BACKUP_NETWORK_LIMITS, set_setting
+
+        with db_session() as session:
+            set_setting(session, BACKUP_NETWORK_LIMITS, "192.168.20.0/24 1")
+
+        devices = [MagicMock(id=i, lastbackup=None, ip=f"192.168.20.{i}") for i in range(3)]
+        devices += [MagicMock(id=10 + i, lastbackup=None, ip=f"192.168.30.{i}") for i in range(3)]
+        running = {"192.168.20": 0, "192.168.30": 0}
+        peak = dict(running)
+
+        async def slow_backup(device):
+            subnet = device.ip.rsplit(".", 1)[0]
+            running[subnet] += 1
+            peak[subnet] = max(peak[subnet], running[subnet])
+            await asyncio.sleep(0.01)
+            running[subnet] -= 1
+            return True
+
+        with patch("tasmo_guardian.services.backup.probe_config_fingerprint", AsyncMock(return_value=None)):
+            with patch("tasmo_guardian.services.backup.backup_device", side_effect=slow_backup):
+                results = await backup_all_devices(devices, max_concurrent=6)
+
+        assert results["backed_up"] == 6
+        assert peak == {"192.168.20": 1, "192.168.30": 3}
@@ -0,0 +1,119 @@
+"""Tests for fleet backup progress streaming."""
+
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from tasmo_guardian.services.progress import ProgressEvent, ProgressStream, ProgressTracker
+
+
+def make_device(device_id, lastbackup=None):
+    device = MagicMock()
+    device.id = device_id
+    device.name = f"Plug{device_id}"
+    device.lastbackup = lastbackup
+    return device
+
+
+class TestProgressTracker:
+    def test_counts_and_running(self):
+        tracker = ProgressTracker(total=3)
+        tracker.apply(ProgressEvent(1, "Plug1", "started", at=0.0))
+        tracker.apply(ProgressEvent(2, "Plug2", "started", at=5.0))
+        tracker.apply(ProgressEvent(3, "Plug3", "skipped"))
+        assert tracker.done == 1
+        assert [d["name"] for d in tracker.in_flight(now=20.0)] == ["Plug1", "Plug2"]
+
+        tracker.apply(ProgressEvent(1, "Plug1", "failed", duration_ms=20000))
+        assert tracker.counts["failed"] == 1
+        assert tracker.done == 2
+        assert tracker.slowest[0].name == "Plug1"
+
+    def test_flags_slow_devices(self):
+        tracker = ProgressTracker(total=2)
+        tracker.apply(ProgressEvent(1, "Stuck", "started", at=0.0))
+        tracker.apply(ProgressEvent(2, "Fresh", "started", at=28.0))
+        running = tracker.in_flight(now=30.0)
+        assert running[0] == {"name": "Stuck", "elapsed_s": 30, "slow": True}
+        assert running[1]["slow"] is False
+
+
+class TestProgressStream:
+    async def test_iterates_until_closed(self):
+        stream = ProgressStream()
+        for i in range(3):
+            stream.emit(ProgressEvent(i, f"Plug{i}", "skipped"))
+        stream.close()
+        assert [e.device_id async for e in stream] == [0, 1, 2]
+
+    async def test_emit_after_close_is_ignored(self):
+        stream = ProgressStream()
+        stream.close()
+        stream.emit(ProgressEvent(1, "Plug1", "skipped"))
+        assert [e async for e in stream] == []
+
+
+class TestEngineProgress:
+    async def test_backup_all_emits_start_and_outcome(self):
+        from datetime import datetime
+
+        from tasmo_guardian.services.backup import backup_all_devices
+
+        stream = ProgressStream()
+        devices = [make_device(1), make_device(2), make_device(3, lastbackup=datetime.now())]
+        with patch("tasmo_guardian.services.backup.probe_config_fingerprint", AsyncMock(return_value=None)):
+            with patch(
+                "tasmo_guardian.services.backup.backup_device",
+                AsyncMock(side_effect=[True, False]),
+            ):
+                await backup_all_devices(devices, progress=stream)
+        stream.close()
+
+        events = [(e.device_id, e.status) async for e in stream]
+        assert (3, "skipped") in events
+        assert events.count((1, "started")) + events.count((2, "started")) == 2
+        finished = {e for e in events if e[1] in ("backed_up", "failed")}
+        assert finished == {(1, "backed_up"), (2, "failed")}
+
+
+class TestStalenessOrder:
+    async def test_stalest_devices_start_first(self):
+        from datetime import datetime, timedelta
+
+        from tasmo_guardian.services.backup import backup_all_devices
+
+        now = datetime.now()
+        devices = [
+            make_device(1, lastbackup=now - timedelta(days=2)),
+            make_device(2),
+            make_device(3, lastbackup=now - timedelta(days=5)),
+        ]
+        stream = ProgressStream()
+        with patch("tasmo_guardian.services.backup.probe_config_fingerprint", AsyncMock(return_value=None)):
+            with patch("tasmo_guardian.services.backup.backup_device", AsyncMock(return_value=True)):
+                await backup_all_devices(devices, max_concurrent=1, progress=stream)
+        stream.close()
+
+        started = [e.device_id async for e in stream if e.status == "started"]
+        assert started == [3, 1, 2]
+
+    async def test_devices_past_deadline_are_deferred(self):
+        from tasmo_guardian.services.backup import backup_all_devices
+
+        devices = [make_device(1), make_device(2)]
+        backup = AsyncMock(return_value=True)
+        with patch("tasmo_guardian.services.backup.probe_config_fingerprint", AsyncMock(return_value=None)):
+            with patch("tasmo_guardian.services.backup.backup_device", backup):
+                with patch(
+                    "tasmo_guardian.services.health.expected_seconds",
+                    side_effect=lambda device_id: 0.0 if device_id == 1 else 3600.0,
+                ):
+                    results = await backup_all_devices(devices, deadline=60)
+
+        assert results == {"backed_up": 1, "skipped": 0, "failed": 0, "deferred": 1}
+        assert [call.args[0].id for call in backup.await_args_list] == [1]
+
+
+class TestBackupProgressComponent:
+    def test_backup_progress_returns_component(self):
+        import reflex as rx
+        from tasmo_guardian.components.backup_progress import backup_progress
+        assert isinstance(backup_progress(), rx.Component)
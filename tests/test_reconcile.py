@@ -0,0 +1,93 @@
+"""Tests for backup directory reconcile."""
+
+import os
+import time
+from datetime import datetime
+from unittest.mock import patch
+
+from tasmo_guardian.models import Backup, Device, db_session
+
+
+def add_device(name="Plug", mac="AABBCCDDEEFF", lastbackup=None) -> int:
+    with db_session() as session:
+        device = Device(name=name, ip="192.168.1.10", mac=mac, type=0, version="13.1.0", lastbackup=lastbackup)
+        session.add(device)
+        session.flush()
+        return device.id
+
+
+class TestScanBackupFiles:
+    def test_parses_backup_files(self, tmp_path):
+        from tasmo_guardian.services.reconcile import scan_backup_files
+        (tmp_path / "Plug").mkdir()
+        (tmp_path / "Plug" / "AABBCCDDEEFF-2026-01-15_10_30_00-v13.1.0.dmp").write_bytes(b"data")
+        (tmp_path / "Plug" / "notes.txt").write_text("ignored")
+
+        files = scan_backup_files(tmp_path)
+
+        assert len(files) == 1
+        assert files[0]["mac"] == "AABBCCDDEEFF"
+        assert files[0]["date"] == datetime(2026, 1, 15, 10, 30)
+        assert files[0]["size"] == 4
+
+    def test_removes_only_stale_temp_files(self, tmp_path):
+        from tasmo_guardian.services.reconcile import STALE_TEMP_SECONDS, scan_backup_files
+        (tmp_path / "Plug").mkdir()
+        stale = tmp_path / "Plug" / ".AABBCC-2026-01-15_10_30_00-v13.1.0.dmp.part"
+        fresh = tmp_path / "Plug" / ".AABBCC-2026-01-16_10_30_00-v13.1.0.dmp.part"
+        stale.write_bytes(b"half")
+        fresh.write_bytes(b"half")
+        old = time.time() - STALE_TEMP_SECONDS - 10
+        os.utime(stale, (old, old))
+
+        scan_backup_files(tmp_path)
+
+        assert not stale.exists()
+        assert fresh.exists()
+
+
+class TestReconcileBackups:
+    def test_indexes_untracked_files_and_updates_device(self, tmp_path):
+        from tasmo_guardian.services.reconcile import reconcile_backups
+        device_id = add_device()
+        (tmp_path / "Plug").mkdir()
+        (tmp_path / "Plug" / "AABBCCDDEEFF-2026-01-15_10_30_00-v13.1.0.dmp").write_bytes(b"a")
+        (tmp_path / "Plug" / "AABBCCDDEEFF-2026-01-16_10_30_00-v13.1.0.dmp").write_bytes(b"b")
+
+        with patch("tasmo_guardian.services.backup.BACKUP_DIR", tmp_path):
+            results = reconcile_backups()
+
+        assert results["added"] == 2
+        with db_session() as session:
+            device = session.get(Device, device_id)
+            assert device.noofbackups == 2
+            assert device.lastbackup == datetime(2026, 1, 16, 10, 30)
+            assert session.query(Backup).count() == 2
+
+    def test_removes_rows_for_deleted_files(self, tmp_path):
+        from tasmo_guardian.services.reconcile import reconcile_backups
+        device_id = add_device(lastbackup=datetime(2026, 1, 16))
+        with db_session() as session:
+            session.add(Backup(deviceid=device_id, name="Plug", version="13.1.0",
+                               date=datetime(2026, 1, 16), filename=str(tmp_path / "gone.dmp")))
+
+        with patch("tasmo_guardian.services.backup.BACKUP_DIR", tmp_path):
+            results = reconcile_backups()
+
+        assert results["removed"] == 1
+        with db_session() as session:
+            device = session.get(Device, device_id)
+            assert device.noofbackups == 0
+            assert device.lastbackup is None
+
+    def test_second_run_is_a_no_op(self, tmp_path):
+        from tasmo_guardian.services.reconcile import reconcile_backups
+        add_device()
+        (tmp_path / "Plug").mkdir()
+        (tmp_path / "Plug" / "AABBCCDDEEFF-2026-01-15_10_30_00-v13.1.0.dmp").write_bytes(b"a")
+
+        with patch("tasmo_guardian.services.backup.BACKUP_DIR", tmp_path):
+            reconcile_backups()
+            results = reconcile_backups()
+
+        assert results == {"files": 1, "added": 0, "removed": 0, "orphaned": 0, "devices_updated": 0}
@@ -17,8 +17,8 @@ class TestRestoreTasmotaConfig:
         mock_response = MagicMock()
         mock_response.status_code = 200
 
-        with patch("httpx.AsyncClient") as mock_client:
-            mock_client.return_value.__aenter__.return_value.post = AsyncMock(
+        with patch("tasmo_guardian.protocols.tasmota.get_client") as mock_client:
+            mock_client.return_value.post = AsyncMock(
                 return_value=mock_response
             )
             result = await restore_tasmota_config("192.168.1.10", b"backup_data")
@@ -31,8 +31,8 @@ class TestRestoreTasmotaConfig:
         mock_response = MagicMock()
         mock_response.status_code = 500
 
-        with patch("httpx.AsyncClient") as mock_client:
-            mock_client.return_value.__aenter__.return_value.post = AsyncMock(
+        with patch("tasmo_guardian.protocols.tasmota.get_client") as mock_client:
+            mock_client.return_value.post = AsyncMock(
                 return_value=mock_response
             )
             result = await restore_tasmota_config("192.168.1.10", b"backup_data")
@@ -42,8 +42,8 @@ class TestRestoreTasmotaConfig:
     @pytest.mark.asyncio
     async def test_restore_exception_returns_false(self):
         """Restore returns False on exception."""
-        with patch("httpx.AsyncClient") as mock_client:
-            mock_client.return_value.__aenter__.return_value.post = AsyncMock(
+        with patch("tasmo_guardian.protocols.tasmota.get_client") as mock_client:
+            mock_client.return_value.post = AsyncMock(
                 side_effect=Exception("Connection error")
             )
             result = await restore_tasmota_config("192.168.1.10", b"backup_data")
@@ -56,9 +56,9 @@ class TestRestoreTasmotaConfig:
         mock_response = MagicMock()
         mock_response.status_code = 200
 
-        with patch("httpx.AsyncClient") as mock_client:
+        with patch("tasmo_guardian.protocols.tasmota.get_client") as mock_client:
             mock_post = AsyncMock(return_value=mock_response)
-            mock_client.return_value.__aenter__.return_value.post = mock_post
+            mock_client.return_value.post = mock_post
             await restore_tasmota_config("192.168.1.10", b"data", password="secret")
 
             call_kwargs = mock_post.call_args.kwargs
@@ -70,9 +70,9 @@ class TestRestoreTasmotaConfig:
         mock_response = MagicMock()
         mock_response.status_code = 200
 
-        with patch("httpx.AsyncClient") as mock_client:
+        with patch("tasmo_guardian.protocols.tasmota.get_client") as mock_client:
             mock_post = AsyncMock(return_value=mock_response)
-            mock_client.return_value.__aenter__.return_value.post = mock_post
+            mock_client.return_value.post = mock_post
             await restore_tasmota_config("192.168.1.10", b"data")
 
             call_kwargs = mock_post.call_args.kwargs
@@ -2,6 +2,10 @@
 
 from unittest.mock import AsyncMock, patch
 
+import pytest
+
+OPEN_PORTS = patch("tasmo_guardian.services.scanner.port_open", AsyncMock(return_value=True))
+
 
 class TestGenerateIpRange:
     def test_generate_ip_range_single(self):
@@ -14,11 +18,61 @@ class TestGenerateIpRange:
         result = generate_ip_range("192.168.1.1", "192.168.1.3")
         assert result == ["192.168.1.1", "192.168.1.2", "192.168.1.3"]
 
+    def test_generate_ip_range_crosses_octets(self):
+        from tasmo_guardian.services.scanner import generate_ip_range
+        result = generate_ip_range("10.0.0.254", "10.0.1.1")
+        assert result == ["10.0.0.254", "10.0.0.255", "10.0.1.0", "10.0.1.1"]
+
+    def test_generate_ip_range_rejects_huge_range(self):
+        from tasmo_guardian.services.scanner import generate_ip_range
+        with pytest.raises(ValueError):
+            generate_ip_range("10.0.0.0", "10.255.255.255")
+
+
+class TestParseScanTargets:
+    def test_cidr_hosts(self):
+        from tasmo_guardian.services.scanner import parse_scan_targets
+        ips = parse_scan_targets("10.0.0.0/22")
+        assert len(ips) == 1022
+        assert ips[0] == "10.0.0.1"
+        assert ips[-1] == "10.0.3.254"
+
+    def test_multiple_targets_and_shorthand(self):
+        from tasmo_guardian.services.scanner import parse_scan_targets
+        ips = parse_scan_targets("192.168.1.10-12, 10.0.0.5\n192.168.1.11")
+        assert ips == ["192.168.1.10", "192.168.1.11", "192.168.1.12", "10.0.0.5"]
+
+    def test_exclusions(self):
+        from tasmo_guardian.services.scanner import parse_scan_targets
+        ips = parse_scan_targets("192.168.1.0/29 !192.168.1.1", exclude="192.168.1.5-6")
+        assert ips == ["192.168.1.2", "192.168.1.3", "192.168.1.4"]
+
+    def test_invalid_target_raises(self):
+        from tasmo_guardian.services.scanner import parse_scan_targets
+        with pytest.raises(ValueError):
+            parse_scan_targets("192.168.1.300")
+
+    def test_too_many_addresses_raises(self):
+        from tasmo_guardian.services.scanner import parse_scan_targets
+        with pytest.raises(ValueError):
+            parse_scan_targets("10.0.0.0/16")
+
+
+class TestPortOpen:
+    async def test_open_and_closed_ports(self):
+        import asyncio
+        from tasmo_guardian.services.scanner import port_open
+        server = await asyncio.start_server(lambda r, w: w.close(), "127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        async with server:
+            assert await port_open("127.0.0.1", port) is True
+        assert await port_open("127.0.0.1", port) is False
+
 
 class TestScanIpRange:
     async def test_scan_returns_found_devices(self):
         from tasmo_guardian.services.scanner import scan_ip_range
-        with patch("tasmo_guardian.services.scanner.detect_device", new_callable=AsyncMock) as mock_detect:
+        with OPEN_PORTS, patch("tasmo_guardian.services.scanner.detect_device", new_callable=AsyncMock) as mock_detect:
             mock_detect.side_effect = [
                 ({"name": "Plug", "version": "13.1.0", "mac": "AABBCC"}, 0),
                 (None, -1),
@@ -31,11 +85,44 @@ class TestScanIpRange:
 
     async def test_scan_empty_range_returns_empty(self):
         from tasmo_guardian.services.scanner import scan_ip_range
-        with patch("tasmo_guardian.services.scanner.detect_device", new_callable=AsyncMock) as mock_detect:
+        with OPEN_PORTS, patch("tasmo_guardian.services.scanner.detect_device", new_callable=AsyncMock) as mock_detect:
             mock_detect.return_value = (None, -1)
             results = await scan_ip_range("192.168.1.1", "192.168.1.1")
         assert results == []
 
-    async def test_scan_uses_semaphore_concurrency(self):
-        from tasmo_guardian.services.scanner import scan_ip_range, MAX_CONCURRENT
-        assert MAX_CONCURRENT == 15
+    async def test_scan_starts_at_initial_concurrency(self):
+        import asyncio
+        from tasmo_guardian.services.scanner import INITIAL_CONCURRENT, scan_ip_range
+        running = 0
+        peak = 0
+
+        async def slow_detect(ip, password):
+            nonlocal running, peak
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.01)
+            running -= 1
+            return None, -1
+
+        with OPEN_PORTS, patch("tasmo_guardian.services.scanner.detect_device", side_effect=slow_detect):
+            await scan_ip_range("192.168.1.1", "192.168.1.40")
+        assert INITIAL_CONCURRENT == 15
+        assert peak == 15
+
+    async def test_closed_ports_skip_http_detection(self):
+        from tasmo_guardian.services.scanner import scan_targets
+        with patch(
+            "tasmo_guardian.services.scanner.port_open",
+            AsyncMock(side_effect=lambda ip: ip == "192.168.1.7"),
+        ):
+            with patch("tasmo_guardian.services.scanner.detect_device", new_callable=AsyncMock) as mock_detect:
+                mock_detect.return_value = ({"name": "Plug", "version": "13.1.0", "mac": "AABBCC"}, 0)
+                results = await scan_targets("192.168.1.0/24")
+        mock_detect.assert_awaited_once_with("192.168.1.7", None)
+        assert [r["ip"] for r in results] == ["192.168.1.7"]
+
+    async def test_failed_detection_cuts_scan_limit(self):
+        from tasmo_guardian.services import scanner
+        with OPEN_PORTS, patch("tasmo_guardian.services.scanner.detect_device", AsyncMock(return_value=(None, -1))):
+            await scanner.scan_targets("192.168.1.7")
+        assert scanner.scan_limiter.current < scanner.INITIAL_CONCURRENT
@@ -0,0 +1,166 @@
+"""Tests for the in-process backup scheduler."""
+
+from datetime import datetime, timedelta
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from tasmo_guardian.services.scheduler import device_offset, due_devices, is_due, last_slot
+
+PERIOD = 24 * 3600
+
+
+def make_device(mac, lastbackup=None):
+    device = MagicMock()
+    device.mac = mac
+    device.lastbackup = lastbackup
+    return device
+
+
+class TestSlots:
+    def test_offset_is_stable_and_within_period(self):
+        offset = device_offset("AA:BB:CC:DD:EE:FF", PERIOD)
+        assert offset == device_offset("aabbccddeeff", PERIOD)
+        assert 0 <= offset < PERIOD
+
+    def test_offsets_spread_across_period(self):
+        offsets = [device_offset(f"AABBCC{i:06X}", PERIOD) for i in range(1000)]
+        buckets = [0] * 24
+        for offset in offsets:
+            buckets[int(offset // 3600)] += 1
+        # ~42 per hour; no hour should take a burst
+        assert max(buckets) < 80
+        assert min(buckets) > 15
+
+    def test_last_slot_is_at_or_before_now(self):
+        now = 1_800_000_000.0
+        slot = last_slot("AABBCC000001", PERIOD, now)
+        assert now - PERIOD < slot <= now
+
+
+class TestDue:
+    def test_never_backed_up_is_due(self):
+        assert is_due(make_device("AABBCC000001"), PERIOD, 1_800_000_000.0)
+
+    def test_due_once_per_slot(self):
+        mac = "AABBCC000001"
+        now = 1_800_000_000.0
+        slot = last_slot(mac, PERIOD, now)
+        before_slot = datetime.fromtimestamp(slot - 60)
+        after_slot = datetime.fromtimestamp(slot + 60)
+        assert is_due(make_device(mac, before_slot), PERIOD, now)
+        assert not is_due(make_device(mac, after_slot), PERIOD, now)
+
+    def test_due_devices_is_a_trickle(self):
+        now = 1_800_000_000.0
+        devices = [
+            make_device(f"AABBCC{i:06X}", datetime.fromtimestamp(now - 60))
+            for i in range(1000)
+        ]
+        # Everything was backed up a minute ago: only slots in that minute are due
+        assert len(due_devices(devices, PERIOD, now)) < 10
+
+
+class TestRunScheduledBackups:
+    def _add_devices(self):
+        from tasmo_guardian.models import Device, db_session
+        with db_session() as session:
+            session.add(Device(name="New", ip="192.168.1.10", mac="AABBCC000001", type=0, version="13.1.0"))
+            session.add(
+                Device(
+                    name="Fresh", ip="192.168.1.11", mac="AABBCC000002", type=0,
+                    version="13.1.0", lastbackup=datetime.now() + timedelta(minutes=1),
+                )
+            )
+
+    async def test_backs_up_only_due_devices(self):
+        from tasmo_guardian.services.scheduler import run_scheduled_backups
+        self._add_devices()
+
+        with patch("tasmo_guardian.services.jobs.run_fleet_backup", new_callable=AsyncMock) as mock_run:
+            mock_run.return_value = {"backed_up": 1, "skipped": 0, "failed": 0}
+            results = await run_scheduled_backups()
+
+        devices = mock_run.call_args.args[0]
+        assert [d.name for d in devices] == ["New"]
+        assert mock_run.call_args.kwargs["min_hours"] == 0
+        assert results["job_status"] == "complete"
+
+    async def test_scheduled_run_is_the_active_job(self):
+        import asyncio
+        from tasmo_guardian.services.jobs import active_job, get_job
+        from tasmo_guardian.services.scheduler import run_scheduled_backups
+        self._add_devices()
+        release = asyncio.Event()
+
+        async def slow_run(*args, **kwargs):
+            await release.wait()
+            return {}
+
+        with patch("tasmo_guardian.services.jobs.run_fleet_backup", side_effect=slow_run):
+            tick = asyncio.create_task(run_scheduled_backups())
+            for _ in range(100):
+                if active_job():
+                    break
+                await asyncio.sleep(0.01)
+            job = active_job()
+            assert job.source == "scheduled"
+            release.set()
+            results = await tick
+        assert get_job(results["job_id"]) is job
+
+    async def test_full_trigger_during_scheduled_run_is_queued(self):
+        import asyncio
+        from tasmo_guardian.services.jobs import active_job, start_backup_job
+        from tasmo_guardian.services.scheduler import run_scheduled_backups
+        self._add_devices()
+        release = asyncio.Event()
+        runs = []
+
+        async def slow_run(devices, **kwargs):
+            runs.append([d.name for d in devices])
+            await release.wait()
+            return {}
+
+        with patch("tasmo_guardian.services.jobs.run_fleet_backup", side_effect=slow_run):
+            tick = asyncio.create_task(run_scheduled_backups())
+            for _ in range(100):
+                if active_job():
+                    break
+                await asyncio.sleep(0.01)
+            scheduled = active_job()
+            full = start_backup_job()
+            assert full is not scheduled
+            assert full.status == "queued"
+            assert start_backup_job() is full
+            release.set()
+            await tick
+            await full.done.wait()
+
+        assert runs == [["New"], ["New", "Fresh"]]
+        assert full.status == "complete"
+
+    async def test_cancel_queued_job(self):
+        import asyncio
+        from tasmo_guardian.services.jobs import cancel_job, start_backup_job
+        release = asyncio.Event()
+
+        async def slow_run(devices, **kwargs):
+            await release.wait()
+            return {}
+
+        with patch("tasmo_guardian.services.jobs.run_fleet_backup", side_effect=slow_run) as mock_run:
+            scheduled = start_backup_job(devices=[], min_hours=0, source="scheduled")
+            full = start_backup_job()
+            assert cancel_job(full)
+            await full.done.wait()
+            assert full.status == "cancelled"
+            assert not scheduled.done.is_set()
+            release.set()
+            await scheduled.done.wait()
+        assert mock_run.call_count == 1
+
+    async def test_skips_tick_while_fleet_job_active(self):
+        from tasmo_guardian.services.scheduler import run_scheduled_backups
+        with patch("tasmo_guardian.services.scheduler.active_job", return_value=MagicMock()):
+            with patch("tasmo_guardian.services.scheduler.start_backup_job") as mock_start:
+                assert await run_scheduled_backups() is None
+        mock_start.assert_not_called()
@@ -51,6 +51,70 @@ class TestSettingsService:
         mock_session.add.assert_called_once()
 
 
+class TestSettingsCache:
+    """Tests for the bulk-loaded settings cache."""
+
+    def test_defaults_when_table_empty(self):
+        """get_settings returns typed defaults for an empty table."""
+        from tasmo_guardian.services.settings import get_settings
+
+        settings = get_settings()
+        assert settings.backup_min_hours == 24
+        assert settings.backup_max_count == 10
+        assert settings.show_mac is True
+
+    def test_loads_table_in_one_query_and_caches(self):
+        """Settings are read once and then served from the cache."""
+        from sqlalchemy import event
+
+        from tasmo_guardian.models.database import get_engine
+        from tasmo_guardian.services.settings import get_settings
+
+        statements = []
+
+        def record(conn, cursor, statement, *args):
+            statements.append(statement)
+
+        engine = get_engine()
+        event.listen(engine, "before_cursor_execute", record)
+        try:
+            get_settings()
+            get_settings()
+        finally:
+            event.remove(engine, "before_cursor_execute", record)
+        assert len([s for s in statements if "FROM settings" in s]) == 1
+
+    def test_set_settings_invalidates_cache(self):
+        """Writes are visible to the next read."""
+        from tasmo_guardian.services.settings import BACKUP_MIN_HOURS, get_settings, set_settings
+
+        assert get_settings().backup_min_hours == 24
+        set_settings({BACKUP_MIN_HOURS: "6"})
+        assert get_settings().backup_min_hours == 6
+
+    def test_invalid_number_falls_back_to_default(self):
+        """A malformed numeric setting does not break loading."""
+        from tasmo_guardian.services.settings import BACKUP_MAX_DAYS, get_settings, set_settings
+
+        set_settings({BACKUP_MAX_DAYS: "abc"})
+        assert get_settings().backup_max_days == 30
+
+    def test_rows_per_page_is_at_least_one(self):
+        """Zero or negative rows per page would break paging."""
+        from tasmo_guardian.services.settings import DISPLAY_ROWS_PER_PAGE, get_settings, set_settings
+
+        set_settings({DISPLAY_ROWS_PER_PAGE: "0"})
+        assert get_settings().rows_per_page == 1
+
+    def test_network_limits_are_parsed(self):
+        """Per-subnet limits load as parsed rules."""
+        from tasmo_guardian.services.settings import BACKUP_NETWORK_LIMITS, get_settings, set_settings
+
+        set_settings({BACKUP_NETWORK_LIMITS: "192.168.20.0/24 2 200"})
+        (limit,) = get_settings().network_limits
+        assert (str(limit.network), limit.max_concurrent, limit.rate_kbps) == ("192.168.20.0/24", 2, 200)
+
+
 class TestSettingsState:
     """Tests for settings state."""
 
@@ -95,6 +159,7 @@ class TestSettingsState:
         assert hasattr(state, "backup_min_hours")
         assert hasattr(state, "backup_max_days")
         assert hasattr(state, "backup_max_count")
+        assert hasattr(state, "network_limits")
 
     def test_settings_state_has_theme(self):
         """SettingsState has theme field."""
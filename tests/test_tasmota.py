@@ -55,8 +55,8 @@ class TestDetectTasmota:
             "StatusFWR": {"Version": "13.1.0"},
             "StatusNET": {"Mac": "AA:BB:CC:DD:EE:FF"}
         }
-        with patch("httpx.AsyncClient") as mock_client:
-            mock_client.return_value.__aenter__.return_value.get = AsyncMock(return_value=mock_response)
+        with patch("tasmo_guardian.protocols.tasmota.get_client") as mock_client:
+            mock_client.return_value.get = AsyncMock(return_value=mock_response)
             result = await detect_tasmota("192.168.1.10")
         assert result == {"name": "Plug", "version": "13.1.0", "mac": "AABBCCDDEEFF"}
 
@@ -65,24 +65,24 @@ class TestDetectTasmota:
         from tasmo_guardian.protocols.tasmota import detect_tasmota
         mock_response = MagicMock()
         mock_response.status_code = 401
-        with patch("httpx.AsyncClient") as mock_client:
-            mock_client.return_value.__aenter__.return_value.get = AsyncMock(return_value=mock_response)
+        with patch("tasmo_guardian.protocols.tasmota.get_client") as mock_client:
+            mock_client.return_value.get = AsyncMock(return_value=mock_response)
             result = await detect_tasmota("192.168.1.10")
         assert result is None
 
     @pytest.mark.asyncio
     async def test_timeout_returns_none(self):
         from tasmo_guardian.protocols.tasmota import detect_tasmota
-        with patch("httpx.AsyncClient") as mock_client:
-            mock_client.return_value.__aenter__.return_value.get = AsyncMock(side_effect=httpx.TimeoutException("timeout"))
+        with patch("tasmo_guardian.protocols.tasmota.get_client") as mock_client:
+            mock_client.return_value.get = AsyncMock(side_effect=httpx.TimeoutException("timeout"))
             result = await detect_tasmota("192.168.1.10")
         assert result is None
 
     @pytest.mark.asyncio
     async def test_connection_error_returns_none(self):
         from tasmo_guardian.protocols.tasmota import detect_tasmota
-        with patch("httpx.AsyncClient") as mock_client:
-            mock_client.return_value.__aenter__.return_value.get = AsyncMock(side_effect=httpx.ConnectError("refused"))
+        with patch("tasmo_guardian.protocols.tasmota.get_client") as mock_client:
+            mock_client.return_value.get = AsyncMock(side_effect=httpx.ConnectError("refused"))
             result = await detect_tasmota("192.168.1.10")
         assert result is None
 
@@ -96,9 +96,41 @@ class TestDetectTasmota:
             "StatusFWR": {"Version": "13.1.0"},
             "StatusNET": {"Mac": "AABBCCDDEEFF"}
         }
-        with patch("httpx.AsyncClient") as mock_client:
+        with patch("tasmo_guardian.protocols.tasmota.get_client") as mock_client:
             mock_get = AsyncMock(return_value=mock_response)
-            mock_client.return_value.__aenter__.return_value.get = mock_get
+            mock_client.return_value.get = mock_get
             await detect_tasmota("192.168.1.10", password="secret")
             call_kwargs = mock_get.call_args[1]
             assert call_kwargs["auth"] == ("secret", "")
+
+
+class TestTasmotaFingerprint:
+    def test_parse_status_1_fingerprint(self):
+        from tasmo_guardian.protocols.tasmota import parse_tasmota_fingerprint
+        data = {"StatusPRM": {"CfgHolder": 4617, "SaveCount": 42, "BootCount": 7, "Uptime": "1T00:00:00"}}
+        assert parse_tasmota_fingerprint(data) == "tasmota:4617:42:7"
+
+    def test_parse_missing_fields_returns_none(self):
+        from tasmo_guardian.protocols.tasmota import parse_tasmota_fingerprint
+        assert parse_tasmota_fingerprint({"StatusPRM": {"CfgHolder": 4617}}) is None
+
+    @pytest.mark.asyncio
+    async def test_get_fingerprint_queries_status_1(self):
+        from tasmo_guardian.protocols.tasmota import get_tasmota_fingerprint
+        mock_response = MagicMock()
+        mock_response.status_code = 200
+        mock_response.json.return_value = {"StatusPRM": {"CfgHolder": 1, "SaveCount": 2, "BootCount": 3}}
+        with patch("tasmo_guardian.protocols.tasmota.get_client") as mock_client:
+            mock_get = AsyncMock(return_value=mock_response)
+            mock_client.return_value.get = mock_get
+            result = await get_tasmota_fingerprint("192.168.1.10")
+        assert result == "tasmota:1:2:3"
+        assert "status%201" in mock_get.call_args[0][0]
+
+    @pytest.mark.asyncio
+    async def test_get_fingerprint_error_returns_none(self):
+        from tasmo_guardian.protocols.tasmota import get_tasmota_fingerprint
+        with patch("tasmo_guardian.protocols.tasmota.get_client") as mock_client:
+            mock_client.return_value.get = AsyncMock(side_effect=httpx.ConnectError("refused"))
+            result = await get_tasmota_fingerprint("192.168.1.10")
+        assert result is None
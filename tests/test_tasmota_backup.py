@@ -1,58 +1,77 @@
 """Tests for Tasmota backup download."""
 
-import pytest
-from unittest.mock import AsyncMock, patch, MagicMock
+import base64
+from unittest.mock import patch
+
 import httpx
 
 
+def mock_client(handler):
+    return httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+
 class TestDownloadTasmotaBackup:
-    async def test_success_returns_bytes(self):
+    async def test_success_streams_to_file(self, tmp_path):
         from tasmo_guardian.protocols.tasmota import download_tasmota_backup
-        mock_response = MagicMock()
-        mock_response.status_code = 200
-        mock_response.content = b"backup_data_here"
-        with patch("httpx.AsyncClient") as mock_client:
-            mock_client.return_value.__aenter__.return_value.get = AsyncMock(return_value=mock_response)
-            result = await download_tasmota_backup("192.168.1.10")
-        assert result == b"backup_data_here"
-
-    async def test_non_200_returns_none(self):
+        dest = tmp_path / "backup.dmp"
+        client = mock_client(lambda request: httpx.Response(200, content=b"backup_data_here"))
+        with patch("tasmo_guardian.protocols.tasmota.get_client", return_value=client):
+            result = await download_tasmota_backup("192.168.1.10", dest)
+        assert result == len(b"backup_data_here")
+        assert dest.read_bytes() == b"backup_data_here"
+
+    async def test_non_200_returns_none(self, tmp_path):
         from tasmo_guardian.protocols.tasmota import download_tasmota_backup
-        mock_response = MagicMock()
-        mock_response.status_code = 401
-        with patch("httpx.AsyncClient") as mock_client:
-            mock_client.return_value.__aenter__.return_value.get = AsyncMock(return_value=mock_response)
-            result = await download_tasmota_backup("192.168.1.10")
+        dest = tmp_path / "backup.dmp"
+        client = mock_client(lambda request: httpx.Response(401))
+        with patch("tasmo_guardian.protocols.tasmota.get_client", return_value=client):
+            result = await download_tasmota_backup("192.168.1.10", dest)
         assert result is None
+        assert not dest.exists()
 
-    async def test_timeout_returns_none(self):
+    async def test_timeout_returns_none(self, tmp_path):
         from tasmo_guardian.protocols.tasmota import download_tasmota_backup
-        with patch("httpx.AsyncClient") as mock_client:
-            mock_client.return_value.__aenter__.return_value.get = AsyncMock(side_effect=httpx.TimeoutException("timeout"))
-            result = await download_tasmota_backup("192.168.1.10")
+
+        def handler(request):
+            raise httpx.TimeoutException("timeout")
+
+        with patch("tasmo_guardian.protocols.tasmota.get_client", return_value=mock_client(handler)):
+            result = await download_tasmota_backup("192.168.1.10", tmp_path / "backup.dmp")
         assert result is None
 
-    async def test_password_auth_used(self):
+    async def test_timeout_override_used(self, tmp_path):
         from tasmo_guardian.protocols.tasmota import download_tasmota_backup
-        mock_response = MagicMock()
-        mock_response.status_code = 200
-        mock_response.content = b"data"
-        with patch("httpx.AsyncClient") as mock_client:
-            mock_get = AsyncMock(return_value=mock_response)
-            mock_client.return_value.__aenter__.return_value.get = mock_get
-            await download_tasmota_backup("192.168.1.10", password="secret")
-            call_kwargs = mock_get.call_args[1]
-            assert call_kwargs["auth"] == ("secret", "")
-
-    async def test_headers_included(self):
+        requests = []
+
+        def handler(request):
+            requests.append(request)
+            return httpx.Response(200, content=b"data")
+
+        with patch("tasmo_guardian.protocols.tasmota.get_client", return_value=mock_client(handler)):
+            await download_tasmota_backup("192.168.1.10", tmp_path / "b.dmp", timeout=httpx.Timeout(4.0))
+        assert requests[0].extensions["timeout"]["read"] == 4.0
+
+    async def test_password_auth_used(self, tmp_path):
         from tasmo_guardian.protocols.tasmota import download_tasmota_backup
-        mock_response = MagicMock()
-        mock_response.status_code = 200
-        mock_response.content = b"data"
-        with patch("httpx.AsyncClient") as mock_client:
-            mock_get = AsyncMock(return_value=mock_response)
-            mock_client.return_value.__aenter__.return_value.get = mock_get
-            await download_tasmota_backup("192.168.1.10")
-            call_kwargs = mock_get.call_args[1]
-            assert "headers" in call_kwargs
-            assert "User-Agent" in call_kwargs["headers"]
+        requests = []
+
+        def handler(request):
+            requests.append(request)
+            return httpx.Response(200, content=b"data")
+
+        with patch("tasmo_guardian.protocols.tasmota.get_client", return_value=mock_client(handler)):
+            await download_tasmota_backup("192.168.1.10", tmp_path / "backup.dmp", password="secret")
+        assert requests[0].headers["Authorization"] == "Basic " + base64.b64encode(b"secret:").decode()
+
+    async def test_headers_included(self, tmp_path):
+        from tasmo_guardian.protocols.tasmota import download_tasmota_backup
+        requests = []
+
+        def handler(request):
+            requests.append(request)
+            return httpx.Response(200, content=b"data")
+
+        with patch("tasmo_guardian.protocols.tasmota.get_client", return_value=mock_client(handler)):
+            await download_tasmota_backup("192.168.1.10", tmp_path / "backup.dmp")
+        assert "TasmoGuardian" in requests[0].headers["User-Agent"]
+        assert requests[0].headers["Origin"] == "http://192.168.1.10"
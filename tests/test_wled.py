@@ -27,8 +27,8 @@ class TestDetectWled:
         mock_response = MagicMock()
         mock_response.status_code = 200
         mock_response.json.return_value = {"name": "Strip", "ver": "0.14.0", "mac": "AABBCCDDEEFF"}
-        with patch("httpx.AsyncClient") as mock_client:
-            mock_client.return_value.__aenter__.return_value.get = AsyncMock(return_value=mock_response)
+        with patch("tasmo_guardian.protocols.wled.get_client") as mock_client:
+            mock_client.return_value.get = AsyncMock(return_value=mock_response)
             result = await detect_wled("192.168.1.20")
         assert result == {"name": "Strip", "version": "0.14.0", "mac": "AABBCCDDEEFF"}
 
@@ -36,21 +36,46 @@ class TestDetectWled:
         from tasmo_guardian.protocols.wled import detect_wled
         mock_response = MagicMock()
         mock_response.status_code = 404
-        with patch("httpx.AsyncClient") as mock_client:
-            mock_client.return_value.__aenter__.return_value.get = AsyncMock(return_value=mock_response)
+        with patch("tasmo_guardian.protocols.wled.get_client") as mock_client:
+            mock_client.return_value.get = AsyncMock(return_value=mock_response)
             result = await detect_wled("192.168.1.20")
         assert result is None
 
     async def test_timeout_returns_none(self):
         from tasmo_guardian.protocols.wled import detect_wled
-        with patch("httpx.AsyncClient") as mock_client:
-            mock_client.return_value.__aenter__.return_value.get = AsyncMock(side_effect=httpx.TimeoutException("timeout"))
+        with patch("tasmo_guardian.protocols.wled.get_client") as mock_client:
+            mock_client.return_value.get = AsyncMock(side_effect=httpx.TimeoutException("timeout"))
             result = await detect_wled("192.168.1.20")
         assert result is None
 
     async def test_connection_error_returns_none(self):
         from tasmo_guardian.protocols.wled import detect_wled
-        with patch("httpx.AsyncClient") as mock_client:
-            mock_client.return_value.__aenter__.return_value.get = AsyncMock(side_effect=httpx.ConnectError("refused"))
+        with patch("tasmo_guardian.protocols.wled.get_client") as mock_client:
+            mock_client.return_value.get = AsyncMock(side_effect=httpx.ConnectError("refused"))
             result = await detect_wled("192.168.1.20")
         assert result is None
+
+
+class TestWledFingerprint:
+    async def test_fingerprint_changes_with_cfg(self):
+        from tasmo_guardian.protocols.wled import get_wled_fingerprint
+        info = MagicMock(status_code=200)
+        info.json.return_value = {"fs": {"u": 12, "t": 983, "pmt": 1700000000}}
+
+        async def fingerprint_for(cfg: bytes):
+            with patch("tasmo_guardian.protocols.wled.get_client") as mock_client:
+                mock_client.return_value.get = AsyncMock(
+                    side_effect=[MagicMock(status_code=200, content=cfg), info]
+                )
+                return await get_wled_fingerprint("192.168.1.20")
+
+        first = await fingerprint_for(b'{"id": 1}')
+        assert first == await fingerprint_for(b'{"id": 1}')
+        assert first != await fingerprint_for(b'{"id": 2}')
+
+    async def test_fingerprint_failure_returns_none(self):
+        from tasmo_guardian.protocols.wled import get_wled_fingerprint
+        with patch("tasmo_guardian.protocols.wled.get_client") as mock_client:
+            mock_client.return_value.get = AsyncMock(return_value=MagicMock(status_code=404))
+            result = await get_wled_fingerprint("192.168.1.20")
+        assert result is None
@@ -1,47 +1,66 @@
 """Tests for WLED backup download."""
 
 import zipfile
-import io
-from unittest.mock import AsyncMock, patch, MagicMock
+from unittest.mock import patch
+
+import httpx
+
+
+def mock_client(handler):
+    return httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+
+def wled_handler(presets_status=200):
+    def handler(request):
+        match request.url.path:
+            case "/presets.json":
+                return httpx.Response(presets_status, content=b'{"presets": []}')
+            case "/cfg.json":
+                return httpx.Response(200, content=b'{"config": {}}')
+        return httpx.Response(404)
+
+    return handler
 
 
 class TestDownloadWledBackup:
-    async def test_success_returns_zip_bytes(self):
+    async def test_success_writes_zip(self, tmp_path):
         from tasmo_guardian.protocols.wled import download_wled_backup
-        mock_presets = MagicMock()
-        mock_presets.status_code = 200
-        mock_presets.content = b'{"presets": []}'
-        mock_cfg = MagicMock()
-        mock_cfg.status_code = 200
-        mock_cfg.content = b'{"config": {}}'
-
-        with patch("httpx.AsyncClient") as mock_client:
-            mock_get = AsyncMock(side_effect=[mock_presets, mock_cfg])
-            mock_client.return_value.__aenter__.return_value.get = mock_get
-            result = await download_wled_backup("192.168.1.20")
-
-        assert result is not None
+        dest = tmp_path / "backup.zip"
+
+        with patch("tasmo_guardian.protocols.wled.get_client", return_value=mock_client(wled_handler())):
+            result = await download_wled_backup("192.168.1.20", dest)
+
+        assert result == dest.stat().st_size
         # Verify it's a valid ZIP
-        zf = zipfile.ZipFile(io.BytesIO(result))
-        assert "presets.json" in zf.namelist()
-        assert "cfg.json" in zf.namelist()
+        with zipfile.ZipFile(dest) as zf:
+            assert "presets.json" in zf.namelist()
+            assert "cfg.json" in zf.namelist()
+            assert zf.read("cfg.json") == b'{"config": {}}'
 
-    async def test_presets_failure_returns_none(self):
+    async def test_presets_failure_returns_none(self, tmp_path):
         from tasmo_guardian.protocols.wled import download_wled_backup
-        mock_presets = MagicMock()
-        mock_presets.status_code = 404
 
-        with patch("httpx.AsyncClient") as mock_client:
-            mock_client.return_value.__aenter__.return_value.get = AsyncMock(return_value=mock_presets)
-            result = await download_wled_backup("192.168.1.20")
+        with patch("tasmo_guardian.protocols.wled.get_client", return_value=mock_client(wled_handler(404))):
+            result = await download_wled_backup("192.168.1.20", tmp_path / "backup.zip")
 
         assert result is None
 
-    async def test_connection_error_returns_none(self):
+    async def test_connection_error_returns_none(self, tmp_path):
         from tasmo_guardian.protocols.wled import download_wled_backup
-        import httpx
-        with patch("httpx.AsyncClient") as mock_client:
-            mock_client.return_value.__aenter__.return_value.get = AsyncMock(side_effect=httpx.ConnectError("refused"))
-            result = await download_wled_backup("192.168.1.20")
+
+        def handler(request):
+            raise httpx.ConnectError("refused")
+
+        with patch("tasmo_guardian.protocols.wled.get_client", return_value=mock_client(handler)):
+            result = await download_wled_backup("192.168.1.20", tmp_path / "backup.zip")
 
         assert result is None
+
+    async def test_identical_configs_produce_identical_zip(self, tmp_path):
+        from tasmo_guardian.protocols.wled import download_wled_backup
+
+        for name in ("a.zip", "b.zip"):
+            with patch("tasmo_guardian.protocols.wled.get_client", return_value=mock_client(wled_handler())):
+                await download_wled_backup("192.168.1.20", tmp_path / name)
+
+        assert (tmp_path / "a.zip").read_bytes() == (tmp_path / "b.zip").read_bytes()